@@ -0,0 +1,71 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework import permissions
+from rest_framework.exceptions import NotFound
+
+from config.async_api import AsyncAPIView
+from config.pagination import IdCursorPagination
+from . import cache as book_cache
+from .models import Book
+from .permissions import IsBookAdminOrReadOnly
+from .serializers import BookSerializer
+from .views import BookViewSets
+
+
+class BookView(AsyncAPIView):
+    permission_classes = [
+        permissions.IsAuthenticatedOrReadOnly,
+        IsBookAdminOrReadOnly,
+    ]
+    replica_reads = True
+
+    def reads_from_replica(self, request):
+        # Like BookViewSets, never caches a payload read from a replica.
+        return not settings.BOOK_CACHE_ENABLED and super().reads_from_replica(request)
+
+
+class BookList(BookView):
+    """``GET /books/`` of ``BookViewSets``, sharing its cache."""
+
+    sync_view = staticmethod(BookViewSets.as_view({"get": "list", "post": "create"}))
+
+    async def get(self, request):
+        # The viewset validates the filters and builds the queryset.
+        books = BookViewSets(request=request, action="list", kwargs={})
+
+        async def produce():
+            # A search backend may query to match ?q= (InvertedIndexBackend).
+            queryset = await sync_to_async(books.get_queryset)()
+            paginator = IdCursorPagination()
+            page = await paginator.apaginate_queryset(queryset, request)
+            return paginator.get_paginated_response(
+                BookSerializer(page, many=True).data
+            ).data
+
+        payload = await book_cache.aget_or_set(books.list_key(), produce)
+        return await book_cache.awith_current_inventory(payload)
+
+
+class BookDetail(BookView):
+    """``GET /books/<pk>/`` of ``BookViewSets``, sharing its cache."""
+
+    sync_view = staticmethod(
+        BookViewSets.as_view(
+            {
+                "get": "retrieve",
+                "put": "update",
+                "patch": "partial_update",
+                "delete": "destroy",
+            }
+        )
+    )
+
+    async def get(self, request, pk):
+        async def produce():
+            try:
+                book = await Book.objects.aget(pk=pk)
+            except Book.DoesNotExist:
+                raise NotFound()
+            return BookSerializer(book).data
+
+        return await book_cache.aget_or_set(book_cache.detail_key(pk), produce)
@@ -0,0 +1,165 @@
+"""Read-through cache for serialized book list and detail payloads.
+
+Keys carry version numbers: one for the catalog listing, one for the
+stock of the whole catalog and one per book.  Changing a book bumps all
+of them, so stale payloads are never read again and simply expire.
+
+Reservations and returns only change the stock.  They bump the stock
+version and the book's own, not the listing's: listings read the current
+inventory of their page's books on every request instead, and only those
+filtered by availability, or with availability facets, depend on the
+stock version.
+
+Versions live in the cache itself, so every process has to share it:
+``BOOK_CACHE_ENABLED`` is only on by default with ``CACHE_BACKEND=redis``.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Book
+
+LIST_VERSION_KEY = "books:list:version"
+STOCK_VERSION_KEY = "books:stock:version"
+DETAIL_VERSION_KEY = "books:detail:{}:version"
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+stats = CacheStats()
+
+
+def _version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def list_key(url: str, stock: bool = False) -> str:
+    """Key of a listing; ``stock`` when which books it holds, or what it
+    counts, depends on their inventory."""
+    version = f"v{_version(LIST_VERSION_KEY)}"
+    if stock:
+        version += f".{_version(STOCK_VERSION_KEY)}"
+    return f"books:list:{version}:{url}"
+
+
+def detail_key(book_id) -> str:
+    version = _version(DETAIL_VERSION_KEY.format(book_id))
+    return f"books:detail:{book_id}:v{version}"
+
+
+def get_or_set(key: str, produce):
+    """Return the cached payload for ``key``, building it on a miss."""
+    if not settings.BOOK_CACHE_ENABLED:
+        return produce()
+
+    payload = cache.get(key)
+    stats.record(hit=payload is not None)
+    if payload is None:
+        payload = produce()
+        cache.set(key, payload, settings.BOOK_CACHE_TIMEOUT)
+    return payload
+
+
+async def aget_or_set(key: str, produce):
+    """``get_or_set`` for async views, awaiting ``produce`` on a miss.
+
+    The cache itself is called directly: its calls are short, and the
+    async cache API would only run them in a thread.
+    """
+    if not settings.BOOK_CACHE_ENABLED:
+        return await produce()
+
+    payload = cache.get(key)
+    stats.record(hit=payload is not None)
+    if payload is None:
+        payload = await produce()
+        cache.set(key, payload, settings.BOOK_CACHE_TIMEOUT)
+    return payload
+
+
+def _inventory(books):
+    return Book.objects.filter(pk__in=[book["id"] for book in books]).values_list(
+        "id", "inventory"
+    )
+
+
+def _with_inventory(payload: dict, inventory: dict) -> dict:
+    for book in payload["results"]:
+        book["inventory"] = inventory.get(book["id"], book["inventory"])
+    return payload
+
+
+def with_current_inventory(payload: dict) -> dict:
+    """The listing ``payload`` with the inventory its books have now, read
+    in one query."""
+    if not settings.BOOK_CACHE_ENABLED or not payload["results"]:
+        return payload
+    return _with_inventory(payload, dict(_inventory(payload["results"])))
+
+
+async def awith_current_inventory(payload: dict) -> dict:
+    """``with_current_inventory`` for async views."""
+    if not settings.BOOK_CACHE_ENABLED or not payload["results"]:
+        return payload
+    inventory = {
+        book_id: count async for book_id, count in _inventory(payload["results"])
+    }
+    return _with_inventory(payload, inventory)
+
+
+def _invalidate(version_keys, book_ids) -> None:
+    """Versions are bumped right away, so the writing transaction reads
+    fresh data, and again on commit, so a payload re-cached by another
+    request before the commit became visible is not served afterwards."""
+    keys = [*version_keys, *(DETAIL_VERSION_KEY.format(pk) for pk in book_ids)]
+
+    def bump():
+        for key in keys:
+            _bump(key)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def invalidate_books(book_ids) -> None:
+    """Drop cached payloads of the given books and of every listing."""
+    _invalidate([LIST_VERSION_KEY, STOCK_VERSION_KEY], book_ids)
+
+
+def invalidate_inventory(book_ids) -> None:
+    """Drop cached payloads that hold the inventory of the given books."""
+    _invalidate([STOCK_VERSION_KEY], book_ids)
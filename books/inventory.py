@@ -0,0 +1,342 @@
+"""Book inventory reservations.
+
+Every reservation is a single conditional ``UPDATE`` on ``Book.inventory``,
+so two checkouts can never both take the last copy.  Optionally a counter
+store (Redis, or an in-process stand-in) sits in front of the database and
+absorbs the hot path; its deltas are written back to ``Book.inventory`` in
+batches by ``reconcile_inventory``.
+"""
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from . import cache as book_cache
+from .models import Book
+
+
+class BookUnavailable(Exception):
+    """Raised when no copy of the book is left to reserve."""
+
+
+class DatabaseInventory:
+    """Reserve copies straight from ``Book.inventory``."""
+
+    def reserve(self, book_id: int) -> bool:
+        updated = Book.objects.filter(pk=book_id, inventory__gt=0).update(
+            inventory=F("inventory") - 1
+        )
+        if updated:
+            book_cache.invalidate_inventory([book_id])
+        return bool(updated)
+
+    def release(self, book_id: int) -> None:
+        Book.objects.filter(pk=book_id).update(inventory=F("inventory") + 1)
+        book_cache.invalidate_inventory([book_id])
+
+    def cancel(self, book_id: int) -> None:
+        """Undo a reservation whose transaction is being rolled back."""
+
+    def reserve_many(self, book_ids) -> list:
+        """Reserve a copy per id (repeats allowed), all or nothing.
+
+        The books are locked with ``SELECT ... FOR UPDATE`` in id order, so
+        two multi-book checkouts cannot deadlock on each other.  Returns
+        the ids that are short of copies; nothing is reserved then.
+        """
+        wanted = Counter(book_ids)
+        with transaction.atomic():
+            stock = dict(
+                Book.objects.select_for_update()
+                .filter(pk__in=wanted)
+                .order_by("id")
+                .values_list("id", "inventory")
+            )
+            short = [
+                book_id
+                for book_id, count in wanted.items()
+                if stock.get(book_id, 0) < count
+            ]
+            if short:
+                return short
+
+            Book.objects.filter(pk__in=wanted).update(
+                inventory=F("inventory") - self._per_book(wanted)
+            )
+        book_cache.invalidate_inventory(wanted)
+        return []
+
+    def cancel_many(self, book_ids) -> None:
+        """Undo ``reserve_many`` for a transaction being rolled back."""
+
+    def release_many(self, book_ids) -> None:
+        """Give back a copy per id with one ``UPDATE`` for all the books."""
+        returned = Counter(book_ids)
+        if not returned:
+            return
+        Book.objects.filter(pk__in=returned).update(
+            inventory=F("inventory") + self._per_book(returned)
+        )
+        book_cache.invalidate_inventory(returned)
+
+    @staticmethod
+    def _per_book(amounts: dict) -> Case:
+        return Case(
+            *[
+                When(pk=book_id, then=Value(amount))
+                for book_id, amount in amounts.items()
+            ],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+
+    def reseed(self, book_id: int) -> None:
+        pass
+
+    def forget(self, book_id: int) -> None:
+        pass
+
+    def reconcile(self) -> int:
+        return 0
+
+    @contextmanager
+    def reservation(self, book_id: int):
+        """Reserve a copy for the duration of the block, a transaction.
+
+        The reservation is undone if the block raises or fails to commit,
+        but not if an ``on_commit`` hook fails after the commit.  Counter
+        reservations are not part of the transaction, so the block has to
+        be the outermost one of everything written with the copy: a
+        transaction around it could still roll back after it.
+        """
+        reserved = False
+        committed = []
+        try:
+            with transaction.atomic():
+                # Runs first after the COMMIT, before the hooks that raise.
+                transaction.on_commit(lambda: committed.append(True))
+                if not self.reserve(book_id):
+                    raise BookUnavailable(book_id)
+                reserved = True
+                yield
+        except Exception:
+            if reserved and not committed:
+                self.cancel(book_id)
+            raise
+
+    @contextmanager
+    def reservations(self, book_ids):
+        """``reservation`` for several books at once."""
+        reserved = False
+        committed = []
+        try:
+            with transaction.atomic():
+                transaction.on_commit(lambda: committed.append(True))
+                short = self.reserve_many(book_ids)
+                if short:
+                    raise BookUnavailable(*short)
+                reserved = True
+                yield
+        except Exception:
+            if reserved and not committed:
+                self.cancel_many(book_ids)
+            raise
+
+
+class LocalCounterStore:
+    """In-process stand-in for ``RedisCounterStore``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._deltas = defaultdict(int)
+
+    def apply(self, book_id: int, amount: int, seed) -> bool:
+        with self._lock:
+            if book_id not in self._counters:
+                self._counters[book_id] = seed() + self._deltas[book_id]
+            if amount < 0 and self._counters[book_id] + amount < 0:
+                return False
+            self._counters[book_id] += amount
+            self._deltas[book_id] += amount
+            return True
+
+    def drain(self) -> dict:
+        with self._lock:
+            deltas = {key: value for key, value in self._deltas.items() if value}
+            self._deltas.clear()
+            return deltas
+
+    def restore(self, deltas: dict) -> None:
+        with self._lock:
+            for book_id, delta in deltas.items():
+                self._deltas[book_id] += delta
+
+    def reseed(self, book_id: int) -> None:
+        with self._lock:
+            self._counters.pop(book_id, None)
+
+    def forget(self, book_id: int) -> None:
+        with self._lock:
+            self._counters.pop(book_id, None)
+            self._deltas.pop(book_id, None)
+
+
+class RedisCounterStore:
+    """Per-book counters and pending deltas kept in Redis."""
+
+    COUNTER_KEY = "inventory:counter:{}"
+    DELTAS_KEY = "inventory:deltas"
+
+    # Returns -1 when the counter has to be seeded, 0 when out of stock.
+    APPLY_SCRIPT = """
+    local current = redis.call('GET', KEYS[1])
+    if not current then
+        return -1
+    end
+    local amount = tonumber(ARGV[2])
+    if amount < 0 and tonumber(current) + amount < 0 then
+        return 0
+    end
+    redis.call('INCRBY', KEYS[1], amount)
+    redis.call('HINCRBY', KEYS[2], ARGV[1], amount)
+    return 1
+    """
+
+    DRAIN_SCRIPT = """
+    local deltas = redis.call('HGETALL', KEYS[1])
+    redis.call('DEL', KEYS[1])
+    return deltas
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._apply = client.register_script(self.APPLY_SCRIPT)
+        self._drain = client.register_script(self.DRAIN_SCRIPT)
+
+    def apply(self, book_id: int, amount: int, seed) -> bool:
+        keys = [self.COUNTER_KEY.format(book_id), self.DELTAS_KEY]
+        result = self._apply(keys=keys, args=[book_id, amount])
+        if result == -1:
+            pending = int(self.client.hget(self.DELTAS_KEY, book_id) or 0)
+            self.client.set(keys[0], seed() + pending, nx=True)
+            result = self._apply(keys=keys, args=[book_id, amount])
+        return result == 1
+
+    def drain(self) -> dict:
+        flat = self._drain(keys=[self.DELTAS_KEY])
+        pairs = zip(flat[::2], flat[1::2])
+        return {int(book_id): int(delta) for book_id, delta in pairs if int(delta)}
+
+    def restore(self, deltas: dict) -> None:
+        pipe = self.client.pipeline()
+        for book_id, delta in deltas.items():
+            pipe.hincrby(self.DELTAS_KEY, book_id, delta)
+        pipe.execute()
+
+    def reseed(self, book_id: int) -> None:
+        self.client.delete(self.COUNTER_KEY.format(book_id))
+
+    def forget(self, book_id: int) -> None:
+        pipe = self.client.pipeline()
+        pipe.delete(self.COUNTER_KEY.format(book_id))
+        pipe.hdel(self.DELTAS_KEY, book_id)
+        pipe.execute()
+
+
+class CounterInventory(DatabaseInventory):
+    """Reserve copies from a counter store, reconciling to the DB later."""
+
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def _seed(book_id: int):
+        return lambda: Book.objects.values_list("inventory", flat=True).get(
+            pk=book_id
+        )
+
+    def reserve(self, book_id: int) -> bool:
+        return self.store.apply(book_id, -1, self._seed(book_id))
+
+    def release(self, book_id: int) -> None:
+        # Counters live outside the DB transaction, so only give the copy
+        # back once the return has actually been committed.
+        transaction.on_commit(
+            lambda: self.store.apply(book_id, 1, self._seed(book_id))
+        )
+
+    def cancel(self, book_id: int) -> None:
+        self.store.apply(book_id, 1, self._seed(book_id))
+
+    def reserve_many(self, book_ids) -> list:
+        reserved = []
+        for book_id in sorted(book_ids):
+            if not self.reserve(book_id):
+                self.cancel_many(reserved)
+                return [book_id]
+            reserved.append(book_id)
+        return []
+
+    def cancel_many(self, book_ids) -> None:
+        for book_id in book_ids:
+            self.cancel(book_id)
+
+    def release_many(self, book_ids) -> None:
+        returned = Counter(book_ids)
+
+        def give_back():
+            for book_id, amount in returned.items():
+                self.store.apply(book_id, amount, self._seed(book_id))
+
+        transaction.on_commit(give_back)
+
+    def reseed(self, book_id: int) -> None:
+        """Seed the counter again from ``Book.inventory``, plus the
+        reservations not reconciled yet."""
+        self.store.reseed(book_id)
+
+    def forget(self, book_id: int) -> None:
+        """Drop the counter and the pending deltas of a deleted book."""
+        self.store.forget(book_id)
+
+    def reconcile(self) -> int:
+        """Write pending counter deltas back to ``Book.inventory``."""
+        deltas = self.store.drain()
+        if not deltas:
+            return 0
+
+        try:
+            Book.objects.filter(pk__in=deltas).update(
+                inventory=F("inventory") + self._per_book(deltas)
+            )
+        except Exception:
+            self.store.restore(deltas)
+            raise
+
+        book_cache.invalidate_inventory(deltas)
+        return len(deltas)
+
+
+@lru_cache
+def _build_inventory(backend: str):
+    if backend == "database":
+        return DatabaseInventory()
+    if backend == "local":
+        return CounterInventory(LocalCounterStore())
+    if backend == "redis":
+        import redis
+
+        return CounterInventory(
+            RedisCounterStore(redis.Redis.from_url(settings.REDIS_URL))
+        )
+    raise ValueError(f"Unknown inventory backend: {backend}")
+
+
+def get_inventory():
+    """Return the inventory configured by ``INVENTORY_BACKEND``."""
+    return _build_inventory(settings.INVENTORY_BACKEND)
@@ -0,0 +1,86 @@
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+from config import loadtest
+
+
+def server_commands(port, workers, threads) -> dict:
+    """The DRF views under gunicorn's threaded workers, and the async views
+    under uvicorn, with as many processes each."""
+    bind = f"{loadtest.HOST}:{port}"
+    return {
+        "wsgi": [
+            sys.executable, "-m", "gunicorn", "config.wsgi:application",
+            "--bind", bind, "--workers", str(workers),
+            "--worker-class", "gthread", "--threads", str(threads),
+            "--backlog", "2048", "--log-level", "warning",
+        ],
+        "asgi": [
+            sys.executable, "-m", "uvicorn", "config.asgi:application",
+            "--host", loadtest.HOST, "--port", str(port), "--workers", str(workers),
+            "--backlog", "2048", "--log-level", "warning", "--no-access-log",
+        ],
+    }  # fmt: skip
+
+
+class Command(BaseCommand):
+    """Django command to load test the hottest reads at many concurrent
+    connections, served by the DRF views under gunicorn (WSGI) and by the
+    async views under uvicorn (ASGI), comparing requests per second and
+    tail latency"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=500)
+        parser.add_argument("--duration", type=float, default=15, help="Seconds")
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Threads per gunicorn worker"
+        )
+        parser.add_argument(
+            "--slow-ms",
+            type=float,
+            default=0,
+            help="Pause in the middle of every request, like a slow client",
+        )
+        parser.add_argument("--port", type=int, default=8700)
+        parser.add_argument(
+            "--servers", nargs="+", choices=["wsgi", "asgi"], default=["wsgi", "asgi"]
+        )
+
+    def handle(self, *args, **options) -> None:
+        loadtest.raise_open_file_limit(options["connections"])
+        requests = loadtest.hot_requests()
+        commands = server_commands(
+            options["port"], options["workers"], options["threads"]
+        )
+
+        self.stdout.write(
+            f"{options['connections']} connections for {options['duration']:.0f} s, "
+            f"{options['workers']} worker(s), {len(requests)} endpoints"
+            + (
+                f", {options['slow_ms']:.0f} ms slow clients"
+                if options["slow_ms"]
+                else ""
+            )
+        )
+        self.stdout.write(loadtest.HEADER)
+        for name in options["servers"]:
+            process = subprocess.Popen(commands[name], env=loadtest.server_env())
+            try:
+                result = loadtest.run(
+                    process,
+                    options["port"],
+                    requests,
+                    options["connections"],
+                    options["duration"],
+                    slow=options["slow_ms"] / 1000,
+                )
+            finally:
+                process.terminate()
+                process.wait()
+
+            self.stdout.write(loadtest.row(name, result))
+            if result["errors"]:
+                self.stdout.write(f"  {result['statuses']}")
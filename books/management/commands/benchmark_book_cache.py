@@ -0,0 +1,84 @@
+import random
+import statistics
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books import cache as book_cache
+from books.inventory import DatabaseInventory
+from books.models import Book
+from books.views import BookViewSets
+
+
+class Command(BaseCommand):
+    """Django command to compare anonymous book list/detail latency with
+    and without the catalog cache, under a trickle of inventory updates"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument(
+            "--hot-books",
+            type=int,
+            default=200,
+            help="Number of distinct books the readers ask for",
+        )
+        parser.add_argument(
+            "--write-every",
+            type=int,
+            default=50,
+            help="Borrow and return a book after this many reads",
+        )
+
+    def handle(self, *args, **options) -> None:
+        book_ids = list(
+            Book.objects.order_by("id").values_list("id", flat=True)[
+                : options["hot_books"]
+            ]
+        )
+        if not book_ids:
+            raise CommandError("No books found, run seed_library first.")
+
+        self.stdout.write(
+            f"{'mode':<10}{'hit ratio':>10}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}"
+        )
+        for mode, enabled in (("uncached", False), ("cached", True)):
+            with override_settings(BOOK_CACHE_ENABLED=enabled), patch.object(
+                BookViewSets, "throttle_classes", []
+            ):
+                timings = self.run_mode(book_ids, **options)
+            percentiles = statistics.quantiles(timings, n=100)
+            self.stdout.write(
+                f"{mode:<10}{book_cache.stats.hit_ratio:>10.1%}"
+                f"{percentiles[49] * 1000:>10.2f}{percentiles[98] * 1000:>10.2f}"
+                f"{statistics.mean(timings) * 1000:>10.2f}"
+            )
+
+    def run_mode(self, book_ids, requests, write_every, **options):
+        cache.clear()
+        book_cache.stats.reset()
+        client = APIClient(SERVER_NAME="localhost")
+        inventory = DatabaseInventory()
+        rng = random.Random(42)
+        timings = []
+
+        for index in range(requests):
+            if index % 10 == 0:
+                url = reverse("books:book-list")
+            else:
+                url = reverse("books:book-detail", args=[rng.choice(book_ids)])
+
+            started = time.perf_counter()
+            client.get(url)
+            timings.append(time.perf_counter() - started)
+
+            if write_every and index % write_every == write_every - 1:
+                book_id = rng.choice(book_ids)
+                if inventory.reserve(book_id):
+                    inventory.release(book_id)
+
+        return timings
@@ -0,0 +1,86 @@
+import statistics
+import time
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from books.search import _build_backend
+from books.views import BookViewSets
+
+QUERIES = [
+    {"q": "author 4321"},
+    {"q": "seed book 777777"},
+    {"q": "author 17", "available": "true", "cover": "HD"},
+    {"q": "author 2500", "min_fee": "1", "max_fee": "2"},
+    {"cover": "ST", "available": "true", "max_fee": "1.5"},
+]
+
+
+class Command(BaseCommand):
+    """Django command to measure first-page latency of the book search API
+    on a large catalog"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--books",
+            type=int,
+            default=1_000_000,
+            help="Seed books until the catalog has at least this many",
+        )
+        parser.add_argument("--rounds", type=int, default=50)
+        parser.add_argument(
+            "--backends",
+            nargs="+",
+            default=["postgres"],
+            choices=["postgres", "inverted_index"],
+        )
+
+    def handle(self, *args, **options) -> None:
+        missing = options["books"] - Book.objects.count()
+        if missing > 0:
+            self.stdout.write(f"Seeding {missing} books...")
+            call_command(
+                "seed_library",
+                books=missing,
+                users=0,
+                borrowings=0,
+                no_payments=True,
+                stdout=self.stdout,
+            )
+
+        self.stdout.write(f"{'backend':<16}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for backend in options["backends"]:
+            with override_settings(
+                BOOK_SEARCH_BACKEND=backend, BOOK_CACHE_ENABLED=False
+            ), patch.object(BookViewSets, "throttle_classes", []):
+                timings = self.run_backend(backend, options["rounds"])
+            percentiles = statistics.quantiles(timings, n=100)
+            self.stdout.write(
+                f"{backend:<16}{percentiles[49] * 1000:>10.2f}"
+                f"{percentiles[98] * 1000:>10.2f}{max(timings) * 1000:>10.2f}"
+            )
+
+    def run_backend(self, backend, rounds):
+        client = APIClient(SERVER_NAME="localhost")
+        url = reverse("books:book-search")
+        # Warm up: the in-process index is built on the first query.
+        started = time.perf_counter()
+        client.get(url, QUERIES[0])
+        self.stdout.write(
+            f"{backend}: warm-up {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+        timings = []
+        for _ in range(rounds):
+            for params in QUERIES:
+                started = time.perf_counter()
+                response = client.get(url, params)
+                timings.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.content
+        _build_backend(backend).invalidate()
+        return timings
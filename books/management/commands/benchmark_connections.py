@@ -0,0 +1,89 @@
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from config import loadtest
+
+HEADER = f"{loadtest.HEADER}{'sessions':>10}{'per request':>13}"
+
+# DATABASE_CONN_MAX_AGE of the server in every mode
+MODES = {"per request": "0", "persistent": "60"}
+
+
+def sessions() -> int:
+    """Sessions Postgres has opened for this database so far."""
+    with connection.cursor() as cursor:
+        # Backends report their statistics up to a second late.
+        time.sleep(1)
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute(
+            "SELECT sessions FROM pg_stat_database WHERE datname = current_database()"
+        )
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    """Django command to load test the hottest reads served by the ``serve``
+    command with a new database connection for every request and with
+    persistent connections, comparing requests per second, latency and
+    the sessions Postgres opened"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=20)
+        parser.add_argument("--duration", type=float, default=15, help="Seconds")
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--port", type=int, default=8700)
+        parser.add_argument(
+            "--modes", nargs="+", choices=list(MODES), default=list(MODES)
+        )
+
+    def handle(self, *args, **options) -> None:
+        loadtest.raise_open_file_limit(options["connections"])
+        requests = loadtest.hot_requests()
+        command = [
+            sys.executable, "manage.py", "serve",
+            "--bind", f"{loadtest.HOST}:{options['port']}",
+            "--workers", str(options["workers"]),
+            "--threads", str(options["threads"]),
+            "--max-requests", "0",
+        ]  # fmt: skip
+
+        self.stdout.write(
+            f"{options['connections']} connections for {options['duration']:.0f} s, "
+            f"{options['workers']} worker(s) x {options['threads']} threads, "
+            f"{len(requests)} endpoints"
+        )
+        self.stdout.write(HEADER)
+        for name in options["modes"]:
+            process = subprocess.Popen(
+                command,
+                env=loadtest.production_env(DATABASE_CONN_MAX_AGE=MODES[name]),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                # Not the sessions of starting the server and waiting for it.
+                loadtest.run(process, options["port"], requests[:1], 1, 0.5)
+                before = sessions()
+                result = loadtest.run(
+                    process,
+                    options["port"],
+                    requests,
+                    options["connections"],
+                    options["duration"],
+                )
+                opened = sessions() - before
+            finally:
+                process.terminate()
+                process.wait()
+
+            self.stdout.write(
+                f"{loadtest.row(name, result)}{opened:>10}"
+                f"{opened / result['requests']:>13.3f}"
+            )
+            if result["errors"]:
+                self.stdout.write(f"  {result['statuses']}")
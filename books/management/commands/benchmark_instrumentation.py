@@ -0,0 +1,95 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from config import loadtest
+
+# Most overhead the instrumentation may add to a request
+BUDGET = 0.02
+
+
+class Command(BaseCommand):
+    """Django command to measure the overhead of the request instrumentation
+    on the hottest reads served in process, taking turns on every request
+    between no instrumentation, instrumentation and instrumentation with
+    sampled profiling.  The overhead is the median over the rounds of a
+    mode's time per request against the uninstrumented one of its round."""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=40)
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per mode and round"
+        )
+        parser.add_argument(
+            "--profile-rate",
+            type=float,
+            default=0.002,
+            help="PROFILE_SAMPLE_RATE of the sampled mode",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if any(settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"].values()):
+            # Throttles read their rates once; every request is one user's.
+            os.execve(
+                sys.executable, [sys.executable, *sys.argv], loadtest.server_env()
+            )
+
+        paths, token = loadtest.hot_paths()
+        client = Client()
+        headers = {"HTTP_HOST": "localhost", "HTTP_AUTHORIZATION": f"Bearer {token}"}
+        modes = {
+            "off": {"INSTRUMENTATION_ENABLED": False},
+            "on": {"INSTRUMENTATION_ENABLED": True, "PROFILE_SAMPLE_RATE": 0},
+            f"on, {options['profile_rate'] * 100:g}% profiled": {
+                "INSTRUMENTATION_ENABLED": True,
+                "PROFILE_SAMPLE_RATE": options["profile_rate"],
+            },
+        }
+        names = list(modes)
+
+        def serve(path, name) -> float:
+            for setting, value in modes[name].items():
+                setattr(settings, setting, value)
+            started = time.perf_counter()
+            response = client.get(path, **headers)
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200, (path, response.status_code)
+            return elapsed
+
+        timings = {name: [] for name in modes}
+        with tempfile.TemporaryDirectory() as profile_dir, override_settings(
+            ALLOWED_HOSTS=["localhost"], PROFILE_DIR=profile_dir
+        ):
+            for index in range(len(paths) * 10):
+                serve(paths[index % len(paths)], "off")
+            for round_ in range(options["rounds"]):
+                seconds = dict.fromkeys(modes, 0.0)
+                for index in range(options["requests"]):
+                    # The modes take turns on every request, each going
+                    # first in turn, so that drift favours none of them.
+                    turn = index % len(names)
+                    for name in names[turn:] + names[:turn]:
+                        seconds[name] += serve(paths[index % len(paths)], name)
+                for name in modes:
+                    timings[name].append(seconds[name] / options["requests"])
+            profiles = len(os.listdir(profile_dir))
+
+        self.stdout.write(
+            f"{options['rounds']} rounds of {options['requests']} requests per mode, "
+            f"{len(paths)} endpoints, {profiles} profiles written"
+        )
+        self.stdout.write(f"{'mode':<20}{'median ms':>12}{'overhead':>10}")
+        for name, values in timings.items():
+            overhead = statistics.median(
+                value / baseline - 1 for value, baseline in zip(values, timings["off"])
+            )
+            self.stdout.write(
+                f"{name:<20}{statistics.median(values) * 1000:>12.3f}{overhead:>10.2%}"
+                + ("  over budget" if overhead > BUDGET else "")
+            )
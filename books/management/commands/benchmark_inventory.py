@@ -0,0 +1,121 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from books.inventory import (
+    BookUnavailable,
+    CounterInventory,
+    DatabaseInventory,
+    LocalCounterStore,
+    _build_inventory,
+)
+from books.models import Book
+
+
+class NaiveInventory(DatabaseInventory):
+    """The read-modify-write checkout the serializer used to do."""
+
+    def reserve(self, book_id: int) -> bool:
+        book = Book.objects.get(pk=book_id)
+        if book.inventory <= 0:
+            return False
+        book.inventory -= 1
+        book.save()
+        return True
+
+
+STRATEGIES = {
+    "naive": NaiveInventory,
+    "database": DatabaseInventory,
+    "local": lambda: CounterInventory(LocalCounterStore()),
+    "redis": lambda: _build_inventory("redis"),
+}
+
+
+class Command(BaseCommand):
+    """Django command to hammer one hot title from N threads and report
+    throughput and oversell count for each reservation strategy"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--stock", type=int, default=200)
+        parser.add_argument(
+            "--attempts",
+            type=int,
+            default=50,
+            help="Reservation attempts per thread",
+        )
+        parser.add_argument(
+            "--strategy",
+            action="append",
+            choices=sorted(STRATEGIES),
+            help="Strategy to run, can be repeated (default: naive, database, local)",
+        )
+
+    def handle(self, *args, **options) -> None:
+        strategies = options["strategy"] or ["naive", "database", "local"]
+
+        self.stdout.write(
+            f"{options['threads']} threads x {options['attempts']} attempts "
+            f"on a title with {options['stock']} copies"
+        )
+        self.stdout.write(
+            f"{'strategy':<10}{'reserved':>10}{'oversold':>10}"
+            f"{'final inv.':>12}{'ops/s':>12}"
+        )
+        for name in strategies:
+            result = self.run_strategy(STRATEGIES[name](), **options)
+            self.stdout.write(
+                f"{name:<10}{result['reserved']:>10}{result['oversold']:>10}"
+                f"{result['inventory']:>12}{result['throughput']:>12.0f}"
+            )
+
+    def run_strategy(self, inventory, threads, stock, attempts, **options):
+        book = Book.objects.create(
+            title="Benchmark book",
+            author="Benchmark author",
+            cover=Book.CoverType.HARD,
+            inventory=stock,
+            daily_fee=1,
+        )
+        reserved = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            close_old_connections()
+            count = 0
+            barrier.wait()
+            try:
+                for _ in range(attempts):
+                    try:
+                        with inventory.reservation(book.id):
+                            count += 1
+                    except BookUnavailable:
+                        pass
+            finally:
+                connection.close()
+            with lock:
+                reserved.append(count)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        inventory.reconcile()
+        book.refresh_from_db()
+        total = sum(reserved)
+        book.delete()
+
+        return {
+            "reserved": total,
+            "oversold": max(0, total - stock),
+            "inventory": book.inventory,
+            "throughput": threads * attempts / elapsed,
+        }
@@ -0,0 +1,122 @@
+import subprocess
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config import loadtest
+
+HEADER = f"{loadtest.HEADER}{'primary rows':>14}{'replica rows':>14}{'primary':>9}"
+STAFF_PATHS = [
+    "/borrowings/",
+    "/borrowings/?is_active=true",
+    "/payments/",
+    "/payments/?ordering=-amount",
+]
+
+
+def rows_read(databases) -> dict:
+    """Rows each database has scanned and fetched so far."""
+    with connection.cursor() as cursor:
+        # Backends report their statistics up to a second late.
+        time.sleep(1)
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute(
+            "SELECT datname, tup_returned + tup_fetched FROM pg_stat_database "
+            "WHERE datname = ANY(%s)",
+            [list(databases)],
+        )
+        return dict(cursor.fetchall())
+
+
+class Command(BaseCommand):
+    """Django command to load test the hottest reads and the staff listings
+    served by the ``serve`` command from the primary alone and with a read
+    replica, comparing requests per second and the rows each database read.
+
+    A copy of the database, ``CREATE DATABASE <name> TEMPLATE <database>``,
+    stands in for a replica; nothing writes during the load."""
+
+    def add_arguments(self, parser):
+        parser.add_argument("replica_name", help="Database standing in for the replica")
+        parser.add_argument(
+            "--replica-host", help="Host of the replica, the primary's by default"
+        )
+        parser.add_argument("--connections", type=int, default=20)
+        parser.add_argument("--duration", type=float, default=15, help="Seconds")
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--port", type=int, default=8700)
+
+    def handle(self, *args, **options) -> None:
+        primary = connection.settings_dict["NAME"]
+        replica = options["replica_name"]
+        if replica not in rows_read([replica]):
+            raise CommandError(f"There is no database {replica}.")
+        staff = get_user_model().objects.filter(is_staff=True).first()
+        if staff is None:
+            raise CommandError("No staff user found, create a superuser first.")
+
+        loadtest.raise_open_file_limit(options["connections"])
+        token = AccessToken.for_user(staff)
+        requests = loadtest.hot_requests() + [
+            loadtest.get_request(path, token) for path in STAFF_PATHS
+        ]
+        command = [
+            sys.executable, "manage.py", "serve",
+            "--bind", f"{loadtest.HOST}:{options['port']}",
+            "--workers", str(options["workers"]),
+            "--threads", str(options["threads"]),
+            "--max-requests", "0",
+        ]  # fmt: skip
+        setups = {
+            "primary only": {},
+            "replica": {
+                "DATABASE_REPLICA_HOSTS": options["replica_host"]
+                or connection.settings_dict["HOST"],
+                "DATABASE_REPLICA_NAME": replica,
+            },
+        }
+
+        self.stdout.write(
+            f"{options['connections']} connections for {options['duration']:.0f} s, "
+            f"{options['workers']} worker(s) x {options['threads']} threads, "
+            f"{len(requests)} endpoints, {len(STAFF_PATHS)} of them staff listings"
+        )
+        self.stdout.write(HEADER)
+        for name, environment in setups.items():
+            process = subprocess.Popen(
+                command,
+                env=loadtest.production_env(
+                    **{"DATABASE_REPLICA_HOSTS": "", **environment}
+                ),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                # Warm the caches before counting.
+                loadtest.run(process, options["port"], requests, 1, 1)
+                before = rows_read([primary, replica])
+                result = loadtest.run(
+                    process,
+                    options["port"],
+                    requests,
+                    options["connections"],
+                    options["duration"],
+                )
+                after = rows_read([primary, replica])
+            finally:
+                process.terminate()
+                process.wait()
+
+            read = {database: after[database] - before[database] for database in after}
+            total = read[primary] + read[replica]
+            self.stdout.write(
+                f"{loadtest.row(name, result)}{read[primary]:>14}"
+                f"{read[replica]:>14}{read[primary] / total:>9.0%}"
+            )
+            if result["errors"]:
+                self.stdout.write(f"  {result['statuses']}")
@@ -0,0 +1,134 @@
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+from config import loadtest
+
+HEADER = f"{loadtest.HEADER}{'processes':>11}{'RSS MB':>9}{'PSS MB':>9}"
+
+
+def process_tree(pid) -> list:
+    """``pid`` and all of its descendants."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The command name may hold spaces, the fields after it not.
+                ppid = int(stat.read().rpartition(")")[2].split()[1])
+        except (OSError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        tree.append(pending.pop())
+        pending.extend(children.get(tree[-1], ()))
+    return tree
+
+
+def memory(pid) -> dict:
+    """Resident and proportional set sizes of a process in megabytes; PSS
+    splits the pages shared with other processes between them, so it is
+    what copy-on-write sharing saves."""
+    sizes = {}
+    for path, field in (("status", "VmRSS:"), ("smaps_rollup", "Pss:")):
+        try:
+            with open(f"/proc/{pid}/{path}") as lines:
+                for line in lines:
+                    if line.startswith(field):
+                        sizes[field] = int(line.split()[1]) / 1024
+                        break
+        except OSError:
+            pass
+    return {"rss": sizes.get("VmRSS:", 0), "pss": sizes.get("Pss:", 0)}
+
+
+def server_commands(port, workers, threads) -> dict:
+    """The development server, and gunicorn as the ``serve`` command starts
+    it for production with and without the application preloaded."""
+    manage = [sys.executable, "manage.py"]
+    bind = f"{loadtest.HOST}:{port}"
+    serve = [*manage, "serve", "--bind", bind, "--max-requests", "0"]
+    if workers:
+        serve += ["--workers", str(workers)]
+    if threads:
+        serve += ["--threads", str(threads)]
+    return {
+        "development": [*manage, "runserver", bind, "--noreload"],
+        "production": serve,
+        "no preload": [*serve, "--no-preload"],
+    }
+
+
+class Command(BaseCommand):
+    """Django command to load test the hottest reads served by the
+    development server and by the production profile of the ``serve``
+    command, with and without preloading, comparing requests per second,
+    tail latency and the memory of every worker"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=50)
+        parser.add_argument("--duration", type=float, default=15, help="Seconds")
+        parser.add_argument("--workers", type=int, help="Skip sizing the workers")
+        parser.add_argument("--threads", type=int, help="Skip sizing the threads")
+        parser.add_argument("--port", type=int, default=8700)
+        parser.add_argument(
+            "--servers",
+            nargs="+",
+            choices=["development", "production", "no preload"],
+            default=["development", "production", "no preload"],
+        )
+
+    def handle(self, *args, **options) -> None:
+        loadtest.raise_open_file_limit(options["connections"])
+        requests = loadtest.hot_requests()
+        commands = server_commands(
+            options["port"], options["workers"], options["threads"]
+        )
+        environments = {
+            "development": loadtest.server_env(DJANGO_ENV="development"),
+            "production": loadtest.production_env(),
+        }
+
+        self.stdout.write(
+            f"{options['connections']} connections for {options['duration']:.0f} s, "
+            f"{len(requests)} endpoints, memory per process after the load"
+        )
+        self.stdout.write(HEADER)
+        for name in options["servers"]:
+            process = subprocess.Popen(
+                commands[name],
+                env=environments[
+                    "development" if name == "development" else "production"
+                ],
+                # Not a line per request from the development server.
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL if name == "development" else None,
+            )
+            try:
+                result = loadtest.run(
+                    process,
+                    options["port"],
+                    requests,
+                    options["connections"],
+                    options["duration"],
+                )
+                # The master of gunicorn only forks and supervises; the
+                # workers serve and hold the application.
+                tree = process_tree(process.pid)
+                workers = tree[1:] if name != "development" else tree
+                sizes = [memory(pid) for pid in workers]
+            finally:
+                process.terminate()
+                process.wait()
+
+            self.stdout.write(
+                f"{loadtest.row(name, result)}{len(sizes):>11}"
+                f"{sum(size['rss'] for size in sizes) / len(sizes):>9.1f}"
+                f"{sum(size['pss'] for size in sizes) / len(sizes):>9.1f}"
+            )
+            if result["errors"]:
+                self.stdout.write(f"  {result['statuses']}")
@@ -0,0 +1,218 @@
+import math
+import os
+import statistics
+import sys
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from gunicorn.app.base import BaseApplication
+
+# Share of the database's connections the web workers may hold; Celery
+# workers and management commands need the rest.
+CONNECTION_SHARE = 0.8
+MAX_THREADS = 32
+
+
+def measure_database(samples=10) -> dict:
+    """Median milliseconds to open a connection and to run a trivial
+    query, and the server's ``max_connections``."""
+    connects, queries = [], []
+    for _ in range(samples):
+        connection.close()
+        started = time.perf_counter()
+        connection.ensure_connection()
+        connects.append(time.perf_counter() - started)
+        with connection.cursor() as cursor:
+            started = time.perf_counter()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            queries.append(time.perf_counter() - started)
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW max_connections")
+        max_connections = int(cursor.fetchone()[0])
+    connection.close()
+    return {
+        "connect_ms": statistics.median(connects) * 1000,
+        "query_ms": statistics.median(queries) * 1000,
+        "max_connections": max_connections,
+    }
+
+
+def size(cpus, database, request_cpu_ms, queries_per_request, asgi=False) -> dict:
+    """Workers and threads per worker for this host.
+
+    A worker per core, since the GIL lets a process use only one.  A
+    request keeps a thread waiting on the database for its queries, and
+    for a new connection unless connections persist; while it waits the
+    other threads use the core, so ``1 + wait / cpu`` threads keep it
+    busy.  ASGI workers wait in their event loop instead and need none.
+    Either way the workers may hold only ``CONNECTION_SHARE`` of the
+    database's connections.
+    """
+    wait_ms = database["query_ms"] * queries_per_request
+    if not settings.DATABASES["default"].get("CONN_MAX_AGE"):
+        wait_ms += database["connect_ms"]
+    workers = cpus
+    connections_allowed = int(database["max_connections"] * CONNECTION_SHARE)
+
+    if asgi:
+        per_worker = settings.ASYNC_DATABASE_CONCURRENCY
+        threads = 1
+    else:
+        threads = min(MAX_THREADS, math.ceil(1 + wait_ms / request_cpu_ms))
+        threads = max(1, min(threads, connections_allowed // workers))
+        per_worker = threads
+    workers = max(1, min(workers, connections_allowed // per_worker))
+    return {
+        "workers": workers,
+        "threads": threads,
+        "wait_ms": wait_ms,
+        "connections": workers * per_worker,
+    }
+
+
+class Server(BaseApplication):
+    """gunicorn run from this process; ``loader`` returns the application,
+    in the master with ``preload_app`` or else in every worker."""
+
+    def __init__(self, loader, options):
+        self.loader = loader
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.loader()
+
+
+def load_application(asgi=False):
+    if asgi:
+        from config.asgi import application
+    else:
+        from config.wsgi import application
+    # Import every view, serializer and model the URLconf reaches, so
+    # that with preloading they are shared by the workers.
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    return application
+
+
+class Command(BaseCommand):
+    """Django command to serve the project with gunicorn, with workers and
+    threads sized from the CPU count and the measured database latency,
+    and the application preloaded so workers share its memory"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bind", default="0.0.0.0:8000")
+        parser.add_argument(
+            "--asgi",
+            action="store_true",
+            help="Serve the ASGI app, with its async views, on uvicorn workers",
+        )
+        parser.add_argument("--workers", type=int, help="Skip sizing the workers")
+        parser.add_argument("--threads", type=int, help="Skip sizing the threads")
+        parser.add_argument(
+            "--request-cpu-ms",
+            type=float,
+            default=5,
+            help="Python time of a typical request, in milliseconds",
+        )
+        parser.add_argument(
+            "--queries-per-request",
+            type=int,
+            default=3,
+            help="Queries of a typical request",
+        )
+        parser.add_argument(
+            "--no-preload",
+            action="store_true",
+            help="Load the application in every worker instead of once",
+        )
+        parser.add_argument(
+            "--max-requests",
+            type=int,
+            default=5000,
+            help="Restart a worker after this many requests, 0 never",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Print the sizing and exit"
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["asgi"] and not settings.ASYNC_READ_VIEWS:
+            # The settings pick the async URLconf when they are loaded.
+            os.execve(
+                sys.executable,
+                [sys.executable, *sys.argv],
+                {**os.environ, "ASYNC_READ_VIEWS": "True"},
+            )
+        if settings.DEBUG:
+            self.stderr.write(
+                self.style.WARNING("DEBUG is on, serve with DJANGO_ENV=production.")
+            )
+
+        try:
+            database = measure_database()
+        except Exception as error:
+            raise CommandError(f"Cannot reach the database: {error}")
+        sizing = size(
+            os.cpu_count() or 1,
+            database,
+            options["request_cpu_ms"],
+            options["queries_per_request"],
+            asgi=options["asgi"],
+        )
+        workers = options["workers"] or sizing["workers"]
+        threads = options["threads"] or sizing["threads"]
+        if workers > 1 and isinstance(caches["default"], LocMemCache):
+            # Book payload versions, throttles, cached reports and replica
+            # pins would each be a worker's own.
+            raise CommandError(
+                f"{workers} workers cannot share the local memory cache, "
+                "set CACHE_BACKEND=redis or serve with --workers 1."
+            )
+
+        self.stdout.write(
+            f"database: connect {database['connect_ms']:.1f} ms, "
+            f"query {database['query_ms']:.2f} ms, "
+            f"max_connections {database['max_connections']}"
+        )
+        self.stdout.write(
+            f"{os.cpu_count()} CPUs: {workers} {'uvicorn' if options['asgi'] else ''}"
+            f" worker(s) x {threads} thread(s), {sizing['wait_ms']:.1f} ms "
+            f"database wait per request, up to {sizing['connections']} connections"
+        )
+        if options["dry_run"]:
+            return
+
+        server_options = {
+            "bind": options["bind"],
+            "workers": workers,
+            "threads": threads,
+            "worker_class": (
+                "uvicorn.workers.UvicornWorker" if options["asgi"] else "gthread"
+            ),
+            "preload_app": not options["no_preload"],
+            "max_requests": options["max_requests"],
+            # Workers restart at different times rather than all at once.
+            "max_requests_jitter": options["max_requests"] // 10,
+            "timeout": 30,
+            "keepalive": 5,
+            "backlog": 2048,
+            "proc_name": "library-service",
+        }
+        if os.path.isdir("/dev/shm"):
+            # Heartbeats on a disk-backed /tmp can stall workers in Docker.
+            server_options["worker_tmp_dir"] = "/dev/shm"
+
+        # No worker may inherit the connection the sizing opened.
+        connections.close_all()
+        Server(lambda: load_application(options["asgi"]), server_options).run()
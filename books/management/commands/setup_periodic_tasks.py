@@ -0,0 +1,77 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django_celery_beat.models import (
+    CrontabSchedule,
+    IntervalSchedule,
+    PeriodicTask,
+)
+
+PERIODIC_TASKS = [
+    {
+        "name": "Overdue borrowings report",
+        "task": "notification.tasks.filter_borrowing_which_are_overdue",
+        "crontab": {"minute": "0", "hour": "9"},
+    },
+    {
+        "name": "Reconcile inventory counters",
+        "task": "books.tasks.reconcile_inventory",
+        "interval": 30,
+    },
+    {
+        "name": "Relay outbox events",
+        "task": "notification.tasks.relay_outbox",
+        "interval": 2,
+    },
+    {
+        "name": "Apply Stripe webhook events",
+        "task": "payments.tasks.apply_stripe_events",
+        "interval": 2,
+    },
+    {
+        "name": "Accrue overdue fines",
+        "task": "payments.tasks.accrue_overdue_fines",
+        "crontab": {"minute": "30", "hour": "0"},
+    },
+    {
+        "name": "Refresh user summaries",
+        "task": "users.tasks.refresh_user_summaries",
+        "crontab": {"minute": "0", "hour": "1"},
+    },
+    {
+        "name": "Roll up report history",
+        "task": "reports.tasks.roll_up_history",
+        "crontab": {"minute": "15", "hour": "0"},
+    },
+]
+
+
+class Command(BaseCommand):
+    """Django command to register the project's periodic tasks in the
+    django_celery_beat DatabaseScheduler"""
+
+    def handle(self, *args, **kwargs) -> None:
+        for spec in PERIODIC_TASKS:
+            defaults = {
+                "task": spec["task"],
+                "kwargs": json.dumps(spec.get("kwargs", {})),
+                "interval": None,
+                "crontab": None,
+            }
+            if "interval" in spec:
+                defaults["interval"], _ = IntervalSchedule.objects.get_or_create(
+                    every=spec["interval"], period=IntervalSchedule.SECONDS
+                )
+            else:
+                defaults["crontab"], _ = CrontabSchedule.objects.get_or_create(
+                    **spec["crontab"]
+                )
+
+            _, created = PeriodicTask.objects.update_or_create(
+                name=spec["name"], defaults=defaults
+            )
+            self.stdout.write(
+                f"{'Created' if created else 'Updated'} periodic task "
+                f"'{spec['name']}'"
+            )
+        self.stdout.write(self.style.SUCCESS("Periodic tasks are up to date"))
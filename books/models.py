@@ -1,5 +1,14 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 
+SEARCH_CONFIG = "english"
+
+# Queries have to use this exact expression to be served by the GIN index.
+SEARCH_VECTOR = SearchVector("title", weight="A", config=SEARCH_CONFIG) + SearchVector(
+    "author", weight="B", config=SEARCH_CONFIG
+)
+
 
 class Book(models.Model):
     class CoverType(models.TextChoices):
@@ -12,5 +21,10 @@ class Book(models.Model):
     inventory = models.PositiveIntegerField()
     daily_fee = models.DecimalField(decimal_places=2, max_digits=10)
 
+    class Meta:
+        indexes = [
+            GinIndex(SEARCH_VECTOR, name="book_search_idx"),
+        ]
+
     def __str__(self) -> str:
         return self.title
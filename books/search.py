@@ -0,0 +1,187 @@
+"""Full-text and faceted search over the book catalog.
+
+The default backend ranks matches with PostgreSQL full-text search, served
+by the ``book_search_idx`` GIN index.  ``InvertedIndexBackend`` keeps a
+small in-process index instead, for tests and for databases without
+full-text search; every process rebuilds its own when the version shared
+in the cache changes.
+"""
+import math
+import re
+import threading
+import uuid
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, FloatField, Q, Value, When
+
+from .models import SEARCH_CONFIG, SEARCH_VECTOR, Book
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Title matches count more than author matches, like weights A and B.
+FIELD_WEIGHTS = {"title": 1.0, "author": 0.4}
+
+# Facets count at most this many matches, the best ranked, so a broad
+# query does not aggregate over the whole catalog.
+FACET_LIMIT = 1_000
+
+# The inverted index ranks at most this many matches, the best scored, in
+# the SQL of a search.
+RANK_LIMIT = 1_000
+
+
+def filter_books(queryset, filters):
+    """Apply the facet and range filters of ``BookFilterSerializer``."""
+    if filters.get("cover"):
+        queryset = queryset.filter(cover=filters["cover"])
+    if filters.get("available") is True:
+        queryset = queryset.filter(inventory__gt=0)
+    if filters.get("available") is False:
+        queryset = queryset.filter(inventory=0)
+    if filters.get("min_fee") is not None:
+        queryset = queryset.filter(daily_fee__gte=filters["min_fee"])
+    if filters.get("max_fee") is not None:
+        queryset = queryset.filter(daily_fee__lte=filters["max_fee"])
+    return queryset
+
+
+def facet_counts(queryset) -> dict:
+    """Count matches per cover type and availability in one query.
+
+    Only the first ``FACET_LIMIT`` matches in the order of ``queryset``,
+    the best ranked for a search, are counted; ``truncated`` tells clients
+    when the counts describe that sample rather than every match.
+    """
+    matches = queryset.values("cover", "inventory")[:FACET_LIMIT]
+    counts = matches.aggregate(
+        **{
+            f"cover_{cover}": Count("cover", filter=Q(cover=cover))
+            for cover in Book.CoverType.values
+        },
+        available=Count("inventory", filter=Q(inventory__gt=0)),
+        unavailable=Count("inventory", filter=Q(inventory=0)),
+    )
+    return {
+        "cover": {cover: counts[f"cover_{cover}"] for cover in Book.CoverType.values},
+        "available": {"true": counts["available"], "false": counts["unavailable"]},
+        "truncated": counts["available"] + counts["unavailable"] >= FACET_LIMIT,
+    }
+
+
+class PostgresSearchBackend:
+    def invalidate(self) -> None:
+        pass
+
+    def search(self, queryset, text):
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+        return (
+            queryset.annotate(
+                search=SEARCH_VECTOR, rank=SearchRank(SEARCH_VECTOR, query)
+            )
+            .filter(search=query)
+            .order_by("-rank", "id")
+        )
+
+
+class InvertedIndexBackend:
+    """Token -> {book id: weight} postings built from the database.
+
+    The index is rebuilt lazily once the version under ``VERSION_KEY``
+    differs from the one it was built at.  ``invalidate``, which the book
+    signals call on every save or delete, changes that version for every
+    process sharing the cache.
+    """
+
+    VERSION_KEY = "books:search:version"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._size = 0
+        self._version = None
+
+    def invalidate(self) -> None:
+        """Changed right away, and again on commit so that an index rebuilt
+        before the write became visible is not used afterwards."""
+
+        def bump():
+            cache.set(self.VERSION_KEY, uuid.uuid4().hex, None)
+
+        bump()
+        transaction.on_commit(bump)
+
+    def _build(self):
+        postings = defaultdict(lambda: defaultdict(float))
+        size = 0
+        rows = Book.objects.values_list("id", "title", "author")
+        for book_id, *values in rows.iterator(chunk_size=5000):
+            size += 1
+            for field, value in zip(FIELD_WEIGHTS, values):
+                for token in TOKEN_RE.findall(value.lower()):
+                    postings[token][book_id] += FIELD_WEIGHTS[field]
+        return postings, size
+
+    def rank(self, text) -> dict:
+        version = cache.get_or_set(self.VERSION_KEY, lambda: uuid.uuid4().hex, None)
+        with self._lock:
+            if self._postings is None or self._version != version:
+                self._postings, self._size = self._build()
+                self._version = version
+            postings, size = self._postings, self._size
+
+        tokens = set(TOKEN_RE.findall(text.lower()))
+        if not tokens:
+            return {}
+
+        matches = [postings.get(token, {}) for token in tokens]
+        book_ids = set.intersection(*(set(match) for match in matches))
+        scores = {}
+        for book_id in book_ids:
+            scores[book_id] = sum(
+                match[book_id] * math.log(1 + size / len(match)) for match in matches
+            )
+        best = sorted(scores, key=lambda book_id: (-scores[book_id], book_id))
+        return {book_id: scores[book_id] for book_id in best[:RANK_LIMIT]}
+
+    def search(self, queryset, text):
+        """The ``RANK_LIMIT`` best scored matches, ranked in SQL."""
+        scores = self.rank(text)
+        rank = Case(
+            *[When(pk=book_id, then=Value(score)) for book_id, score in scores.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(pk__in=scores).annotate(rank=rank).order_by("-rank", "id")
+        )
+
+
+BACKENDS = {
+    "postgres": PostgresSearchBackend,
+    "inverted_index": InvertedIndexBackend,
+}
+
+
+@lru_cache
+def _build_backend(name: str):
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown book search backend: {name}")
+
+
+def get_search_backend():
+    """Return the backend configured by ``BOOK_SEARCH_BACKEND``."""
+    return _build_backend(settings.BOOK_SEARCH_BACKEND)
+
+
+def invalidate_search_backends() -> None:
+    """Invalidate every backend, not only the configured one, so that none
+    is left with an index of books that have changed since."""
+    for name in BACKENDS:
+        _build_backend(name).invalidate()
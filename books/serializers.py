@@ -1,8 +1,29 @@
 from .models import Book
 from rest_framework import serializers
 
+from config.instrumentation import TimedSerializerMixin
 
-class BookSerializer(serializers.ModelSerializer):
+
+class BookSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = "__all__"
+
+
+class BookFilterSerializer(serializers.Serializer):
+    q = serializers.CharField(required=False, allow_blank=True, max_length=255)
+    cover = serializers.ChoiceField(choices=Book.CoverType.choices, required=False)
+    available = serializers.BooleanField(
+        required=False, allow_null=True, default=None
+    )
+    min_fee = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False
+    )
+    max_fee = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False
+    )
+
+
+class BookSearchSerializer(BookFilterSerializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    offset = serializers.IntegerField(min_value=0, default=0)
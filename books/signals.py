@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache as book_cache
+from .inventory import get_inventory
+from .models import Book
+from .search import invalidate_search_backends
+
+
+@receiver(post_save, sender=Book)
+def reseed_inventory_counter(sender, instance, **kwargs):
+    """An explicit save of the book overrides what its counter holds; the
+    reservations not reconciled yet still count."""
+    get_inventory().reseed(instance.pk)
+
+
+@receiver(post_delete, sender=Book)
+def forget_inventory_counter(sender, instance, **kwargs):
+    get_inventory().forget(instance.pk)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_cached_book(sender, instance, **kwargs):
+    book_cache.invalidate_books([instance.pk])
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_search_index(sender, instance, **kwargs):
+    invalidate_search_backends()
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .inventory import get_inventory
+
+
+@shared_task
+def reconcile_inventory() -> int:
+    """Flush counter-store inventory deltas into ``Book.inventory``."""
+    return get_inventory().reconcile()
@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books import cache as book_cache
+from books.inventory import DatabaseInventory
+from books.models import Book
+
+BOOK_URL = reverse("books:book-list")
+
+
+def detail_url(book_id):
+    return reverse("books:book-detail", args=[book_id])
+
+
+@override_settings(BOOK_CACHE_ENABLED=True)
+class BookCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        book_cache.stats.reset()
+        self.book = Book.objects.create(
+            title="Cached book",
+            author="Author",
+            cover=Book.CoverType.HARD,
+            inventory=3,
+            daily_fee=1.5,
+        )
+
+    def test_detail_is_served_from_cache(self):
+        self.client.get(detail_url(self.book.id))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(detail_url(self.book.id))
+
+        self.assertEqual(res.data["title"], "Cached book")
+        self.assertEqual(book_cache.stats.hits, 1)
+        self.assertEqual(book_cache.stats.misses, 1)
+
+    def test_list_is_served_from_cache(self):
+        self.client.get(BOOK_URL)
+
+        # Only the inventory of the page is read again.
+        with self.assertNumQueries(1):
+            res = self.client.get(BOOK_URL)
+
+        self.assertEqual(res.data["results"][0]["id"], self.book.id)
+        self.assertEqual(book_cache.stats.hits, 1)
+
+    def test_reservations_keep_the_list_cached_with_current_inventory(self):
+        self.client.get(BOOK_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DatabaseInventory().reserve(self.book.id)
+        res = self.client.get(BOOK_URL)
+
+        self.assertEqual(res.data["results"][0]["inventory"], 2)
+        self.assertEqual(book_cache.stats.hits, 1)
+
+    def test_reservations_invalidate_lists_filtered_by_availability(self):
+        self.book.inventory = 1
+        self.book.save()
+        self.client.get(BOOK_URL, {"available": "true"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DatabaseInventory().reserve(self.book.id)
+        res = self.client.get(BOOK_URL, {"available": "true"})
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_save_invalidates_detail_and_list(self):
+        self.client.get(detail_url(self.book.id))
+        self.client.get(BOOK_URL)
+
+        self.book.title = "Renamed"
+        self.book.save()
+
+        self.assertEqual(
+            self.client.get(detail_url(self.book.id)).data["title"], "Renamed"
+        )
+        self.assertEqual(
+            self.client.get(BOOK_URL).data["results"][0]["title"], "Renamed"
+        )
+
+    def test_admin_update_invalidates_detail(self):
+        admin = get_user_model().objects.create_superuser("admin@admin.com", "testpass")
+        client = APIClient()
+        client.force_authenticate(admin)
+        client.get(detail_url(self.book.id))
+
+        client.patch(detail_url(self.book.id), {"inventory": 9})
+
+        self.assertEqual(client.get(detail_url(self.book.id)).data["inventory"], 9)
+
+    def test_reservation_and_release_invalidate_inventory(self):
+        inventory = DatabaseInventory()
+        self.client.get(detail_url(self.book.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.reserve(self.book.id)
+        self.assertEqual(self.client.get(detail_url(self.book.id)).data["inventory"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.release(self.book.id)
+        self.assertEqual(self.client.get(detail_url(self.book.id)).data["inventory"], 3)
+
+    @override_settings(BOOK_CACHE_ENABLED=False)
+    def test_cache_can_be_disabled(self):
+        self.client.get(detail_url(self.book.id))
+
+        with self.assertNumQueries(1):
+            self.client.get(detail_url(self.book.id))
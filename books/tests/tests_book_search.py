@@ -0,0 +1,158 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from books.models import Book
+from books.search import InvertedIndexBackend
+
+BOOK_URL = reverse("books:book-list")
+SEARCH_URL = reverse("books:book-search")
+
+
+def sample_book(**params):
+    defaults = {
+        "title": "Sample book",
+        "author": "Sample author",
+        "cover": Book.CoverType.HARD,
+        "inventory": 1,
+        "daily_fee": 1.00,
+    }
+    defaults.update(params)
+
+    return Book.objects.create(**defaults)
+
+
+class BookFilterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cheap_soft = sample_book(cover=Book.CoverType.SOFT, daily_fee=0.5)
+        self.hard = sample_book(daily_fee=2)
+        self.gone = sample_book(inventory=0, daily_fee=3)
+
+    def ids(self, params):
+        res = self.client.get(BOOK_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [book["id"] for book in res.data["results"]]
+
+    def test_filter_by_cover(self):
+        self.assertEqual(self.ids({"cover": "ST"}), [self.cheap_soft.id])
+
+    def test_filter_by_availability(self):
+        self.assertEqual(
+            self.ids({"available": "true"}), [self.cheap_soft.id, self.hard.id]
+        )
+        self.assertEqual(self.ids({"available": "false"}), [self.gone.id])
+
+    def test_filter_by_fee_range(self):
+        self.assertEqual(
+            self.ids({"min_fee": "1", "max_fee": "2.50"}), [self.hard.id]
+        )
+
+    def test_full_text_filter(self):
+        dune = sample_book(title="Dune")
+
+        self.assertEqual(self.ids({"q": "dune"}), [dune.id])
+        self.assertEqual(self.ids({"q": "dune", "available": "false"}), [])
+
+    def test_invalid_filter(self):
+        res = self.client.get(BOOK_URL, {"min_fee": "cheap"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.dune = sample_book(title="Dune", author="Frank Herbert")
+        self.children = sample_book(
+            title="Children of Dune",
+            author="Frank Herbert",
+            cover=Book.CoverType.SOFT,
+            inventory=0,
+        )
+        self.about = sample_book(title="Frank Herbert", author="Dune Fan")
+        sample_book(title="Foundation", author="Isaac Asimov")
+
+    def search(self, **params):
+        res = self.client.get(SEARCH_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def assertSearchResults(self):
+        data = self.search(q="dune")
+        ids = [book["id"] for book in data["results"]]
+
+        self.assertEqual(set(ids), {self.dune.id, self.children.id, self.about.id})
+        # Title matches rank above author matches.
+        self.assertEqual(ids[-1], self.about.id)
+        self.assertEqual(data["facets"]["cover"], {"HD": 2, "ST": 1})
+        self.assertEqual(data["facets"]["available"], {"true": 2, "false": 1})
+
+        data = self.search(q="frank dune", available="true", cover="HD")
+        self.assertEqual(
+            {book["id"] for book in data["results"]}, {self.dune.id, self.about.id}
+        )
+
+    @override_settings(BOOK_SEARCH_BACKEND="postgres")
+    def test_postgres_search(self):
+        self.assertSearchResults()
+
+    @override_settings(BOOK_SEARCH_BACKEND="inverted_index")
+    def test_inverted_index_search(self):
+        self.assertSearchResults()
+
+    @override_settings(BOOK_SEARCH_BACKEND="inverted_index")
+    def test_inverted_index_sees_new_books(self):
+        self.search(q="asimov")
+        sample_book(title="I, Robot", author="Isaac Asimov")
+
+        data = self.search(q="asimov")
+
+        self.assertEqual(len(data["results"]), 2)
+
+    def test_inverted_index_of_another_process_sees_new_books(self):
+        other_process = InvertedIndexBackend()
+        self.assertEqual(len(other_process.rank("asimov")), 1)
+
+        sample_book(title="I, Robot", author="Isaac Asimov")
+
+        self.assertEqual(len(other_process.rank("asimov")), 2)
+
+    @override_settings(BOOK_SEARCH_BACKEND="inverted_index")
+    def test_inverted_index_ranks_the_best_matches_only(self):
+        with patch("books.search.RANK_LIMIT", 2):
+            data = self.search(q="dune")
+
+        self.assertEqual(
+            {book["id"] for book in data["results"]}, {self.dune.id, self.children.id}
+        )
+
+    def test_limit(self):
+        data = self.search(q="herbert", limit=1)
+
+        self.assertEqual(len(data["results"]), 1)
+        self.assertEqual(sum(data["facets"]["cover"].values()), 3)
+        self.assertFalse(data["facets"]["truncated"])
+
+    def test_next_page(self):
+        data = self.search(q="herbert", limit=2)
+        self.assertEqual(len(data["results"]), 2)
+
+        res = self.client.get(data["next"])
+
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertIsNone(res.data["next"])
+        ids = {book["id"] for book in data["results"] + res.data["results"]}
+        self.assertEqual(ids, {self.dune.id, self.children.id, self.about.id})
+
+    @override_settings(BOOK_SEARCH_BACKEND="inverted_index")
+    def test_facets_count_the_best_ranked_matches(self):
+        with patch("books.search.FACET_LIMIT", 2):
+            data = self.search(q="dune")
+
+        # The two title matches outrank the author match, a soft cover.
+        self.assertEqual(data["facets"]["cover"], {"HD": 1, "ST": 1})
+        self.assertTrue(data["facets"]["truncated"])
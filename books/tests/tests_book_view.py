@@ -53,13 +53,13 @@ class UnauthenticatedBookApiTest(TestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
 
-        self.assertEqual(response.data[0]["title"], self.book1.title)
-        self.assertEqual(response.data[0]["author"], self.book1.author)
+        self.assertEqual(response.data["results"][0]["title"], self.book1.title)
+        self.assertEqual(response.data["results"][0]["author"], self.book1.author)
 
-        self.assertEqual(response.data[1]["title"], self.book2.title)
-        self.assertEqual(response.data[1]["author"], self.book2.author)
+        self.assertEqual(response.data["results"][1]["title"], self.book2.title)
+        self.assertEqual(response.data["results"][1]["author"], self.book2.author)
 
     def test_unauthorized_user_cannot_create_book(self):
         self.url = BOOK_URL
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config import database
+
+HEALTH_URL = reverse("database-health")
+
+
+class DatabaseHealthTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_superuser("admin@admin.com", "testpass")
+        cls.user = User.objects.create_user("test@test.com", "testpass")
+
+    def get(self, user):
+        return self.client.get(
+            HEALTH_URL, HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+        )
+
+    def test_reports_the_connections_of_the_process(self):
+        response = self.get(self.admin)
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["status"], "ok")
+        self.assertGreaterEqual(body["connections"]["open"], 1)
+        self.assertEqual(body["connections"]["pooling"], "session")
+
+    def test_counts_requests(self):
+        requests = database.metrics()["requests"]
+
+        self.get(self.admin)
+        self.get(self.admin)
+
+        self.assertEqual(database.metrics()["requests"], requests + 2)
+
+    def test_staff_only(self):
+        self.assertEqual(self.get(self.user).status_code, 403)
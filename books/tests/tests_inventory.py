@@ -0,0 +1,256 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.inventory import (
+    BookUnavailable,
+    CounterInventory,
+    DatabaseInventory,
+    LocalCounterStore,
+    get_inventory,
+)
+from books.models import Book
+
+BORROWING_URL = reverse("borrowings:borrowing-list")
+
+
+def sample_book(**params):
+    defaults = {
+        "title": "Sample book",
+        "author": "Sample author",
+        "cover": Book.CoverType.HARD,
+        "inventory": 2,
+        "daily_fee": 1.50,
+    }
+    defaults.update(params)
+
+    return Book.objects.create(**defaults)
+
+
+class DatabaseInventoryTest(TestCase):
+    def setUp(self):
+        self.inventory = DatabaseInventory()
+        self.book = sample_book(inventory=1)
+
+    def test_reserve_decrements_until_empty(self):
+        self.assertTrue(self.inventory.reserve(self.book.id))
+        self.assertFalse(self.inventory.reserve(self.book.id))
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+
+    def test_release_increments(self):
+        self.inventory.release(self.book.id)
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+
+    def test_reservation_is_rolled_back_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.inventory.reservation(self.book.id):
+                raise RuntimeError
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+    def test_reservation_raises_when_unavailable(self):
+        self.book.inventory = 0
+        self.book.save()
+
+        with self.assertRaises(BookUnavailable):
+            with self.inventory.reservation(self.book.id):
+                pass
+
+
+class CounterInventoryTest(TestCase):
+    def setUp(self):
+        self.inventory = CounterInventory(LocalCounterStore())
+        self.book = sample_book(inventory=2)
+
+    def test_reserve_does_not_touch_db_until_reconcile(self):
+        self.assertTrue(self.inventory.reserve(self.book.id))
+        self.assertTrue(self.inventory.reserve(self.book.id))
+        self.assertFalse(self.inventory.reserve(self.book.id))
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+
+        self.assertEqual(self.inventory.reconcile(), 1)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+
+    def test_cancelled_reservation_returns_the_copy(self):
+        with self.assertRaises(RuntimeError):
+            with self.inventory.reservation(self.book.id):
+                raise RuntimeError
+
+        self.assertEqual(self.inventory.reconcile(), 0)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 2)
+
+    def test_forget_drops_pending_deltas(self):
+        self.inventory.reserve(self.book.id)
+        self.inventory.forget(self.book.id)
+
+        self.assertEqual(self.inventory.reconcile(), 0)
+
+    def test_reseed_keeps_pending_deltas(self):
+        self.inventory.reserve(self.book.id)
+        self.inventory.reseed(self.book.id)
+
+        self.assertTrue(self.inventory.reserve(self.book.id))
+        self.assertFalse(self.inventory.reserve(self.book.id))
+        self.assertEqual(self.inventory.reconcile(), 1)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+
+    @override_settings(INVENTORY_BACKEND="local")
+    def test_saving_a_book_keeps_its_reservations(self):
+        inventory = get_inventory()
+        inventory.reconcile()
+        self.assertTrue(inventory.reserve(self.book.id))
+
+        self.book.title = "Renamed"
+        self.book.save()
+
+        self.assertEqual(inventory.reconcile(), 1)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+
+class BorrowingReservationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+
+    @patch("borrowings.serializers.create_payment_and_stripe_session")
+    def test_cannot_borrow_unavailable_book(self, mock_payment):
+        book = sample_book(inventory=0)
+        payload = {"book": book.id, "expected_return_date": "2100-01-01"}
+
+        res = self.client.post(BORROWING_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(mock_payment.called)
+
+    @override_settings(INVENTORY_BACKEND="local")
+    @patch("borrowings.views.publish", side_effect=RuntimeError)
+    def test_copy_is_given_back_when_the_borrowing_fails_later(self, mock_publish):
+        book = sample_book(inventory=1)
+        payload = {"book": book.id, "expected_return_date": "2100-01-01"}
+
+        with self.assertRaises(RuntimeError):
+            self.client.post(BORROWING_URL, payload)
+
+        self.assertTrue(mock_publish.called)
+        inventory = get_inventory()
+        self.assertEqual(inventory.reconcile(), 0)
+        self.assertTrue(inventory.reserve(book.id))
+
+
+class ConcurrentReservationTest(TransactionTestCase):
+    def test_parallel_reservations_never_oversell(self):
+        book = sample_book(inventory=5)
+        inventory = DatabaseInventory()
+        reserved = []
+
+        def worker():
+            try:
+                for _ in range(3):
+                    if inventory.reserve(book.id):
+                        reserved.append(book.id)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        book.refresh_from_db()
+        self.assertEqual(len(reserved), 5)
+        self.assertEqual(book.inventory, 0)
+
+
+class CommittedReservationTest(TransactionTestCase):
+    def setUp(self):
+        self.inventory = CounterInventory(LocalCounterStore())
+
+    def fail(self):
+        raise RuntimeError("broker is down")
+
+    def test_failing_on_commit_hook_keeps_the_copy_taken(self):
+        book = sample_book(inventory=1)
+
+        with self.assertRaises(RuntimeError):
+            with self.inventory.reservation(book.id):
+                transaction.on_commit(self.fail)
+
+        self.assertFalse(self.inventory.reserve(book.id))
+        self.assertEqual(self.inventory.reconcile(), 1)
+
+    def test_failing_on_commit_hook_keeps_the_copies_taken(self):
+        book = sample_book(inventory=1)
+
+        with self.assertRaises(RuntimeError):
+            with self.inventory.reservations([book.id]):
+                transaction.on_commit(self.fail)
+
+        self.assertEqual(self.inventory.reserve_many([book.id]), [book.id])
+
+
+class ReserveManyTest(TestCase):
+    def setUp(self):
+        self.one = sample_book(inventory=1)
+        self.two = sample_book(inventory=2)
+
+    def assertInventory(self, one, two):
+        self.one.refresh_from_db()
+        self.two.refresh_from_db()
+        self.assertEqual((self.one.inventory, self.two.inventory), (one, two))
+
+    def test_reserves_every_copy_in_one_go(self):
+        short = DatabaseInventory().reserve_many(
+            [self.two.id, self.one.id, self.two.id]
+        )
+
+        self.assertEqual(short, [])
+        self.assertInventory(0, 0)
+
+    def test_reserves_nothing_when_a_book_is_short(self):
+        short = DatabaseInventory().reserve_many(
+            [self.one.id, self.one.id, self.two.id]
+        )
+
+        self.assertEqual(short, [self.one.id])
+        self.assertInventory(1, 2)
+
+    def test_counter_inventory_gives_back_partial_reservations(self):
+        inventory = CounterInventory(LocalCounterStore())
+
+        short = inventory.reserve_many([self.two.id, self.one.id, self.one.id])
+
+        self.assertEqual(short, [self.one.id])
+        self.assertEqual(inventory.reconcile(), 0)
+
+    def test_reservations_raise_and_roll_back(self):
+        with self.assertRaises(BookUnavailable):
+            with DatabaseInventory().reservations([self.one.id, self.one.id]):
+                pass
+
+        with self.assertRaises(RuntimeError):
+            with DatabaseInventory().reservations([self.one.id, self.two.id]):
+                raise RuntimeError
+
+        self.assertInventory(1, 2)
@@ -0,0 +1,13 @@
+from django.test import SimpleTestCase
+
+from books.management.commands.setup_periodic_tasks import PERIODIC_TASKS
+from config.celery import app
+
+
+class PeriodicTasksTests(SimpleTestCase):
+    def test_every_scheduled_task_exists(self):
+        app.loader.import_default_modules()
+
+        for spec in PERIODIC_TASKS:
+            with self.subTest(spec["name"]):
+                self.assertIn(spec["task"], app.tasks)
@@ -0,0 +1,61 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+from books.management.commands.serve import MAX_THREADS, size
+
+DATABASE = {"connect_ms": 4.0, "query_ms": 2.0, "max_connections": 100}
+
+
+class ServerSizingTests(SimpleTestCase):
+    def test_threads_cover_the_database_wait(self):
+        with self.settings(DATABASES={"default": {"CONN_MAX_AGE": 0}}):
+            sizing = size(2, DATABASE, request_cpu_ms=5, queries_per_request=3)
+
+        # 4 ms connecting and 6 ms querying per 5 ms of Python.
+        self.assertEqual(sizing["wait_ms"], 10)
+        self.assertEqual((sizing["workers"], sizing["threads"]), (2, 3))
+        self.assertEqual(sizing["connections"], 6)
+
+    def test_persistent_connections_are_not_waited_for(self):
+        databases = {"default": {"CONN_MAX_AGE": 60}}
+        with self.settings(DATABASES=databases):
+            sizing = size(1, DATABASE, request_cpu_ms=5, queries_per_request=3)
+
+        self.assertEqual(sizing["wait_ms"], 6)
+        self.assertEqual(sizing["threads"], 3)
+
+    def test_threads_are_capped(self):
+        sizing = size(1, DATABASE, request_cpu_ms=0.1, queries_per_request=10)
+
+        self.assertEqual(sizing["threads"], MAX_THREADS)
+
+    def test_connections_stay_within_the_database_limit(self):
+        database = {**DATABASE, "max_connections": 20}
+        sizing = size(64, database, request_cpu_ms=1, queries_per_request=10)
+
+        self.assertLessEqual(sizing["connections"], 16)
+        self.assertGreaterEqual(sizing["workers"], 1)
+
+    @override_settings(ASYNC_DATABASE_CONCURRENCY=10)
+    def test_asgi_workers_hold_a_connection_per_database_slot(self):
+        sizing = size(4, DATABASE, request_cpu_ms=5, queries_per_request=3, asgi=True)
+
+        self.assertEqual((sizing["workers"], sizing["threads"]), (4, 1))
+        self.assertEqual(sizing["connections"], 40)
+
+
+@patch("books.management.commands.serve.measure_database", return_value=DATABASE)
+class ServeCommandTests(SimpleTestCase):
+    def test_workers_need_a_shared_cache(self, measure_database):
+        with self.assertRaisesMessage(CommandError, "CACHE_BACKEND=redis"):
+            call_command("serve", "--workers", "2", "--dry-run", stdout=StringIO())
+
+    def test_one_worker_may_use_the_local_cache(self, measure_database):
+        stdout = StringIO()
+
+        call_command("serve", "--workers", "1", "--dry-run", stdout=stdout)
+
+        self.assertIn("1  worker(s)", stdout.getvalue())
@@ -1,14 +1,110 @@
+from django.conf import settings
+from drf_spectacular.utils import extend_schema
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from config.replicas import ReplicaReadMixin
+from . import cache as book_cache
 from .models import Book
 from .permissions import IsBookAdminOrReadOnly
-from .serializers import BookSerializer
+from .search import facet_counts, filter_books, get_search_backend
+from .serializers import BookFilterSerializer, BookSearchSerializer, BookSerializer
 
 
-class BookViewSets(viewsets.ModelViewSet):
+class BookViewSets(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [
         permissions.IsAuthenticatedOrReadOnly,
         IsBookAdminOrReadOnly,
     ]
+    replica_actions = {"list", "retrieve", "search"}
+
+    def reads_from_replica(self, request):
+        # A payload cached from a replica yet to replay a change would be
+        # served until it expired, not only until the replica caught up.
+        return not settings.BOOK_CACHE_ENABLED and super().reads_from_replica(request)
+
+    def get_filters(self):
+        if self.action == "search":
+            serializer = BookSearchSerializer(data=self.request.query_params)
+        else:
+            serializer = BookFilterSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def list_key(self):
+        return book_cache.list_key(
+            self.request.build_absolute_uri(),
+            stock=self.get_filters()["available"] is not None,
+        )
+
+    def get_queryset(self):
+        queryset = self.queryset
+
+        if self.action == "list":
+            filters = self.get_filters()
+            if filters.get("q"):
+                # Matches only; the pages stay in id order, ranked results
+                # are what /books/search/ is for.
+                queryset = get_search_backend().search(queryset, filters["q"])
+            queryset = filter_books(queryset, filters)
+
+        return queryset
+
+    @extend_schema(parameters=[BookFilterSerializer])
+    def list(self, request, *args, **kwargs):
+        payload = book_cache.get_or_set(
+            self.list_key(),
+            lambda: super(BookViewSets, self).list(request, *args, **kwargs).data,
+        )
+        return Response(book_cache.with_current_inventory(payload))
+
+    def retrieve(self, request, *args, **kwargs):
+        payload = book_cache.get_or_set(
+            book_cache.detail_key(kwargs["pk"]),
+            lambda: super(BookViewSets, self).retrieve(request, *args, **kwargs).data,
+        )
+        return Response(payload)
+
+    @extend_schema(parameters=[BookSearchSerializer])
+    @action(methods=["GET"], detail=False)
+    def search(self, request):
+        """Rank books by a title/author query, with cover type and
+        availability facet counts for the best ranked matches; ``next``
+        links the following page of results"""
+        filters = self.get_filters()
+        limit, offset = filters["limit"], filters["offset"]
+
+        def produce():
+            matches = Book.objects.order_by("id")
+            if filters.get("q"):
+                matches = get_search_backend().search(matches, filters["q"])
+            # Facets describe the matches before the facet filters narrow
+            # them down, so clients can show what each choice would give.
+            facets = facet_counts(
+                filter_books(
+                    matches,
+                    {key: filters.get(key) for key in ("min_fee", "max_fee")},
+                )
+            )
+            # One extra row tells whether a page follows.
+            books = list(filter_books(matches, filters)[offset : offset + limit + 1])
+            following = None
+            if len(books) > limit:
+                following = replace_query_param(
+                    request.build_absolute_uri(), "offset", offset + limit
+                )
+            return {
+                "results": BookSerializer(books[:limit], many=True).data,
+                "facets": facets,
+                "next": following,
+            }
+
+        return Response(
+            book_cache.get_or_set(
+                book_cache.list_key(request.build_absolute_uri(), stock=True), produce
+            )
+        )
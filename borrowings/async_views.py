@@ -0,0 +1,27 @@
+from rest_framework import permissions
+
+from config.async_api import AsyncAPIView
+from config.pagination import IdCursorPagination
+from .serializers import BorrowingListSerializer
+from .views import BorrowingViewSet
+
+
+class BorrowingList(AsyncAPIView):
+    """``GET /borrowings/`` of ``BorrowingViewSet``, with its filters."""
+
+    permission_classes = [permissions.IsAuthenticated]
+    replica_reads = True
+    sync_view = staticmethod(
+        BorrowingViewSet.as_view({"get": "list", "post": "create"})
+    )
+
+    async def get(self, request):
+        # The viewset builds the filtered queryset; nothing is read yet.
+        queryset = BorrowingViewSet(
+            request=request, action="list", kwargs={}
+        ).get_queryset()
+        paginator = IdCursorPagination()
+        page = await paginator.apaginate_queryset(queryset, request)
+        return paginator.get_paginated_response(
+            BorrowingListSerializer(page, many=True).data
+        ).data
@@ -0,0 +1,107 @@
+import statistics
+import time
+import uuid
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.views import BorrowingViewSet
+from payments.stripe_stub import fake_stripe
+
+
+class Command(BaseCommand):
+    """Django command to compare checking out N books with N single
+    POST /borrowings/ calls against one POST /borrowings/bulk/"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=8)
+        parser.add_argument("--rounds", type=int, default=30)
+        parser.add_argument(
+            "--stripe-latency",
+            type=float,
+            default=0.3,
+            help="Simulated Stripe round trip in seconds",
+        )
+
+    def handle(self, *args, **options) -> None:
+        user = get_user_model().objects.create_user(
+            f"benchmark-{uuid.uuid4().hex}@example.com", "benchmark"
+        )
+        books = [
+            Book.objects.create(
+                title=f"Benchmark book {index}",
+                author="Benchmark author",
+                cover=Book.CoverType.SOFT,
+                inventory=options["rounds"] * 2,
+                daily_fee=1,
+            )
+            for index in range(options["books"])
+        ]
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(user)
+
+        self.stdout.write(
+            f"{options['books']} books per checkout, {options['rounds']} checkouts, "
+            f"inline Stripe sessions at {options['stripe_latency'] * 1000:.0f} ms"
+        )
+        self.stdout.write(
+            f"{'mode':<8}{'p50 ms':>10}{'p99 ms':>10}{'queries':>10}{'stripe':>10}"
+        )
+        try:
+            for mode in ("single", "bulk"):
+                with override_settings(PAYMENTS_DEFERRED_SESSIONS=False), fake_stripe(
+                    options["stripe_latency"]
+                ) as stripe, patch.object(BorrowingViewSet, "throttle_classes", []):
+                    timings, queries = self.run_mode(
+                        client, books, mode, options["rounds"]
+                    )
+                percentiles = statistics.quantiles(timings, n=100)
+                self.stdout.write(
+                    f"{mode:<8}{percentiles[49] * 1000:>10.1f}"
+                    f"{percentiles[98] * 1000:>10.1f}"
+                    f"{queries / options['rounds']:>10.0f}"
+                    f"{len(stripe.calls) / options['rounds']:>10.0f}"
+                )
+        finally:
+            user.delete()
+            for book in books:
+                book.delete()
+
+    def run_mode(self, client, books, mode, rounds):
+        timings = []
+        queries = 0
+        for _ in range(rounds):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                if mode == "bulk":
+                    self.post(
+                        client,
+                        reverse("borrowings:borrowing-bulk"),
+                        {
+                            "books": [book.id for book in books],
+                            "expected_return_date": "2100-01-01",
+                        },
+                    )
+                else:
+                    for book in books:
+                        self.post(
+                            client,
+                            reverse("borrowings:borrowing-list"),
+                            {"book": book.id, "expected_return_date": "2100-01-01"},
+                        )
+                timings.append(time.perf_counter() - started)
+            queries += len(captured)
+        return timings, queries
+
+    @staticmethod
+    def post(client, url, payload):
+        response = client.post(url, payload)
+        if response.status_code != 201:
+            raise RuntimeError(f"Unexpected response: {response.data}")
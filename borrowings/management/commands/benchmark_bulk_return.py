@@ -0,0 +1,113 @@
+import datetime
+import time
+import uuid
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from borrowings.views import BorrowingViewSet
+
+
+class Command(BaseCommand):
+    """Django command to compare returning N borrowings one
+    POST /borrowings/<id>/return/ at a time against one
+    POST /borrowings/return/bulk/"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=1000)
+        parser.add_argument("--books", type=int, default=50)
+        parser.add_argument(
+            "--overdue",
+            type=float,
+            default=0.3,
+            help="Share of the borrowings that are overdue",
+        )
+
+    def handle(self, *args, **options) -> None:
+        user = get_user_model().objects.create_user(
+            f"benchmark-{uuid.uuid4().hex}@example.com", "benchmark"
+        )
+        books = Book.objects.bulk_create(
+            [
+                Book(
+                    title=f"Benchmark book {index}",
+                    author="Benchmark author",
+                    cover=Book.CoverType.SOFT,
+                    inventory=0,
+                    daily_fee=1,
+                )
+                for index in range(options["books"])
+            ]
+        )
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(user)
+
+        self.stdout.write(
+            f"{options['items']} borrowings, {options['overdue']:.0%} overdue"
+        )
+        self.stdout.write(f"{'mode':<8}{'seconds':>10}{'items/s':>10}{'queries':>10}")
+        try:
+            for mode in ("single", "bulk"):
+                ids = self.seed(user, books, options["items"], options["overdue"])
+                with override_settings(PAYMENTS_DEFERRED_SESSIONS=True), patch(
+                    "payments.tasks.create_stripe_session_for_payment.delay"
+                ), patch(
+                    "payments.tasks.create_stripe_session_for_each_payment.delay"
+                ), patch.object(
+                    BorrowingViewSet, "throttle_classes", []
+                ), CaptureQueriesContext(
+                    connection
+                ) as captured:
+                    started = time.perf_counter()
+                    self.run_mode(client, mode, ids)
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{mode:<8}{elapsed:>10.2f}{len(ids) / elapsed:>10.0f}"
+                    f"{len(captured):>10}"
+                )
+        finally:
+            user.delete()
+            Book.objects.filter(pk__in=[book.pk for book in books]).delete()
+
+    @staticmethod
+    def seed(user, books, items, overdue):
+        today = datetime.date.today()
+        borrowings = Borrowing.objects.bulk_create(
+            [
+                Borrowing(
+                    user=user,
+                    book=books[index % len(books)],
+                    expected_return_date=today
+                    - datetime.timedelta(days=3 if index < items * overdue else -3),
+                )
+                for index in range(items)
+            ]
+        )
+        return [borrowing.id for borrowing in borrowings]
+
+    @staticmethod
+    def run_mode(client, mode, ids):
+        if mode == "bulk":
+            responses = [
+                client.post(
+                    reverse("borrowings:borrowing-return-bulk"),
+                    {"borrowings": ids},
+                    format="json",
+                )
+            ]
+        else:
+            responses = [
+                client.post(reverse("borrowings:borrowing-return-book", args=[id]))
+                for id in ids
+            ]
+        for response in responses:
+            if response.status_code != 200:
+                raise RuntimeError(f"Unexpected response: {response.data}")
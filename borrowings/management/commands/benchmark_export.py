@@ -0,0 +1,98 @@
+import resource
+import time
+import uuid
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingListSerializer
+from borrowings.views import BorrowingViewSet
+from payments.views import PaymentExport
+
+ENDPOINTS = (
+    ("borrowings", "borrowings:borrowing-export", BorrowingViewSet),
+    ("payments", "payments:payment_export", PaymentExport),
+)
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    """Django command to report rows/sec and peak RSS of the streaming
+    borrowing and payment exports"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed this many borrowings (and books, payments) first",
+        )
+        parser.add_argument(
+            "--compare-list",
+            action="store_true",
+            help="Afterwards, serialize all borrowings in memory like the "
+            "unpaginated list endpoint used to, for comparison",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["seed"]:
+            call_command(
+                "seed_library",
+                books=options["seed"] // 10,
+                borrowings=options["seed"],
+                stdout=self.stdout,
+            )
+
+        admin = get_user_model().objects.create_superuser(
+            f"benchmark-{uuid.uuid4().hex}@example.com", "benchmark"
+        )
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(admin)
+
+        self.stdout.write(
+            f"{'export':<22}{'rows':>10}{'rows/s':>12}{'peak RSS MB':>14}"
+        )
+        try:
+            for name, url_name, view in ENDPOINTS:
+                for output in ("ndjson", "csv"):
+                    with patch.object(view, "throttle_classes", []):
+                        self.measure_export(
+                            client, f"{name} {output}", reverse(url_name), output
+                        )
+        finally:
+            admin.delete()
+
+        if options["compare_list"]:
+            started = time.perf_counter()
+            rows = len(
+                BorrowingListSerializer(
+                    Borrowing.objects.select_related("book"), many=True
+                ).data
+            )
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{'in-memory list':<22}{rows:>10}{rows / elapsed:>12.0f}"
+                f"{peak_rss_mb():>14.1f}"
+            )
+
+    def measure_export(self, client, name, url, output):
+        started = time.perf_counter()
+        response = client.get(url, {"output": output})
+        lines = 0
+        for chunk in response.streaming_content:
+            lines += chunk.count(b"\n")
+        elapsed = time.perf_counter() - started
+
+        rows = lines - 1 if output == "csv" else lines
+        self.stdout.write(
+            f"{name:<22}{rows:>10}{rows / elapsed:>12.0f}{peak_rss_mb():>14.1f}"
+        )
@@ -0,0 +1,112 @@
+import time
+import uuid
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.pagination import Cursor, LimitOffsetPagination
+from rest_framework.test import APIClient
+
+from books.models import Book
+from books.views import BookViewSets
+from borrowings.models import Borrowing
+from borrowings.views import BorrowingViewSet
+from config.pagination import IdCursorPagination
+from payments.models import Payment
+from payments.views import PaymentList
+
+ENDPOINTS = (
+    ("books", "books:book-list", BookViewSets, Book),
+    ("borrowings", "borrowings:borrowing-list", BorrowingViewSet, Borrowing),
+    ("payments", "payments:payment_list", PaymentList, Payment),
+)
+
+DEPTHS = (0.0, 0.5, 0.99)
+
+
+class Command(BaseCommand):
+    """Django command to compare time-to-first-byte of deep pages with
+    cursor pagination versus offset pagination"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed this many borrowings (and books, payments) first",
+        )
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options) -> None:
+        if options["seed"]:
+            call_command(
+                "seed_library",
+                books=options["seed"] // 10,
+                borrowings=options["seed"],
+                stdout=self.stdout,
+            )
+
+        admin = get_user_model().objects.create_superuser(
+            f"benchmark-{uuid.uuid4().hex}@example.com", "benchmark"
+        )
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(admin)
+
+        self.stdout.write(
+            f"{'endpoint':<12}{'rows':>10}{'depth':>8}"
+            f"{'offset ms':>12}{'cursor ms':>12}"
+        )
+        try:
+            for name, url_name, view, model in ENDPOINTS:
+                self.benchmark_endpoint(
+                    client, name, reverse(url_name), view, model, **options
+                )
+        finally:
+            admin.delete()
+
+    def benchmark_endpoint(
+        self, client, name, url, view, model, page_size, repeat, **options
+    ):
+        total = model.objects.count()
+        if not total:
+            return
+
+        with patch.object(view, "throttle_classes", []):
+            for depth in DEPTHS:
+                offset = int(total * depth)
+                position = (
+                    model.objects.order_by("id")
+                    .values_list("id", flat=True)[max(offset - 1, 0)]
+                )
+
+                with patch.object(view, "pagination_class", LimitOffsetPagination):
+                    offset_ms = self.measure(
+                        client, url, {"limit": page_size, "offset": offset}, repeat
+                    )
+
+                paginator = IdCursorPagination()
+                paginator.base_url = f"{url}?page_size={page_size}"
+                cursor_url = paginator.encode_cursor(
+                    Cursor(offset=0, reverse=False, position=str(position))
+                )
+                cursor_ms = self.measure(client, cursor_url, None, repeat)
+
+                self.stdout.write(
+                    f"{name:<12}{total:>10}{depth:>8.0%}"
+                    f"{offset_ms:>12.1f}{cursor_ms:>12.1f}"
+                )
+
+    @staticmethod
+    def measure(client, url, params, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url, params)
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} answered {response.status_code}")
+            best = elapsed if best is None else min(best, elapsed)
+        return best
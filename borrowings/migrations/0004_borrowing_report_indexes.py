@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("borrowings", "0003_borrowing_borrowing_overdue_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                fields=["borrow_date", "book"], name="borrowing_borrowed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                condition=models.Q(("actual_return_date__isnull", True)),
+                fields=["book", "expected_return_date"],
+                name="borrowing_book_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                condition=models.Q(("actual_return_date__isnull", False)),
+                fields=["actual_return_date"],
+                include=("borrow_date",),
+                name="borrowing_returned_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,109 @@
+"""Returning many borrowings at once, for drop-box processing."""
+import datetime
+
+from django.db import transaction
+
+from books.inventory import get_inventory
+from payments.fees import price_many
+from payments.models import Payment
+from payments.utils import request_stripe_sessions
+from users.summary import SummaryChanges
+
+RETURNED = "returned"
+ALREADY_RETURNED = "already_returned"
+NOT_FOUND = "not_found"
+
+
+def return_borrowings(queryset, borrowing_ids, today=None) -> list:
+    """Mark the borrowings of ``queryset`` listed in ``borrowing_ids``
+    returned and report what happened to each id, in request order.
+
+    One ``UPDATE`` returns the borrowings, one gives the copies back per
+    book, and the fines of the overdue ones are created in one batch,
+    reusing fines the nightly accrual already opened.
+    """
+    today = today or datetime.date.today()
+
+    with transaction.atomic():
+        rows = {
+            row["id"]: row
+            for row in queryset.select_for_update()
+            .filter(id__in=borrowing_ids)
+            .order_by("id")
+            .values(
+                "id",
+                "user_id",
+                "book_id",
+                "expected_return_date",
+                "actual_return_date",
+            )
+        }
+        returning = [
+            row for row in rows.values() if row["actual_return_date"] is None
+        ]
+        overdue = [row for row in returning if row["expected_return_date"] < today]
+
+        queryset.model.objects.filter(
+            id__in=[row["id"] for row in returning]
+        ).update(actual_return_date=today)
+        get_inventory().release_many([row["book_id"] for row in returning])
+        changes = SummaryChanges()
+        for row in returning:
+            changes.returned(row["user_id"], row["expected_return_date"], today)
+        fines = open_fines(overdue, changes)
+        changes.record(today)
+
+    results = []
+    for borrowing_id in borrowing_ids:
+        row = rows.get(borrowing_id)
+        result = {"id": borrowing_id, "status": RETURNED, "fine_payment_id": None}
+        if row is None:
+            result["status"] = NOT_FOUND
+        elif row["actual_return_date"] is not None:
+            result["status"] = ALREADY_RETURNED
+        else:
+            result["fine_payment_id"] = fines.get(borrowing_id)
+        results.append(result)
+    return results
+
+
+def open_fines(borrowings, changes) -> dict:
+    """Create the missing FINE payments of the overdue ``borrowings``
+    (rows with their ``id`` and ``user_id``), count them in the summary
+    ``changes`` and request their Stripe sessions after commit; returns
+    ``{borrowing id: payment id}``."""
+    if not borrowings:
+        return {}
+
+    users = {row["id"]: row["user_id"] for row in borrowings}
+    accrued = list(
+        Payment.objects.filter(
+            borrowing_id__in=users, type=Payment.TypeType.FINE
+        ).only("id", "borrowing_id", "type", "status", "amount")
+    )
+    for fine in accrued:
+        changes.payment(users[fine.borrowing_id], fine, sign=-1)
+    # Accrued fines stop growing now that the books are back.
+    Payment.objects.bulk_update(price_many(accrued), ["amount", "currency"])
+    opened = {fine.borrowing_id for fine in accrued}
+    created = Payment.objects.bulk_create(
+        price_many(
+            [
+                Payment(
+                    borrowing_id=borrowing_id,
+                    status=Payment.StatusType.PENDING,
+                    type=Payment.TypeType.FINE,
+                )
+                for borrowing_id in users
+                if borrowing_id not in opened
+            ]
+        )
+    )
+    fines = {}
+    for fine in [*accrued, *created]:
+        changes.payment(users[fine.borrowing_id], fine)
+        fines[fine.borrowing_id] = fine.id
+
+    # The task skips the fines that already have a session.
+    request_stripe_sessions(fines.values())
+    return fines
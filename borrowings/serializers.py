@@ -1,22 +1,24 @@
 import datetime
+from contextlib import contextmanager
 
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
+from books.inventory import BookUnavailable, get_inventory
 from books.serializers import BookSerializer
-from config import settings
+from books.models import Book
+from payments.fees import price
+from payments.models import Payment
 from payments.serializers import PaymentSerializer
-from payments.utils import create_payment_and_stripe_session
+from payments.utils import create_payment_and_stripe_session, request_checkout_session
 from users.serializers import UserSerializer
+from users.summary import SummaryChanges
+from config.instrumentation import TimedSerializerMixin
 from borrowings.models import Borrowing
 
 
-SUCCESS_URL = (
-    f"{settings.DOMAIN_URL}/payments/success?session_id={{CHECKOUT_SESSION_ID}}"
-)
-CANCEL_URL = f"{settings.DOMAIN_URL}/payments/cancel?session_id={{CHECKOUT_SESSION_ID}}"
-
-
-class BorrowingSerializer(serializers.ModelSerializer):
+class BorrowingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Borrowing
         fields = (
@@ -62,7 +64,7 @@ class BorrowingDetailSerializer(BorrowingSerializer):
         )
 
 
-class BorrowingCreateSerializer(serializers.ModelSerializer):
+class BorrowingCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     payments = PaymentSerializer(many=True, read_only=True)
 
     class Meta:
@@ -70,10 +72,6 @@ class BorrowingCreateSerializer(serializers.ModelSerializer):
         fields = ("id", "book", "borrow_date", "expected_return_date", "payments")
 
     def validate(self, data):
-        book = data["book"]
-        if book.inventory <= 0:
-            raise serializers.ValidationError("The book is not available.")
-
         borrow_date = datetime.date.today()
         expected_return_date = data["expected_return_date"]
 
@@ -84,23 +82,125 @@ class BorrowingCreateSerializer(serializers.ModelSerializer):
 
         return data
 
-    def create(self, validated_data):
-        book = validated_data["book"]
-        book.inventory -= 1
-        book.save()
+    @contextmanager
+    def reservation(self):
+        """Reserve the book for ``save`` and whatever is written with it,
+        in one transaction."""
+        try:
+            with get_inventory().reservation(self.validated_data["book"].id):
+                yield
+        except BookUnavailable:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: ["The book is not available."]}
+            )
 
+    def create(self, validated_data):
         borrowing = Borrowing.objects.create(**validated_data)
-        create_payment_and_stripe_session(
-            borrowing,
-            success_url=SUCCESS_URL,
-            cancel_url=CANCEL_URL,
-            payment_type="PAYMENT",
-        )
+        payment = create_payment_and_stripe_session(borrowing, payment_type="PAYMENT")
 
+        changes = SummaryChanges()
+        changes.borrowed(borrowing.user_id)
+        changes.payment(borrowing.user_id, payment)
+        changes.record()
         return borrowing
 
 
-class BorrowingReturnSerializer(serializers.ModelSerializer):
+class BorrowingBulkCreateSerializer(serializers.Serializer):
+    """Borrow several books at once, paid with one checkout session"""
+
+    MAX_BOOKS = 20
+
+    books = serializers.ListField(
+        child=serializers.PrimaryKeyRelatedField(queryset=Book.objects.all()),
+        min_length=1,
+        max_length=MAX_BOOKS,
+    )
+    expected_return_date = serializers.DateField()
+
+    def validate_expected_return_date(self, value):
+        if value < datetime.date.today():
+            raise serializers.ValidationError(
+                "The expected return date cannot be earlier than the borrow date."
+            )
+        return value
+
+    @contextmanager
+    def reservation(self):
+        """Reserve the books for ``save`` and whatever is written with
+        them, in one transaction."""
+        try:
+            with get_inventory().reservations(
+                [book.id for book in self.validated_data["books"]]
+            ):
+                yield
+        except BookUnavailable as error:
+            raise serializers.ValidationError(
+                {
+                    "books": [
+                        f"The book {book_id} is not available."
+                        for book_id in error.args
+                    ]
+                }
+            )
+
+    def create(self, validated_data):
+        books = validated_data["books"]
+        user = validated_data["user"]
+        expected_return_date = validated_data["expected_return_date"]
+
+        with transaction.atomic():
+            borrowings = Borrowing.objects.bulk_create(
+                [
+                    Borrowing(
+                        user=user,
+                        book=book,
+                        expected_return_date=expected_return_date,
+                    )
+                    for book in books
+                ]
+            )
+            payments = Payment.objects.bulk_create(
+                [
+                    price(
+                        Payment(
+                            borrowing=borrowing,
+                            status=Payment.StatusType.PENDING,
+                            type=Payment.TypeType.PAYMENT,
+                        )
+                    )
+                    for borrowing in borrowings
+                ]
+            )
+            request_checkout_session(payments)
+
+            changes = SummaryChanges()
+            for payment in payments:
+                changes.borrowed(user.id)
+                changes.payment(user.id, payment)
+            changes.record()
+
+        return borrowings
+
+    def to_representation(self, borrowings):
+        return {"borrowings": BorrowingSerializer(borrowings, many=True).data}
+
+
+class BorrowingBulkReturnSerializer(serializers.Serializer):
+    MAX_BORROWINGS = 1000
+
+    borrowings = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=MAX_BORROWINGS,
+    )
+
+    def validate_borrowings(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Borrowings must not repeat.")
+        return value
+
+
+class BorrowingReturnSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Borrowing
         fields = (
@@ -0,0 +1,161 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+
+SYNC_URLS = "config.urls"
+ASYNC_URLS = "config.async_urls"
+
+
+@override_settings(BOOK_CACHE_ENABLED=False)
+class AsyncReadViewTests(TestCase):
+    """The async views answer exactly like the DRF views they replace."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user("test@test.com", "testpass")
+        cls.other = User.objects.create_user("other@test.com", "testpass")
+        cls.admin = User.objects.create_superuser("admin@admin.com", "testpass")
+        cls.books = [
+            Book.objects.create(
+                title=f"Book {index}",
+                author="Author",
+                cover=Book.CoverType.HARD if index % 2 else Book.CoverType.SOFT,
+                inventory=index,
+                daily_fee="1.50",
+            )
+            for index in range(5)
+        ]
+        returned = datetime.date.today()
+        for index in range(25):
+            Borrowing.objects.create(
+                user=cls.other if index % 5 == 0 else cls.user,
+                book=cls.books[index % 5],
+                expected_return_date=returned + datetime.timedelta(days=3),
+                actual_return_date=returned if index % 2 else None,
+            )
+        cls.payment = Payment.objects.create(
+            borrowing=Borrowing.objects.filter(user=cls.user).first(),
+            status=Payment.StatusType.PENDING,
+            type=Payment.TypeType.PAYMENT,
+        )
+
+    def get(self, urlconf, url, user=None, **headers):
+        if user is not None:
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {AccessToken.for_user(user)}"
+        with self.settings(ROOT_URLCONF=urlconf):
+            return self.client.get(url, **headers)
+
+    def assertSameResponses(self, url, user=None, **headers):
+        expected = self.get(SYNC_URLS, url, user, **headers)
+        response = self.get(ASYNC_URLS, url, user, **headers)
+
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(
+            response.headers.get("WWW-Authenticate"),
+            expected.headers.get("WWW-Authenticate"),
+        )
+        return response
+
+    def test_book_list(self):
+        self.assertSameResponses("/books/")
+        self.assertSameResponses("/books/?cover=HD&available=true")
+        self.assertSameResponses("/books/?min_fee=abc")
+
+    @override_settings(BOOK_SEARCH_BACKEND="inverted_index")
+    def test_book_search_builds_the_index_off_the_event_loop(self):
+        cache.clear()
+        response = self.get(ASYNC_URLS, "/books/?q=book")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 5)
+        self.assertSameResponses("/books/?q=book&cover=HD")
+
+    def test_book_list_pages(self):
+        page = self.assertSameResponses("/books/?page_size=2").json()
+        while page["next"]:
+            page = self.assertSameResponses(page["next"]).json()
+            self.assertSameResponses(page["previous"])
+
+    def test_book_detail(self):
+        self.assertSameResponses(f"/books/{self.books[0].id}/")
+        self.assertSameResponses("/books/0/")
+
+    def test_borrowing_list(self):
+        self.assertSameResponses("/borrowings/")
+        page = self.assertSameResponses("/borrowings/?page_size=7", self.user).json()
+        self.assertSameResponses(page["next"], self.user)
+        self.assertSameResponses("/borrowings/?is_active=true", self.user)
+        self.assertSameResponses(
+            f"/borrowings/?user_id={self.other.id}&page_size=3", self.admin
+        )
+
+    def test_invalid_token(self):
+        self.assertSameResponses("/borrowings/", HTTP_AUTHORIZATION="Bearer nonsense")
+
+    def test_payment_detail(self):
+        url = f"/payments/{self.payment.id}/"
+        response = self.assertSameResponses(url, self.user)
+        self.assertEqual(response.json()["id"], self.payment.id)
+        self.assertSameResponses(url, self.admin)
+        self.assertEqual(self.assertSameResponses(url, self.other).status_code, 403)
+        self.assertSameResponses(url)
+        self.assertSameResponses("/payments/0/", self.user)
+
+    def test_other_methods_are_served_by_drf_views(self):
+        with self.settings(ROOT_URLCONF=ASYNC_URLS):
+            response = self.client.post(
+                "/books/",
+                {
+                    "title": "New",
+                    "author": "Author",
+                    "cover": Book.CoverType.HARD,
+                    "inventory": 1,
+                    "daily_fee": "2.00",
+                },
+                HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.admin)}",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Book.objects.filter(title="New").exists())
+
+    @override_settings(ROOT_URLCONF=ASYNC_URLS)
+    async def test_served_by_the_async_orm(self):
+        token = AccessToken.for_user(self.user)
+        response = await self.async_client.get(
+            "/borrowings/", headers={"authorization": f"Bearer {token}"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 20)
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLS, BOOK_CACHE_ENABLED=True)
+class AsyncBookCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.book = Book.objects.create(
+            title="Cached",
+            author="Author",
+            cover=Book.CoverType.HARD,
+            inventory=1,
+            daily_fee="1.00",
+        )
+
+    def test_payloads_are_shared_with_the_drf_views(self):
+        url = f"/books/{self.book.id}/"
+        self.client.get(url)
+
+        with self.assertNumQueries(0), self.settings(ROOT_URLCONF=SYNC_URLS):
+            self.assertEqual(self.client.get(url).json()["title"], "Cached")
+
+        self.book.title = "Renamed"
+        self.book.save()
+        self.assertEqual(self.client.get(url).json()["title"], "Renamed")
@@ -1,7 +1,9 @@
-from unittest.mock import patch
+import json
+import threading
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -12,10 +14,13 @@ from borrowings.serializers import (
     BorrowingListSerializer,
     BorrowingDetailSerializer,
 )
+from notification.models import OutboxEvent
+from notification.outbox import BORROWING_CREATED
 from payments.models import Payment
 
 
 BORROWING_URL = reverse("borrowings:borrowing-list")
+EXPORT_URL = reverse("borrowings:borrowing-export")
 
 
 def detail_url(borrowing_id):
@@ -85,9 +90,9 @@ class AuthenticatedBorrowingApiTests(TestCase):
         serializer_3 = BorrowingListSerializer(bor3)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer_1.data, res.data)
-        self.assertIn(serializer_2.data, res.data)
-        self.assertNotIn(serializer_3.data, res.data)
+        self.assertIn(serializer_1.data, res.data["results"])
+        self.assertIn(serializer_2.data, res.data["results"])
+        self.assertNotIn(serializer_3.data, res.data["results"])
 
     def test_list_filter_by_is_active_true(self):
         book = sample_book(inventory=2)
@@ -104,8 +109,8 @@ class AuthenticatedBorrowingApiTests(TestCase):
         serializer_2 = BorrowingListSerializer(bor2)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertNotIn(serializer_1.data, res.data)
-        self.assertIn(serializer_2.data, res.data)
+        self.assertNotIn(serializer_1.data, res.data["results"])
+        self.assertIn(serializer_2.data, res.data["results"])
 
     def test_list_filter_by_is_active_false(self):
         book = sample_book(inventory=3)
@@ -122,8 +127,24 @@ class AuthenticatedBorrowingApiTests(TestCase):
         serializer_2 = BorrowingListSerializer(borrowing2)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer_1.data, res.data)
-        self.assertNotIn(serializer_2.data, res.data)
+        self.assertIn(serializer_1.data, res.data["results"])
+        self.assertNotIn(serializer_2.data, res.data["results"])
+
+    def test_list_is_paginated_by_cursor(self):
+        book = sample_book(inventory=10)
+        borrowings = [sample_borrowing(self.user, book) for _ in range(5)]
+
+        res = self.client.get(BORROWING_URL, {"page_size": 2})
+        pages = [res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            pages.append(res.data["results"])
+
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(
+            [item["id"] for page in pages for item in page],
+            [borrowing.id for borrowing in borrowings],
+        )
 
     def test_retrieve_borrowings_if_its_his(self):
         book = sample_book()
@@ -173,16 +194,19 @@ class AuthenticatedBorrowingApiTests(TestCase):
             "book": book.id,
             "expected_return_date": "2023-06-28",
         }
-        with patch("notification.tasks.send_to_chat_borrowing_book.delay") as mock_task:
-            res = self.client.post(BORROWING_URL, payload)
+        res = self.client.post(BORROWING_URL, payload)
 
-            payment = Payment.objects.first()
-            book = Book.objects.get(id=book.id)
+        payment = Payment.objects.first()
+        book = Book.objects.get(id=book.id)
 
-            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
-            self.assertEqual(mock_task.called, True)
-            self.assertEqual(res.data["payments"][0]["stripe_session_url"], payment.stripe_session_url)
-            self.assertEqual(book.inventory, 4)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            OutboxEvent.objects.filter(
+                topic=BORROWING_CREATED, payload__book_id=book.id
+            ).exists()
+        )
+        self.assertEqual(res.data["payments"][0]["stripe_session_url"], payment.stripe_session_url)
+        self.assertEqual(book.inventory, 4)
 
     def test_return_book(self):
         book = sample_book(inventory=4)
@@ -197,6 +221,33 @@ class AuthenticatedBorrowingApiTests(TestCase):
         self.assertEqual(book.inventory, 5)
 
 
+class ConcurrentReturnTests(TransactionTestCase):
+    def test_a_borrowing_is_returned_once(self):
+        user = get_user_model().objects.create_user("test@test.com", "testpass")
+        book = sample_book(inventory=4)
+        borrowing = sample_borrowing(user, book, expected_return_date="2100-01-01")
+        url = reverse("borrowings:borrowing-return-book", args=[borrowing.id])
+        statuses = []
+
+        def return_book():
+            try:
+                client = APIClient()
+                client.force_authenticate(user)
+                statuses.append(client.post(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=return_book) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        book.refresh_from_db()
+        self.assertEqual(sorted(statuses), [200, 400, 400, 400])
+        self.assertEqual(book.inventory, 5)
+
+
 class AdminBorrowingTests(TestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -236,7 +287,7 @@ class AdminBorrowingTests(TestCase):
         serializer = BorrowingListSerializer(borrowings, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_list_borrowings_filter_by_is_active(self):
         book_1 = sample_book()
@@ -257,9 +308,9 @@ class AdminBorrowingTests(TestCase):
         serializer_3 = BorrowingListSerializer(borrowing3)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer_1.data, res.data)
-        self.assertIn(serializer_2.data, res.data)
-        self.assertNotIn(serializer_3.data, res.data)
+        self.assertIn(serializer_1.data, res.data["results"])
+        self.assertIn(serializer_2.data, res.data["results"])
+        self.assertNotIn(serializer_3.data, res.data["results"])
 
     def test_list_borrowings_filter_by_user_id(self):
         book_1 = sample_book()
@@ -280,9 +331,9 @@ class AdminBorrowingTests(TestCase):
         serializer_3 = BorrowingListSerializer(borrowing3)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer_1.data, res.data)
-        self.assertNotIn(serializer_2.data, res.data)
-        self.assertNotIn(serializer_3.data, res.data)
+        self.assertIn(serializer_1.data, res.data["results"])
+        self.assertNotIn(serializer_2.data, res.data["results"])
+        self.assertNotIn(serializer_3.data, res.data["results"])
 
     def test_admin_retrieve_any_borrowing(self):
         book = sample_book()
@@ -295,3 +346,51 @@ class AdminBorrowingTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
+
+
+class BorrowingExportTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.other = get_user_model().objects.create_user(
+            "other@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.book = sample_book(title="Exported", inventory=5)
+
+    def test_export_streams_ndjson_with_list_filters(self):
+        active = sample_borrowing(self.user, self.book)
+        sample_borrowing(self.user, self.book, actual_return_date="2023-05-01")
+        sample_borrowing(self.other, self.book)
+
+        res = self.client.get(EXPORT_URL, {"is_active": "true"})
+        rows = [
+            json.loads(line)
+            for line in b"".join(res.streaming_content).decode().splitlines()
+        ]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertEqual([row["id"] for row in rows], [active.id])
+        self.assertEqual(rows[0]["book_title"], "Exported")
+        self.assertEqual(rows[0]["expected_return_date"], "2023-04-30")
+
+    def test_export_csv(self):
+        borrowing = sample_borrowing(self.user, self.book)
+
+        res = self.client.get(EXPORT_URL, {"output": "csv"})
+        lines = b"".join(res.streaming_content).decode().splitlines()
+
+        self.assertEqual(res["Content-Type"], "text/csv")
+        self.assertEqual(lines[0].split(",")[:2], ["id", "user_id"])
+        self.assertEqual(lines[1].split(",")[0], str(borrowing.id))
+        self.assertEqual(len(lines), 2)
+
+    def test_export_rejects_unknown_output(self):
+        res = self.client.get(EXPORT_URL, {"output": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
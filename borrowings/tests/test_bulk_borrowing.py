@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from notification.models import OutboxEvent
+from notification.outbox import BORROWINGS_CREATED
+from payments.models import Payment
+from payments.stripe_stub import fake_stripe
+
+BULK_URL = reverse("borrowings:borrowing-bulk")
+
+
+def sample_book(**params):
+    defaults = {
+        "title": "Sample book",
+        "author": "Sample author",
+        "cover": Book.CoverType.HARD,
+        "inventory": 2,
+        "daily_fee": 1.50,
+    }
+    defaults.update(params)
+
+    return Book.objects.create(**defaults)
+
+
+class BulkBorrowingTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client.force_authenticate(self.user)
+        self.books = [sample_book(title=f"Book {index}") for index in range(3)]
+        self.payload = {
+            "books": [book.id for book in self.books],
+            "expected_return_date": "2100-01-01",
+        }
+
+    @override_settings(PAYMENTS_DEFERRED_SESSIONS=False)
+    def test_bulk_checkout_shares_one_stripe_session(self):
+        with fake_stripe() as stripe:
+            with self.captureOnCommitCallbacks() as callbacks:
+                res = self.client.post(BULK_URL, self.payload)
+            # Stripe is called once the books are no longer locked.
+            self.assertEqual(stripe.calls, [])
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["borrowings"]), 3)
+        self.assertEqual(len(stripe.calls), 1)
+        self.assertEqual(len(stripe.calls[0]["line_items"]), 3)
+        self.assertEqual(
+            Payment.objects.values("stripe_session_id").distinct().count(), 1
+        )
+        self.assertEqual(
+            list(Book.objects.order_by("id").values_list("inventory", flat=True)),
+            [1, 1, 1],
+        )
+
+        session_id = Payment.objects.first().stripe_session_id
+        with fake_stripe() as stripe:
+            stripe.sessions[session_id] = {"id": session_id, "payment_status": "paid"}
+            self.client.get(
+                reverse("payments:payment_success"), {"session_id": session_id}
+            )
+        self.assertEqual(
+            Payment.objects.filter(status=Payment.StatusType.PAID).count(), 3
+        )
+
+    @override_settings(PAYMENTS_DEFERRED_SESSIONS=True)
+    def test_bulk_checkout_queues_one_session_task_and_one_event(self):
+        with patch(
+            "payments.tasks.create_stripe_session_for_payments.delay"
+        ) as mock_task, self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(BULK_URL, self.payload)
+
+        payment_ids = list(Payment.objects.order_by("id").values_list("id", flat=True))
+        mock_task.assert_called_once_with(payment_ids)
+        self.assertIn(
+            reverse("payments:payment_session", args=[payment_ids[0]]),
+            res.data["link"],
+        )
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.topic, BORROWINGS_CREATED)
+        self.assertEqual(event.payload["book_ids"], self.payload["books"])
+
+    def test_nothing_is_borrowed_when_a_book_is_unavailable(self):
+        Book.objects.filter(pk=self.books[1].pk).update(inventory=0)
+
+        res = self.client.post(BULK_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(self.books[1].id), res.data["books"][0])
+        self.assertFalse(Borrowing.objects.exists())
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(
+            list(Book.objects.order_by("id").values_list("inventory", flat=True)),
+            [2, 0, 2],
+        )
+
+    def test_too_many_books_are_rejected(self):
+        self.payload["books"] = [self.books[0].id] * 21
+
+        res = self.client.post(BULK_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
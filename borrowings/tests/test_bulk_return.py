@@ -0,0 +1,152 @@
+import datetime
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+from payments.tasks import accrue_overdue_fines
+
+RETURN_BULK_URL = reverse("borrowings:borrowing-return-bulk")
+TODAY = datetime.date.today()
+
+
+def sample_book(**params):
+    defaults = {
+        "title": "Sample book",
+        "author": "Sample author",
+        "cover": Book.CoverType.HARD,
+        "inventory": 0,
+        "daily_fee": 1.50,
+    }
+    defaults.update(params)
+
+    return Book.objects.create(**defaults)
+
+
+@override_settings(PAYMENTS_DEFERRED_SESSIONS=True)
+class BulkReturnTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client.force_authenticate(self.user)
+        self.book = sample_book()
+        self.other_book = sample_book()
+
+    def borrow(self, book=None, overdue_days=0, user=None, returned=False):
+        return Borrowing.objects.create(
+            user=user or self.user,
+            book=book or self.book,
+            expected_return_date=TODAY - datetime.timedelta(days=overdue_days),
+            actual_return_date=TODAY if returned else None,
+        )
+
+    def post(self, ids, url=RETURN_BULK_URL):
+        with patch(
+            "payments.tasks.create_stripe_session_for_each_payment.delay"
+        ) as self.session_task, self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, {"borrowings": ids}, format="json")
+
+    def test_returns_in_bulk_with_per_item_results(self):
+        on_time = self.borrow()
+        late = self.borrow(self.other_book, overdue_days=2)
+        also_late = self.borrow(overdue_days=1)
+        done = self.borrow(returned=True)
+        other_user = get_user_model().objects.create_user("o@o.com", "x")
+        foreign = self.borrow(user=other_user)
+        ids = [on_time.id, late.id, done.id, 999999, foreign.id, also_late.id]
+
+        res = self.post(ids)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in res.data["results"]],
+            [
+                "returned",
+                "returned",
+                "already_returned",
+                "not_found",
+                "not_found",
+                "returned",
+            ],
+        )
+        self.assertEqual((res.data["returned"], res.data["fines"]), (3, 2))
+
+        self.book.refresh_from_db()
+        self.other_book.refresh_from_db()
+        self.assertEqual((self.book.inventory, self.other_book.inventory), (2, 1))
+        self.assertEqual(Borrowing.objects.filter(actual_return_date=TODAY).count(), 4)
+
+        fines = Payment.objects.filter(type=Payment.TypeType.FINE)
+        self.assertEqual(
+            sorted(fines.values_list("borrowing_id", flat=True)),
+            [late.id, also_late.id],
+        )
+        self.session_task.assert_called_once()
+        self.assertEqual(
+            sorted(self.session_task.call_args.args[0]),
+            sorted(fines.values_list("id", flat=True)),
+        )
+        self.assertEqual(sorted(fine.money_to_pay for fine in fines), [3, 6])
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        counts = []
+        for size in (2, 10):
+            ids = [self.borrow(overdue_days=1).id for _ in range(size)]
+            with CaptureQueriesContext(connection) as captured:
+                self.post(ids)
+            counts.append(len(captured))
+
+        self.assertEqual(counts[0], counts[1])
+
+    @override_settings(PAYMENTS_DEFERRED_SESSIONS=False)
+    def test_stripe_is_not_called_while_the_borrowings_are_locked(self):
+        late = self.borrow(overdue_days=2)
+
+        with patch("payments.utils.create_stripe_session") as create_session:
+            self.post([late.id])
+
+        create_session.assert_not_called()
+        self.session_task.assert_called_once_with(
+            [Payment.objects.get(borrowing=late).id]
+        )
+
+    def test_list_filters_do_not_narrow_the_returned_borrowings(self):
+        borrowing = self.borrow()
+
+        res = self.post([borrowing.id], url=f"{RETURN_BULK_URL}?is_active=false")
+
+        self.assertEqual(res.data["returned"], 1)
+
+    def test_accrued_fines_are_reused(self):
+        late = self.borrow(overdue_days=2)
+        accrue_overdue_fines()
+        fine = Payment.objects.get()
+
+        res = self.post([late.id])
+
+        self.assertEqual(res.data["results"][0]["fine_payment_id"], fine.id)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_admin_can_return_anyones_borrowings(self):
+        admin = get_user_model().objects.create_superuser("admin@a.com", "x")
+        self.client.force_authenticate(admin)
+        borrowing = self.borrow()
+
+        res = self.post([borrowing.id])
+
+        self.assertEqual(res.data["returned"], 1)
+
+    def test_repeated_ids_are_rejected(self):
+        borrowing = self.borrow()
+
+        res = self.post([borrowing.id, borrowing.id])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,188 @@
+import datetime
+import os
+import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from borrowings.models import Borrowing
+from config import instrumentation
+from payments.stripe_stub import fake_stripe
+
+METRICS_URL = reverse("metrics")
+BORROWINGS = ("borrowings:borrowing-list", "GET")
+LABELS = 'endpoint="borrowings:borrowing-list",method="GET"'
+
+
+class FakeRedis:
+    """The hash commands of the redis metrics store, shared by the
+    processes of a test."""
+
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+        self.down = False
+        self.queued = []
+
+    def pipeline(self, transaction=True):
+        self.queued = []
+        return self
+
+    def hincrbyfloat(self, key, field, value):
+        self.queued.append((key, field.encode(), value))
+
+    def execute(self):
+        if self.down:
+            raise ConnectionError("redis is down")
+        for key, field, value in self.queued:
+            values = self.hashes[key]
+            values[field] = str(float(values.get(field, 0)) + value).encode()
+
+    def hgetall(self, key):
+        return dict(self.hashes[key])
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user("test@test.com", "testpass")
+        cls.admin = User.objects.create_superuser("admin@admin.com", "testpass")
+        book = Book.objects.create(
+            title="Book",
+            author="Author",
+            cover=Book.CoverType.HARD,
+            inventory=3,
+            daily_fee="1.50",
+        )
+        for _ in range(3):
+            Borrowing.objects.create(
+                user=cls.user,
+                book=book,
+                expected_return_date=datetime.date.today() + datetime.timedelta(days=3),
+            )
+
+    def setUp(self):
+        instrumentation.reset()
+
+    def get(self, url, user):
+        return self.client.get(
+            url, HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+        )
+
+    def test_records_latency_queries_and_serializers_per_endpoint(self):
+        self.assertEqual(self.get("/borrowings/", self.user).status_code, 200)
+        self.get("/borrowings/", self.user)
+
+        endpoint = instrumentation._endpoints[BORROWINGS]
+        self.assertEqual(endpoint.count, 2)
+        self.assertEqual(sum(endpoint.buckets), 2)
+        self.assertEqual(endpoint.statuses, {200: 2})
+        self.assertGreater(endpoint.calls["db"], 0)
+        self.assertGreater(endpoint.sections["db"], 0)
+        # The page is serialized as one list, not once per row.
+        self.assertEqual(endpoint.calls["serializer"], 2)
+        self.assertLess(endpoint.sections["serializer"], endpoint.seconds)
+
+    @contextmanager
+    def request(self):
+        """Time as in a request."""
+        timings = instrumentation.Timings()
+        token = instrumentation._current.set(timings)
+        try:
+            yield timings
+        finally:
+            instrumentation._current.reset(token)
+
+    def test_times_stripe_calls(self):
+        with self.request() as timings, fake_stripe() as stripe_fake:
+            stripe_fake.gateway.create_checkout_session(mode="payment", line_items=[])
+
+        self.assertEqual(timings.calls["stripe"], 1)
+        self.assertEqual(instrumentation._external_calls["stripe"], 1)
+
+    def test_nested_sections_are_counted_once(self):
+        with self.request() as timings:
+            with instrumentation.timed("telegram"), instrumentation.timed("telegram"):
+                pass
+
+        self.assertEqual(timings.calls["telegram"], 1)
+        self.assertEqual(instrumentation._external_calls["telegram"], 1)
+
+    def test_exposes_prometheus_metrics_to_staff(self):
+        self.get("/borrowings/", self.user)
+
+        self.assertEqual(self.get(METRICS_URL, self.user).status_code, 403)
+        response = self.get(METRICS_URL, self.admin)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn("# TYPE library_http_request_duration_seconds histogram", body)
+        labels = 'endpoint="borrowings:borrowing-list",method="GET"'
+        self.assertIn(
+            f'library_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1',
+            body,
+        )
+        self.assertIn(
+            f"library_http_request_duration_seconds_count{{{labels}}} 1", body
+        )
+        self.assertIn(f'library_http_requests_total{{{labels},status="200"}} 1', body)
+
+    def scrape(self):
+        response = self.get(METRICS_URL, self.admin)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    @override_settings(METRICS_PUSH_INTERVAL=0)
+    def test_redis_store_adds_the_workers_up(self):
+        store = instrumentation.RedisMetricsStore(FakeRedis())
+        with patch.object(instrumentation, "get_metrics_store", return_value=store):
+            self.get("/borrowings/", self.user)
+            # Pushed: the next worker to answer starts from nothing.
+            self.assertEqual(instrumentation._endpoints, {})
+            self.get("/borrowings/", self.user)
+            first = self.scrape()
+            self.get("/borrowings/", self.user)
+            second = self.scrape()
+
+        self.assertIn(
+            f"library_http_request_duration_seconds_count{{{LABELS}}} 2", first
+        )
+        self.assertIn(f'library_http_requests_total{{{LABELS},status="200"}} 3', second)
+
+    @override_settings(METRICS_PUSH_INTERVAL=0)
+    def test_counters_wait_for_redis_to_come_back(self):
+        client = FakeRedis()
+        store = instrumentation.RedisMetricsStore(client)
+        with patch.object(instrumentation, "get_metrics_store", return_value=store):
+            client.down = True
+            self.assertEqual(self.get("/borrowings/", self.user).status_code, 200)
+            client.down = False
+            self.get("/borrowings/", self.user)
+            body = self.scrape()
+
+        self.assertIn(
+            f"library_http_request_duration_seconds_count{{{LABELS}}} 2", body
+        )
+
+    def test_writes_sampled_profiles(self):
+        with tempfile.TemporaryDirectory() as profile_dir, override_settings(
+            PROFILE_SAMPLE_RATE=1, PROFILE_DIR=profile_dir
+        ):
+            self.get("/borrowings/", self.user)
+            profiles = os.listdir(profile_dir)
+
+        self.assertEqual(len(profiles), 1)
+        self.assertIn("borrowings.borrowing-list", profiles[0])
+        self.assertTrue(profiles[0].endswith(".prof"))
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        self.get("/borrowings/", self.user)
+
+        self.assertEqual(instrumentation._endpoints, {})
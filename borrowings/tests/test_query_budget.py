@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+
+BOOK_URL = reverse("books:book-list")
+BORROWING_URL = reverse("borrowings:borrowing-list")
+PAYMENT_URL = reverse("payments:payment_list")
+
+# Queries allowed per request, no matter how large the page is.
+LIST_QUERY_BUDGET = 1
+DETAIL_QUERY_BUDGET = 2
+
+SIZES = (1, 5, 25)
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@admin.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+
+    def seed(self, count):
+        Borrowing.objects.all().delete()
+        Book.objects.all().delete()
+        for index in range(count):
+            book = Book.objects.create(
+                title=f"Book {index}",
+                author="Author",
+                cover=Book.CoverType.HARD,
+                inventory=5,
+                daily_fee=1,
+            )
+            borrowing = Borrowing.objects.create(
+                user=self.user,
+                book=book,
+                expected_return_date="2023-04-30",
+                actual_return_date="2023-05-02",
+            )
+            Payment.objects.create(
+                borrowing=borrowing,
+                status=Payment.StatusType.PAID,
+                type=Payment.TypeType.PAYMENT,
+            )
+            Payment.objects.create(
+                borrowing=borrowing,
+                status=Payment.StatusType.PENDING,
+                type=Payment.TypeType.FINE,
+            )
+        return borrowing
+
+    def assertWithinBudget(self, url, budget, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+        return res
+
+    def test_book_list(self):
+        for size in SIZES:
+            with self.subTest(size=size):
+                self.seed(size)
+                res = self.assertWithinBudget(
+                    BOOK_URL, LIST_QUERY_BUDGET, {"page_size": size}
+                )
+                self.assertEqual(len(res.data["results"]), size)
+
+    def test_borrowing_list(self):
+        for size in SIZES:
+            with self.subTest(size=size):
+                self.seed(size)
+                res = self.assertWithinBudget(
+                    BORROWING_URL, LIST_QUERY_BUDGET, {"page_size": size}
+                )
+                self.assertEqual(len(res.data["results"]), size)
+
+    def test_borrowing_list_for_staff_filtered_by_user(self):
+        self.client.force_authenticate(self.admin)
+        for size in SIZES:
+            with self.subTest(size=size):
+                self.seed(size)
+                self.assertWithinBudget(
+                    BORROWING_URL,
+                    LIST_QUERY_BUDGET,
+                    {
+                        "user_id": self.user.id,
+                        "is_active": "false",
+                        "page_size": size,
+                    },
+                )
+
+    def test_borrowing_detail(self):
+        borrowing = self.seed(1)
+        url = reverse("borrowings:borrowing-detail", args=[borrowing.id])
+
+        res = self.assertWithinBudget(url, DETAIL_QUERY_BUDGET)
+
+        self.assertEqual(len(res.data["payments"]), 2)
+        self.assertEqual(res.data["book"]["title"], borrowing.book.title)
+
+    def test_payment_list(self):
+        for size in SIZES:
+            with self.subTest(size=size):
+                self.seed(size)
+                res = self.assertWithinBudget(
+                    PAYMENT_URL, LIST_QUERY_BUDGET, {"page_size": size * 2}
+                )
+                self.assertEqual(len(res.data["results"]), size * 2)
+
+    def test_payment_detail(self):
+        borrowing = self.seed(1)
+        payment = borrowing.payments.first()
+        url = reverse("payments:payment_detail", args=[payment.id])
+
+        self.assertWithinBudget(url, LIST_QUERY_BUDGET)
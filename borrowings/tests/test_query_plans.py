@@ -0,0 +1,69 @@
+import datetime
+import re
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from borrowings.models import Borrowing
+from payments.models import Payment
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are PostgreSQL's")
+class HotQueryPlanTests(TestCase):
+    """Check on a seeded library that each hot query is served by an index
+    rather than a sequential scan of the table"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "seed_library",
+            books=2_000,
+            users=500,
+            borrowings=50_000,
+            stdout=StringIO(),
+        )
+        cls.active = Borrowing.objects.filter(actual_return_date__isnull=True).first()
+        cls.payment = Payment.objects.first()
+        Payment.objects.filter(pk=cls.payment.pk).update(
+            stripe_session_id="cs_test_plan"
+        )
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+
+        self.assertNotRegex(
+            plan, r"Seq Scan on (borrowings_borrowing|payments_payment)", plan
+        )
+        self.assertRegex(
+            plan, rf"Index (Only )?Scan (using|on) \S*{re.escape(index_name)}", plan
+        )
+
+    def test_overdue_scan_uses_partial_index(self):
+        queryset = Borrowing.objects.filter(
+            actual_return_date__isnull=True,
+            expected_return_date__lt=datetime.date.today(),
+        )
+
+        self.assertUsesIndex(queryset, "borrowing_overdue_idx")
+
+    def test_active_borrowings_of_user_use_partial_index(self):
+        queryset = Borrowing.objects.filter(
+            user=self.active.user_id, actual_return_date__isnull=True
+        ).order_by("id")[:20]
+
+        self.assertUsesIndex(queryset, "borrowing_user_active_idx")
+
+    def test_payment_by_type_uses_unique_constraint(self):
+        queryset = Payment.objects.filter(
+            borrowing=self.payment.borrowing_id, type=self.payment.type
+        )
+
+        self.assertUsesIndex(queryset, "unique_payment_type_per_borrowing")
+
+    def test_payment_by_stripe_session_uses_index(self):
+        queryset = Payment.objects.filter(stripe_session_id="cs_test_plan")
+
+        self.assertUsesIndex(queryset, "stripe_session_id")
@@ -0,0 +1,148 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from borrowings.models import Borrowing
+from config.replicas import replica_reads
+from payments.models import Payment
+
+REPLICA = "replica"
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], BOOK_CACHE_ENABLED=False)
+class ReplicaRoutingTests(TransactionTestCase):
+    """A second connection to the test database stands in for a replica;
+    the test data is committed so that it can read it."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings[REPLICA] = dict(connections["default"].settings_dict)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user("test@test.com", "testpass")
+        self.admin = User.objects.create_superuser("admin@admin.com", "testpass")
+        self.book = Book.objects.create(
+            title="Book",
+            author="Author",
+            cover=Book.CoverType.HARD,
+            inventory=3,
+            daily_fee="1.50",
+        )
+        self.borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=datetime.date.today() + datetime.timedelta(days=3),
+        )
+
+    def get(self, url, user, **extra):
+        return self.client.get(
+            url, HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}", **extra
+        )
+
+    def assertReadFrom(self, alias, url, user, tables=(), **extra):
+        other = "default" if alias == REPLICA else REPLICA
+        with CaptureQueriesContext(connections[alias]) as used, CaptureQueriesContext(
+            connections[other]
+        ) as unused:
+            response = self.get(url, user, **extra)
+        self.assertEqual(response.status_code, 200)
+        for table in tables:
+            self.assertTrue(any(table in query["sql"] for query in used), table)
+            self.assertFalse(any(table in query["sql"] for query in unused), table)
+        return response
+
+    def test_listings_read_from_a_replica(self):
+        response = self.assertReadFrom(
+            REPLICA, "/borrowings/", self.user, ["borrowings_borrowing"]
+        )
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertReadFrom(REPLICA, "/books/", self.user, ["books_book"])
+        self.assertReadFrom(REPLICA, "/payments/", self.admin, ["payments_payment"])
+
+    def test_other_actions_read_from_the_primary(self):
+        self.assertReadFrom(
+            "default",
+            f"/borrowings/{self.borrowing.id}/",
+            self.user,
+            ["borrowings_borrowing"],
+        )
+
+    def test_writers_read_their_writes_from_the_primary(self):
+        response = self.client.post(
+            "/books/",
+            {
+                "title": "New",
+                "author": "Author",
+                "cover": Book.CoverType.SOFT,
+                "inventory": 1,
+                "daily_fee": "2.00",
+            },
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.admin)}",
+        )
+        self.assertEqual(response.status_code, 201)
+
+        self.assertReadFrom("default", "/books/", self.admin, ["books_book"])
+        self.assertReadFrom(REPLICA, "/books/", self.user, ["books_book"])
+
+    def test_writers_stay_pinned_on_a_worker_with_another_cache(self):
+        self.client.post(
+            "/books/",
+            {
+                "title": "New",
+                "author": "Author",
+                "cover": Book.CoverType.SOFT,
+                "inventory": 1,
+                "daily_fee": "2.00",
+            },
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.admin)}",
+        )
+
+        other_worker = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "other-worker",
+            }
+        }
+        with self.settings(CACHES=other_worker):
+            self.assertReadFrom("default", "/books/", self.admin, ["books_book"])
+            # The signed cookie pins them, not the cache.
+            self.client.cookies.clear()
+            self.assertReadFrom(REPLICA, "/books/", self.admin, ["books_book"])
+
+    @override_settings(BOOK_CACHE_ENABLED=True)
+    def test_cached_book_payloads_are_read_from_the_primary(self):
+        self.assertReadFrom("default", "/books/", self.user, ["books_book"])
+
+    @override_settings(ROOT_URLCONF="config.async_urls")
+    def test_async_listings_read_from_a_replica(self):
+        self.assertReadFrom(
+            REPLICA, "/borrowings/", self.user, ["borrowings_borrowing"]
+        )
+
+    def test_writes_and_locks_use_the_primary(self):
+        with replica_reads():
+            self.assertEqual(Payment.objects.all().db, REPLICA)
+            self.assertEqual(Payment.objects.select_for_update().db, "default")
+            self.assertEqual(
+                Book.objects.filter(pk=self.book.pk).update(inventory=2), 1
+            )
+            # Related rows come from where the instance came from.
+            borrowing = Borrowing.objects.using("default").get(pk=self.borrowing.pk)
+            self.assertEqual(borrowing.book._state.db, "default")
+        self.assertEqual(Payment.objects.all().db, "default")
@@ -1,7 +1,9 @@
 import datetime
 
 from django.db import transaction
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
@@ -10,28 +12,42 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
-from config import settings
-from notification.tasks import send_to_chat_borrowing_book
+from books.inventory import get_inventory
+from config.exports import EXPORT_FORMATS, export_response
+from config.replicas import ReplicaReadMixin
+from notification.outbox import BORROWING_CREATED, BORROWINGS_CREATED, publish
 
-from payments.utils import create_payment_and_stripe_session
+from payments.fees import reprice
+from payments.models import Payment
+from payments.utils import create_payment_and_stripe_session, request_stripe_session
+from users.summary import SummaryChanges
 from .models import Borrowing
+from .returns import RETURNED, return_borrowings
 from .serializers import (
     BorrowingSerializer,
     BorrowingListSerializer,
     BorrowingDetailSerializer,
     BorrowingCreateSerializer,
+    BorrowingBulkCreateSerializer,
+    BorrowingBulkReturnSerializer,
     BorrowingReturnSerializer,
 )
 from .permissions import IsTheUser
 
-
-SUCCESS_URL = (
-    f"{settings.DOMAIN_URL}/payments/success?session_id={{CHECKOUT_SESSION_ID}}"
-)
-CANCEL_URL = f"{settings.DOMAIN_URL}/payments/cancel?session_id={{CHECKOUT_SESSION_ID}}"
+EXPORT_FIELDS = {
+    "id": "id",
+    "user_id": "user_id",
+    "user_email": "user__email",
+    "book_id": "book_id",
+    "book_title": "book__title",
+    "borrow_date": "borrow_date",
+    "expected_return_date": "expected_return_date",
+    "actual_return_date": "actual_return_date",
+}
 
 
 class BorrowingViewSet(
+    ReplicaReadMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
@@ -42,9 +58,26 @@ class BorrowingViewSet(
     permission_classes = [
         permissions.IsAuthenticated,
     ]
+    replica_actions = {"list"}
 
     def get_queryset(self):
         queryset = self.queryset
+
+        if self.action == "list":
+            queryset = queryset.select_related("book").only(
+                "id",
+                "user",
+                "book__title",
+                "borrow_date",
+                "expected_return_date",
+                "actual_return_date",
+            )
+
+        if self.action == "retrieve":
+            queryset = queryset.select_related("book", "user").prefetch_related(
+                Prefetch("payments", queryset=Payment.objects.order_by("id"))
+            )
+
         is_active_filter = self.request.query_params.get("is_active")
 
         if is_active_filter in ("True", "true"):
@@ -73,26 +106,52 @@ class BorrowingViewSet(
         if self.action == "create":
             return BorrowingCreateSerializer
 
+        if self.action == "bulk":
+            return BorrowingBulkCreateSerializer
+
         if self.action == "return_book":
             return BorrowingReturnSerializer
 
+        if self.action == "return_bulk":
+            return BorrowingBulkReturnSerializer
+
         return BorrowingSerializer
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # The reservation is the outermost transaction: its copy is given
+        # back if the borrowing, the payment or the event fails.
+        with serializer.reservation():
+            borrowing = serializer.save(user=self.request.user)
+            publish(
+                BORROWING_CREATED,
+                book_id=borrowing.book_id,
+                user_id=borrowing.user_id,
+                expected_return_date=str(borrowing.expected_return_date),
+            )
 
-    def create(self, request, *args, **kwargs):
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """Borrow several books in one transaction, paid with a single
+        checkout session"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        send_to_chat_borrowing_book.delay(
-                request.data["book"],
-                request.user.id,
-                request.data["expected_return_date"]
+        with serializer.reservation():
+            borrowings = serializer.save(user=request.user)
+            publish(
+                BORROWINGS_CREATED,
+                book_ids=[borrowing.book_id for borrowing in borrowings],
+                user_id=request.user.id,
+                expected_return_date=str(borrowings[0].expected_return_date),
+            )
+
+        # Every payment of the checkout shares its session.
+        payment = Payment.objects.filter(borrowing=borrowings[0]).only("id").get()
+        session_url = request.build_absolute_uri(
+            reverse("payments:payment_session", args=[payment.id])
         )
-        headers = self.get_success_headers(serializer.data)
         return Response(
-            serializer.data, status=status.HTTP_201_CREATED, headers=headers
+            {**serializer.data, "link": f"Get your payment link here: {session_url}"},
+            status=status.HTTP_201_CREATED,
         )
 
     @action(
@@ -103,44 +162,137 @@ class BorrowingViewSet(
     )
     def return_book(self, request, pk=None):
         """The user that borrowed the book can return it"""
-        borrowing = get_object_or_404(Borrowing, pk=pk)
-
-        if borrowing.actual_return_date:
-            return Response(
-                {"error": "The book has already been returned."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        if borrowing.user_id != request.user.id:
-            return Response(
-                {"error": "You are not authorized to return this book."},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
         with transaction.atomic():
-            borrowing.actual_return_date = datetime.date.today()
-            borrowing.save()
-            book = borrowing.book
-            book.inventory += 1
-            book.save()
-            if borrowing.actual_return_date > borrowing.expected_return_date:
-                payment = create_payment_and_stripe_session(
-                    borrowing,
-                    success_url=SUCCESS_URL,
-                    cancel_url=CANCEL_URL,
-                    payment_type="FINE",
+            # Locked until the return commits: a concurrent return of the
+            # same borrowing waits, then finds it returned.
+            borrowing = get_object_or_404(Borrowing.objects.select_for_update(), pk=pk)
+
+            if borrowing.actual_return_date:
+                return Response(
+                    {"error": "The book has already been returned."},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
+            if borrowing.user_id != request.user.id:
                 return Response(
-                    {
-                        "success": "The book was successfully returned.",
-                        "message": "Your borrowing was overdue. You`ll have to pay fine.",
-                        "link": f"Pay here: {payment.stripe_session_url}"
-                    },
-                    status=status.HTTP_200_OK,
+                    {"error": "You are not authorized to return this book."},
+                    status=status.HTTP_401_UNAUTHORIZED,
                 )
+            borrowing.actual_return_date = datetime.date.today()
+            borrowing.save()
+            get_inventory().release(borrowing.book_id)
+            changes = SummaryChanges()
+            changes.returned(
+                borrowing.user_id,
+                borrowing.expected_return_date,
+                borrowing.actual_return_date,
+            )
+            payment = None
+            if borrowing.actual_return_date > borrowing.expected_return_date:
+                # The nightly accrual may already have opened the fine.
+                payment = Payment.objects.filter(
+                    borrowing=borrowing, type=Payment.TypeType.FINE
+                ).first()
+                if payment is None:
+                    payment = create_payment_and_stripe_session(
+                        borrowing, payment_type="FINE"
+                    )
+                else:
+                    changes.payment(borrowing.user_id, payment, sign=-1)
+                    reprice(Payment.objects.filter(pk=payment.pk))
+                    payment.refresh_from_db(fields=["amount", "currency"])
+                    payment.borrowing = borrowing
+                    request_stripe_session(payment)
+                changes.payment(borrowing.user_id, payment)
+            changes.record()
+
+        if payment is not None:
+            session_url = request.build_absolute_uri(
+                reverse("payments:payment_session", args=[payment.id])
+            )
+            return Response(
+                {
+                    "success": "The book was successfully returned.",
+                    "message": "Your borrowing was overdue. You`ll have to pay fine.",
+                    "link": f"Get your payment link here: {session_url}",
+                },
+                status=status.HTTP_200_OK,
+            )
         return Response(
             {"success": "The book was successfully returned."},
             status=status.HTTP_200_OK,
         )
 
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="return/bulk",
+        url_name="return-bulk",
+    )
+    def return_bulk(self, request):
+        """Return many borrowings at once, with a result per borrowing.
+        Admins can return anyone's borrowings, users only their own"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Only ownership narrows the returnable borrowings, not the list
+        # filters (?is_active, ?user_id) of the URL.
+        queryset = self.queryset
+        if not request.user.is_staff:
+            queryset = queryset.filter(user=request.user)
+        results = return_borrowings(queryset, serializer.validated_data["borrowings"])
+        for result in results:
+            if result["fine_payment_id"]:
+                result["link"] = request.build_absolute_uri(
+                    reverse(
+                        "payments:payment_session", args=[result["fine_payment_id"]]
+                    )
+                )
+        return Response(
+            {
+                "returned": sum(result["status"] == RETURNED for result in results),
+                "fines": sum(bool(result["fine_payment_id"]) for result in results),
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "output",
+                enum=list(EXPORT_FORMATS),
+                description="Export format, ndjson by default (ex. ?output=csv)",
+            ),
+            OpenApiParameter(
+                "is_active",
+                type=OpenApiTypes.BOOL,
+                description="Filter if books already returned or not (ex. ?is_active=True)",
+            ),
+            OpenApiParameter(
+                "user_id",
+                type=OpenApiTypes.INT,
+                description="If user is admin he can filter by user id (ex. ?user_id=1)",
+            ),
+        ],
+        responses={(200, "application/x-ndjson"): OpenApiTypes.STR},
+    )
+    @action(methods=["GET"], detail=False, pagination_class=None)
+    def export(self, request):
+        """Stream every matching borrowing, with the same filters as the list"""
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Output has to be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return export_response(
+            self.get_queryset().order_by("id"),
+            EXPORT_FIELDS,
+            output=output,
+            filename="borrowings",
+        )
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -156,4 +308,4 @@ class BorrowingViewSet(
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(self, request, *args, **kwargs)
+        return super().list(request, *args, **kwargs)
@@ -2,4 +2,7 @@
 # Django starts so that shared_task will use this app.
 from config.celery import app as celery_app
 
+# Count the connections of every process, web or Celery.
+from config import database  # noqa: E402,F401
+
 __all__ = ('celery_app',)
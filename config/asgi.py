@@ -2,6 +2,10 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Served this way, the hottest reads are answered by async views, see
+``config.async_urls``.  Run it with, for example::
+
+    uvicorn config.asgi:application --workers 2
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -12,5 +16,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("ASYNC_READ_VIEWS", "True")
 
 application = get_asgi_application()
@@ -0,0 +1,194 @@
+"""Async views for the hottest reads, served under ASGI.
+
+DRF views are synchronous, so under ASGI every request holds a thread
+while it waits on the database and on a slow client.  These views answer
+GET natively async with the async ORM and reuse DRF's permissions,
+throttles, pagination and serializers on rows that are already loaded,
+so their responses match the DRF views they stand in for.  Every other
+method is handed to the DRF view.
+
+They are routed by ``config.async_urls``, the URLconf of the ASGI app.
+
+Django runs the queries of each ASGI request in a thread of its own, on
+a connection of its own, so at most ``ASYNC_DATABASE_CONCURRENCY``
+requests per worker reach the database at once; the others wait for a
+slot in the event loop, holding neither a thread nor a connection.
+"""
+import asyncio
+import contextlib
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections, connection
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .replicas import may_read_from_replica, replica_reads
+
+SAFE_METHODS = ("GET", "HEAD")
+
+_database_slots = weakref.WeakKeyDictionary()
+
+
+def database_slots() -> asyncio.Semaphore:
+    """The slots of the running event loop's requests to the database."""
+    loop = asyncio.get_running_loop()
+    if loop not in _database_slots:
+        _database_slots[loop] = asyncio.Semaphore(
+            settings.ASYNC_DATABASE_CONCURRENCY
+        )
+    return _database_slots[loop]
+
+
+async def authenticate(request):
+    """The user of the request's JWT, looked up like ``JWTAuthentication``
+    does but with the async ORM; anonymous without a token."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = None if header is None else authentication.get_raw_token(header)
+    if raw_token is None:
+        return AnonymousUser()
+
+    token = authentication.get_validated_token(raw_token)
+    try:
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("Token contained no recognizable user identification")
+
+    User = get_user_model()
+    try:
+        user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        raise exceptions.AuthenticationFailed("User not found", code="user_not_found")
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed("User is inactive", code="user_inactive")
+    return user
+
+
+def release_connection() -> None:
+    """Hand the request's connection back with its database slot rather
+    than once the response has been sent, unless a transaction, such as
+    a test's, still needs it."""
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
+def render(data, status=200, headers=None) -> HttpResponse:
+    return HttpResponse(
+        JSONRenderer().render(data),
+        content_type="application/json",
+        status=status,
+        headers=headers,
+    )
+
+
+class AsyncAPIView(View):
+    """An async ``get`` returning the response data, wrapped in DRF's
+    authentication, permission and throttle checks and error responses.
+
+    Throttles call the cache directly; its calls are short, and Django's
+    async cache API would only hand them to a thread.
+    """
+
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    # The DRF view that answers every method but GET and HEAD.
+    sync_view = None
+    # Whether the reads of ``get`` may come from a replica
+    replica_reads = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Like DRF views, these authenticate with a token, not a cookie.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            if self.sync_view is None:
+                return self.http_method_not_allowed(request, *args, **kwargs)
+            return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+        request = Request(request, authenticators=())
+        async with database_slots():
+            try:
+                request.user = await authenticate(request)
+                self.check_permissions(request)
+                self.check_throttles(request)
+                reads = (
+                    replica_reads()
+                    if self.reads_from_replica(request)
+                    else contextlib.nullcontext()
+                )
+                with reads:
+                    data = await self.get(request, *args, **kwargs)
+            except (Http404, exceptions.APIException) as exc:
+                return self.handle_exception(request, exc)
+            finally:
+                await sync_to_async(release_connection)()
+        return render(data)
+
+    def reads_from_replica(self, request) -> bool:
+        return self.replica_reads and may_read_from_replica(request)
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        return render({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+
+    def check_permissions(self, request) -> None:
+        for permission_class in self.permission_classes:
+            permission = permission_class()
+            if not permission.has_permission(request, self):
+                self.permission_denied(request, permission)
+
+    def check_object_permissions(self, request, obj) -> None:
+        for permission_class in self.permission_classes:
+            permission = permission_class()
+            if not permission.has_object_permission(request, self, obj):
+                self.permission_denied(request, permission)
+
+    def permission_denied(self, request, permission):
+        if not request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        raise exceptions.PermissionDenied(
+            getattr(permission, "message", None), getattr(permission, "code", None)
+        )
+
+    def check_throttles(self, request) -> None:
+        waits = []
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                waits.append(throttle.wait())
+        if waits:
+            raise exceptions.Throttled(
+                max((wait for wait in waits if wait is not None), default=None)
+            )
+
+    def handle_exception(self, request, exc) -> HttpResponse:
+        if isinstance(exc, Http404):
+            exc = exceptions.NotFound()
+        headers = {}
+        if isinstance(
+            exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+        ):
+            headers["WWW-Authenticate"] = JWTAuthentication().authenticate_header(
+                request
+            )
+        if getattr(exc, "wait", None):
+            headers["Retry-After"] = "%d" % exc.wait
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        return render(data, status=exc.status_code, headers=headers)
@@ -0,0 +1,20 @@
+"""URL configuration of the ASGI app.
+
+The hottest reads are answered by the async views of each app, which
+hand every other method to the DRF views; everything else is routed by
+``config.urls``.
+"""
+from django.urls import path
+
+from books.async_views import BookDetail, BookList
+from borrowings.async_views import BorrowingList
+from payments.async_views import PaymentDetail
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path("books/", BookList.as_view(), name="async-book-list"),
+    path("books/<int:pk>/", BookDetail.as_view(), name="async-book-detail"),
+    path("borrowings/", BorrowingList.as_view(), name="async-borrowing-list"),
+    path("payments/<int:pk>/", PaymentDetail.as_view(), name="async-payment-detail"),
+    *sync_urlpatterns,
+]
@@ -0,0 +1,81 @@
+"""Per-process database connection metrics.
+
+Django keeps a connection per thread and, with ``CONN_MAX_AGE``, reuses
+it for the following requests and Celery tasks of the thread, checking
+it first with ``CONN_HEALTH_CHECKS``.  These counters show how often a
+process really reuses them: every connection opened is a round of TCP,
+authentication and backend startup that the request waited for.
+"""
+import os
+import threading
+import time
+import weakref
+
+from celery.signals import task_prerun
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_lock = threading.Lock()
+_counts = {"opened": 0, "requests": 0, "tasks": 0}
+# When each connection of a live thread was opened, by its wrapper
+_opened_at = weakref.WeakKeyDictionary()
+_started = time.monotonic()
+
+
+def _reset() -> None:
+    """Forked workers count their own connections, not their master's."""
+    global _lock, _started
+    _lock = threading.Lock()
+    _counts.update(dict.fromkeys(_counts, 0))
+    _opened_at.clear()
+    _started = time.monotonic()
+
+
+os.register_at_fork(after_in_child=_reset)
+
+
+@receiver(connection_created, dispatch_uid=__name__)
+def _connection_created(sender, connection, **kwargs) -> None:
+    with _lock:
+        _counts["opened"] += 1
+        _opened_at[connection] = time.monotonic()
+
+
+@receiver(request_started, dispatch_uid=__name__)
+def _request_started(sender, **kwargs) -> None:
+    with _lock:
+        _counts["requests"] += 1
+
+
+@task_prerun.connect(dispatch_uid=__name__)
+def _task_prerun(sender=None, **kwargs) -> None:
+    with _lock:
+        _counts["tasks"] += 1
+
+
+def metrics() -> dict:
+    """The connections this process opened, the requests and tasks it
+    ran since it started, and the connections it holds now."""
+    now = time.monotonic()
+    with _lock:
+        counts = dict(_counts)
+        ages = [
+            now - opened_at
+            for wrapper, opened_at in _opened_at.items()
+            if wrapper.connection is not None
+        ]
+    uses = counts["requests"] + counts["tasks"]
+    database = settings.DATABASES["default"]
+    return {
+        "pid": os.getpid(),
+        "uptime": round(now - _started, 1),
+        "conn_max_age": database.get("CONN_MAX_AGE", 0),
+        "health_checks": database.get("CONN_HEALTH_CHECKS", False),
+        "pooling": settings.DATABASE_POOLING,
+        **counts,
+        "opened_per_use": round(counts["opened"] / uses, 3) if uses else None,
+        "open": len(ages),
+        "oldest_age": round(max(ages, default=0), 1),
+    }
@@ -0,0 +1,533 @@
+"""Request instrumentation in production, for Prometheus.
+
+``instrument_requests`` records per endpoint the latency of every
+request, and what it spent its time on: database queries, calls to
+Stripe and Telegram (``timed``) and serializers (``TimedSerializerMixin``).
+A ``PROFILE_SAMPLE_RATE`` share of sync requests is also run under
+cProfile, each into a file of ``PROFILE_DIR`` to read with ``pstats`` or
+snakeviz.
+
+Every process records into its own counters.  With the ``redis``
+``METRICS_BACKEND`` it adds them to one redis hash every
+``METRICS_PUSH_INTERVAL`` seconds and before answering a scrape, so that
+``/metrics`` serves the totals of every gunicorn worker and Celery
+process, whichever worker answers, only the connections held now being
+the answering process's.  With ``local`` each process serves its own:
+scrape every worker, or serve with ``--workers 1``.
+"""
+import bisect
+import contextvars
+import cProfile
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.serializers import ListSerializer
+
+from . import database
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SECTIONS = ("db", "stripe", "telegram", "serializer")
+EXTERNAL = ("stripe", "telegram")
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+class Timings:
+    """Seconds and calls of a request per section."""
+
+    __slots__ = ("seconds", "calls", "open")
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(SECTIONS, 0.0)
+        self.calls = dict.fromkeys(SECTIONS, 0)
+        # Sections being timed, so nested calls are not counted twice
+        self.open = set()
+
+
+class Endpoint:
+    __slots__ = ("buckets", "count", "seconds", "statuses", "sections", "calls")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.statuses = {}
+        self.sections = dict.fromkeys(SECTIONS, 0.0)
+        self.calls = dict.fromkeys(SECTIONS, 0)
+
+
+_lock = threading.Lock()
+_endpoints = {}
+# Calls to external services from anywhere, Celery tasks included
+_external_seconds = dict.fromkeys(EXTERNAL, 0.0)
+_external_calls = dict.fromkeys(EXTERNAL, 0)
+
+# What the shared store has not taken yet, and when it was last offered
+_push_lock = threading.Lock()
+_pending = {}
+_pushed_at = time.monotonic()
+_connections_pushed = 0
+
+
+def _clear() -> None:
+    _endpoints.clear()
+    _external_seconds.update(dict.fromkeys(EXTERNAL, 0.0))
+    _external_calls.update(dict.fromkeys(EXTERNAL, 0))
+
+
+def reset() -> None:
+    with _lock:
+        _clear()
+    with _push_lock:
+        _pending.clear()
+
+
+def _reset_after_fork() -> None:
+    """Forked workers report their own requests, not their master's."""
+    global _lock, _push_lock, _pushed_at, _connections_pushed
+    _lock = threading.Lock()
+    _push_lock = threading.Lock()
+    _pushed_at = time.monotonic()
+    _connections_pushed = 0
+    reset()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@contextmanager
+def timed(section):
+    """Count the block's time to ``section`` of the current request."""
+    timings = _current.get()
+    if timings is not None and section in timings.open:
+        yield
+        return
+    if timings is not None:
+        timings.open.add(section)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is not None:
+            timings.open.discard(section)
+            timings.seconds[section] += elapsed
+            timings.calls[section] += 1
+        if section in EXTERNAL:
+            with _lock:
+                _external_seconds[section] += elapsed
+                _external_calls[section] += 1
+            push()
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.seconds["db"] += time.perf_counter() - started
+        timings.calls["db"] += 1
+
+
+def _represent(serializer, representation, instance):
+    """``timed("serializer")`` without a generator, as it runs per row."""
+    timings = _current.get()
+    if timings is None or "serializer" in timings.open:
+        return representation(instance)
+    timings.open.add("serializer")
+    started = time.perf_counter()
+    try:
+        return representation(instance)
+    finally:
+        timings.open.discard("serializer")
+        timings.seconds["serializer"] += time.perf_counter() - started
+        timings.calls["serializer"] += 1
+
+
+class TimedListSerializer(ListSerializer):
+    def to_representation(self, data):
+        return _represent(self, super().to_representation, data)
+
+
+class TimedSerializerMixin:
+    """Count the serializer's representations to the current request, a
+    list of them, ``many=True``, as one."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        if type(serializer) is ListSerializer:
+            serializer.__class__ = TimedListSerializer
+        return serializer
+
+    def to_representation(self, instance):
+        return _represent(self, super().to_representation, instance)
+
+
+def _endpoint(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else "unmatched"
+
+
+@receiver(connection_created, dispatch_uid=__name__)
+def _time_queries(sender, connection, **kwargs) -> None:
+    # A connection is opened again by the same wrapper.
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def _start():
+    timings = Timings()
+    return timings, _current.set(timings)
+
+
+def _record(request, response, elapsed, timings) -> None:
+    key = (_endpoint(request), request.method)
+    with _lock:
+        endpoint = _endpoints.get(key)
+        if endpoint is None:
+            endpoint = _endpoints[key] = Endpoint()
+        endpoint.buckets[bisect.bisect_left(BUCKETS, elapsed)] += 1
+        endpoint.count += 1
+        endpoint.seconds += elapsed
+        status = response.status_code
+        endpoint.statuses[status] = endpoint.statuses.get(status, 0) + 1
+        for section in SECTIONS:
+            endpoint.sections[section] += timings.seconds[section]
+            endpoint.calls[section] += timings.calls[section]
+
+
+def _dump_profile(profile, request, elapsed) -> None:
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    name = (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{_endpoint(request).replace(':', '.')}"
+        f"-{elapsed * 1000:.0f}ms-{os.getpid()}.prof"
+    )
+    profile.dump_stats(os.path.join(settings.PROFILE_DIR, name))
+
+
+@sync_and_async_middleware
+def instrument_requests(get_response):
+    """Record the latency and the timings of every request.  Async
+    requests are never profiled: their coroutine hops between threads."""
+    # Connections opened before this module was imported; the signal
+    # catches every later one, whatever its thread.
+    for connection in connections.all(initialized_only=True):
+        _time_queries(None, connection)
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            if not settings.INSTRUMENTATION_ENABLED:
+                return await get_response(request)
+            timings, token = _start()
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            _record(request, response, time.perf_counter() - started, timings)
+            push()
+            return response
+
+    else:
+
+        def middleware(request):
+            if not settings.INSTRUMENTATION_ENABLED:
+                return get_response(request)
+            timings, token = _start()
+            profile = None
+            if random.random() < settings.PROFILE_SAMPLE_RATE:
+                profile = cProfile.Profile()
+                profile.enable()
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                elapsed = time.perf_counter() - started
+                _current.reset(token)
+                if profile is not None:
+                    profile.disable()
+            _record(request, response, elapsed, timings)
+            push()
+            if profile is not None:
+                _dump_profile(profile, request, elapsed)
+            return response
+
+    return middleware
+
+
+# Fields of the shared store that count something rather than seconds
+COUNTERS = {
+    "bucket",
+    "count",
+    "status",
+    "section_calls",
+    "external_calls",
+    "connections_opened",
+}
+
+
+def _field(*key) -> str:
+    return json.dumps(key)
+
+
+def _fields(endpoints, external_seconds, external_calls) -> dict:
+    """The counters as ``{field: value}``, the layout of the shared store."""
+    fields = {}
+    for (name, method), endpoint in endpoints.items():
+        for index, count in enumerate(endpoint.buckets):
+            fields[_field("bucket", name, method, index)] = count
+        fields[_field("count", name, method)] = endpoint.count
+        fields[_field("seconds", name, method)] = endpoint.seconds
+        for status, count in endpoint.statuses.items():
+            fields[_field("status", name, method, status)] = count
+        for section in SECTIONS:
+            seconds = _field("section_seconds", name, method, section)
+            calls = _field("section_calls", name, method, section)
+            fields[seconds] = endpoint.sections[section]
+            fields[calls] = endpoint.calls[section]
+    for service in EXTERNAL:
+        fields[_field("external_seconds", service)] = external_seconds[service]
+        fields[_field("external_calls", service)] = external_calls[service]
+    return fields
+
+
+def _unflatten(fields):
+    """``_fields`` back into the endpoints, the external seconds and calls,
+    and the connections opened."""
+    endpoints = {}
+    external_seconds = dict.fromkeys(EXTERNAL, 0.0)
+    external_calls = dict.fromkeys(EXTERNAL, 0)
+    opened = 0
+    for field, value in fields.items():
+        kind, *key = json.loads(field)
+        if kind in COUNTERS:
+            # redis adds floats up; these are whole numbers
+            value = int(value)
+        if kind == "connections_opened":
+            opened = value
+        elif kind == "external_seconds":
+            external_seconds[key[0]] = value
+        elif kind == "external_calls":
+            external_calls[key[0]] = value
+        else:
+            name, method, *rest = key
+            endpoint = endpoints.get((name, method))
+            if endpoint is None:
+                endpoint = endpoints[name, method] = Endpoint()
+            if kind == "bucket":
+                endpoint.buckets[rest[0]] = value
+            elif kind == "count":
+                endpoint.count = value
+            elif kind == "seconds":
+                endpoint.seconds = value
+            elif kind == "status":
+                endpoint.statuses[rest[0]] = value
+            elif kind == "section_seconds":
+                endpoint.sections[rest[0]] = value
+            elif kind == "section_calls":
+                endpoint.calls[rest[0]] = value
+    return endpoints, external_seconds, external_calls, opened
+
+
+class LocalMetricsStore:
+    """The counters of this process only."""
+
+    shared = False
+
+    def totals(self) -> dict:
+        with _lock:
+            fields = _fields(_endpoints, _external_seconds, _external_calls)
+        fields[_field("connections_opened")] = database.metrics()["opened"]
+        return fields
+
+
+class RedisMetricsStore:
+    """The counters of every process, summed in one redis hash."""
+
+    shared = True
+    KEY = "metrics:counters"
+
+    def __init__(self, client):
+        self._client = client
+
+    def add(self, fields: dict) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        for field, value in fields.items():
+            pipe.hincrbyfloat(self.KEY, field, value)
+        pipe.execute()
+
+    def totals(self) -> dict:
+        return {
+            field.decode(): float(value)
+            for field, value in self._client.hgetall(self.KEY).items()
+        }
+
+
+@lru_cache
+def _build_store(backend: str):
+    if backend == "local":
+        return LocalMetricsStore()
+    if backend == "redis":
+        import redis
+
+        return RedisMetricsStore(redis.Redis.from_url(settings.REDIS_URL))
+    raise ValueError(f"Unknown metrics backend: {backend}")
+
+
+def get_metrics_store():
+    """Return the store configured by ``METRICS_BACKEND``."""
+    return _build_store(settings.METRICS_BACKEND)
+
+
+def push(force=False) -> None:
+    """Add what this process recorded since its last push to the shared
+    store, at most every ``METRICS_PUSH_INTERVAL`` seconds unless forced."""
+    global _pushed_at, _connections_pushed
+    if not force and time.monotonic() - _pushed_at < settings.METRICS_PUSH_INTERVAL:
+        return
+    store = get_metrics_store()
+    if not store.shared or not _push_lock.acquire(blocking=force):
+        _pushed_at = time.monotonic()
+        return
+    try:
+        _pushed_at = time.monotonic()
+        opened = database.metrics()["opened"]
+        with _lock:
+            fields = _fields(_endpoints, _external_seconds, _external_calls)
+            _clear()
+        fields[_field("connections_opened")] = opened - _connections_pushed
+        _connections_pushed = opened
+        for field, value in fields.items():
+            if value:
+                _pending[field] = _pending.get(field, 0) + value
+        try:
+            store.add(_pending)
+        except Exception:
+            # Kept for the next push: a request does not fail on metrics,
+            # but a scrape does rather than serve partial totals.
+            if force:
+                raise
+            return
+        _pending.clear()
+    finally:
+        _push_lock.release()
+
+
+def _sample(name, labels, value) -> str:
+    if not labels:
+        return f"{name} {value!r}"
+    labels = ",".join(
+        '{}="{}"'.format(label, str(text).replace("\\", "\\\\").replace('"', '\\"'))
+        for label, text in labels.items()
+    )
+    return f"{name}{{{labels}}} {value!r}"
+
+
+def _family(name, kind, description, samples) -> list:
+    """Lines of a metric; ``samples`` are (suffix, labels, value)."""
+    return [
+        f"# HELP {name} {description}",
+        f"# TYPE {name} {kind}",
+        *(_sample(name + suffix, labels, value) for suffix, labels, value in samples),
+    ]
+
+
+def _histogram(endpoints):
+    for (name, method), endpoint in endpoints:
+        labels = {"endpoint": name, "method": method}
+        cumulative = 0
+        for bound, count in zip((*BUCKETS, "+Inf"), endpoint.buckets):
+            cumulative += count
+            yield "_bucket", {**labels, "le": bound}, cumulative
+        yield "_sum", labels, endpoint.seconds
+        yield "_count", labels, endpoint.count
+
+
+def exposition() -> str:
+    """The metrics of every process, or of this one with the ``local``
+    store, in the Prometheus text format."""
+    push(force=True)
+    endpoints, external_seconds, external_calls, opened = _unflatten(
+        get_metrics_store().totals()
+    )
+    endpoints = sorted(endpoints.items())
+    lines = [
+        *_family(
+            "library_http_request_duration_seconds",
+            "histogram",
+            "Request latency.",
+            _histogram(endpoints),
+        ),
+        *_family(
+            "library_http_requests_total",
+            "counter",
+            "Requests by response status.",
+            (
+                ("", {"endpoint": name, "method": method, "status": status}, count)
+                for (name, method), endpoint in endpoints
+                for status, count in sorted(endpoint.statuses.items())
+            ),
+        ),
+        *_family(
+            "library_http_request_section_seconds_total",
+            "counter",
+            "Time requests spent on queries, external calls and serializers.",
+            (
+                ("", {"endpoint": name, "method": method, "section": key}, value)
+                for (name, method), endpoint in endpoints
+                for key, value in endpoint.sections.items()
+            ),
+        ),
+        *_family(
+            "library_http_request_section_calls_total",
+            "counter",
+            "Queries, external calls and serializations of requests.",
+            (
+                ("", {"endpoint": name, "method": method, "section": key}, value)
+                for (name, method), endpoint in endpoints
+                for key, value in endpoint.calls.items()
+            ),
+        ),
+        *_family(
+            "library_external_call_seconds_total",
+            "counter",
+            "Time calling external services, in requests and Celery tasks.",
+            (("", {"service": key}, value) for key, value in external_seconds.items()),
+        ),
+        *_family(
+            "library_external_calls_total",
+            "counter",
+            "Calls to external services, in requests and Celery tasks.",
+            (("", {"service": key}, value) for key, value in external_calls.items()),
+        ),
+        *_family(
+            "library_db_connections_opened_total",
+            "counter",
+            "Database connections opened.",
+            [("", {}, opened)],
+        ),
+        *_family(
+            "library_db_connections_open",
+            "gauge",
+            "Database connections held now by the process that answered.",
+            [("", {}, database.metrics()["open"])],
+        ),
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,226 @@
+"""A small HTTP/1.1 load generator for the serving benchmarks.
+
+Many keep-alive connections, each an asyncio task, cycle through the
+hottest read endpoints of a server started on this host and record the
+latency of every response.  Being dependency free it is no match for a
+dedicated tool, but it needs nothing but the project to compare setups.
+"""
+import asyncio
+import itertools
+import os
+import resource
+import statistics
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from payments.models import Payment
+
+HOST = "127.0.0.1"
+READY_TIMEOUT = 30
+
+HEADER = (
+    f"{'server':<14}{'requests':>10}{'req/s':>10}{'p50 ms':>10}"
+    f"{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}"
+)
+
+
+def get_request(path, token) -> bytes:
+    """A keep-alive GET of ``path`` authenticated with the JWT ``token``."""
+    return (
+        f"GET {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Authorization: Bearer {token}\r\nConnection: keep-alive\r\n\r\n"
+    ).encode()
+
+
+def hot_paths():
+    """Paths of the book list, a few book details, the borrowing list and
+    a payment, and a token of the user of the latest payment."""
+    payment = Payment.objects.select_related("borrowing__user").order_by("-id").first()
+    if payment is None:
+        raise CommandError("No payments found, run seed_library first.")
+    book_ids = Book.objects.order_by("id").values_list("id", flat=True)[:5]
+    token = AccessToken.for_user(payment.borrowing.user)
+
+    paths = [
+        "/books/",
+        *(f"/books/{book_id}/" for book_id in book_ids),
+        "/borrowings/",
+        f"/payments/{payment.id}/",
+    ]
+    return paths, token
+
+
+def hot_requests() -> list:
+    """Requests for the ``hot_paths``, authenticated with their token."""
+    paths, token = hot_paths()
+    return [get_request(path, token) for path in paths]
+
+
+def server_env(**overrides) -> dict:
+    """The environment of a server under test."""
+    return {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE,
+        # Every request comes from one address; throttling would 429 them.
+        "ANON_THROTTLE_RATE": "",
+        "USER_THROTTLE_RATE": "",
+        **overrides,
+    }
+
+
+def production_env(**overrides) -> dict:
+    """The environment of a server under test with production settings."""
+    return server_env(
+        DJANGO_ENV="production",
+        # The key the tokens of ``hot_requests`` are signed with.
+        DJANGO_SECRET_KEY=settings.SECRET_KEY,
+        DJANGO_ALLOWED_HOSTS="localhost,127.0.0.1",
+        **overrides,
+    )
+
+
+def raise_open_file_limit(connections) -> None:
+    """Every connection needs a descriptor here and one in the server."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if hard < 2 * connections + 100:
+        raise CommandError(f"Open file limit {hard} is too low.")
+
+
+async def _read_body(reader, headers) -> None:
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                return
+    await reader.readexactly(int(headers.get("content-length", 0)))
+
+
+async def fetch(reader, writer, request: bytes, slow: float):
+    """Send ``request`` and read the response; a slow client sends it in
+    two halves ``slow`` seconds apart.  Returns the status and whether
+    the server closes the connection."""
+    if slow:
+        middle = len(request) // 2
+        writer.write(request[:middle])
+        await writer.drain()
+        await asyncio.sleep(slow)
+        request = request[middle:]
+    writer.write(request)
+    await writer.drain()
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in filter(None, lines):
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+    await _read_body(reader, headers)
+    return int(status_line.split()[1]), headers.get("connection") == "close"
+
+
+async def _client(port, requests, deadline, slow, latencies, statuses) -> None:
+    """One connection issuing ``requests`` in turn until ``deadline``,
+    reconnecting whenever the server closes it."""
+    reader = writer = None
+    for request in itertools.cycle(requests):
+        if time.perf_counter() >= deadline:
+            break
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            started = time.perf_counter()
+            status, close = await fetch(reader, writer, request, slow)
+        except (OSError, asyncio.IncompleteReadError):
+            statuses["connection error"] += 1
+            close = True
+            await asyncio.sleep(0.01)
+        else:
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+        if close and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _load(port, requests, connections, duration, slow):
+    latencies, statuses = [], Counter()
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            # Each connection starts at a different request of the mix.
+            _client(
+                port,
+                requests[index % len(requests) :] + requests[: index % len(requests)],
+                deadline,
+                slow,
+                latencies,
+                statuses,
+            )
+            for index in range(connections)
+        )
+    )
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def _wait_until_ready(port, request, process) -> None:
+    give_up = time.perf_counter() + READY_TIMEOUT
+    while time.perf_counter() < give_up:
+        if process.poll() is not None:
+            raise CommandError(f"The server exited with {process.returncode}.")
+        try:
+            reader, writer = await asyncio.open_connection(HOST, port)
+            status, _ = await fetch(reader, writer, request, 0)
+            writer.close()
+            if status == 200:
+                return
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        await asyncio.sleep(0.2)
+    raise CommandError(f"The server did not answer within {READY_TIMEOUT} s.")
+
+
+def _percentile(sorted_values, fraction) -> float:
+    return sorted_values[
+        min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    ]
+
+
+def run(process, port, requests, connections, duration, slow=0) -> dict:
+    """Wait for the server ``process`` to answer on ``port``, then load it;
+    returns its throughput and latencies in milliseconds."""
+    asyncio.run(_wait_until_ready(port, requests[0], process))
+    latencies, statuses, elapsed = asyncio.run(
+        _load(port, requests, connections, duration, slow)
+    )
+    if not latencies:
+        raise CommandError(f"No responses: {dict(statuses)}")
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rate": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p90": _percentile(latencies, 0.9) * 1000,
+        "p99": _percentile(latencies, 0.99) * 1000,
+        "max": latencies[-1] * 1000,
+        "errors": sum(count for status, count in statuses.items() if status != 200),
+        "statuses": dict(statuses),
+    }
+
+
+def row(name, result) -> str:
+    """``result`` of ``run`` as a line under ``HEADER``."""
+    return (
+        f"{name:<14}{result['requests']:>10}{result['rate']:>10.0f}"
+        f"{result['p50']:>10.1f}{result['p90']:>10.1f}{result['p99']:>10.1f}"
+        f"{result['max']:>10.1f}{result['errors']:>8}"
+    )
@@ -0,0 +1,150 @@
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination over the primary key.
+
+    The cursor carries the last id seen, so every page is an index range
+    scan (``WHERE id > %s ORDER BY id LIMIT n``) and a deep page costs the
+    same as the first one.  Clients may ask for a smaller or larger page
+    with ``?page_size=``.
+    """
+
+    ordering = "id"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views: the same cursors and
+        links, with the page read by the async ORM."""
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            order = self.ordering[0]
+            if reverse != order.startswith("-"):
+                lookup = order.lstrip("-") + "__lt"
+            else:
+                lookup = order.lstrip("-") + "__gt"
+            queryset = queryset.filter(**{lookup: current_position})
+
+        # One extra row tells whether a page follows.
+        results = [row async for row in queryset[offset : offset + self.page_size + 1]]
+        self.page = results[: self.page_size]
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            following = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following is not None
+            self.next_position = current_position
+            self.previous_position = following
+        else:
+            self.has_next = following is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following
+            self.previous_position = current_position
+        return self.page
+
+
+class KeysetCursorPagination(IdCursorPagination):
+    """``IdCursorPagination`` over any ordering, the id breaking its ties.
+
+    The cursor carries every value of the ordering of the last row seen,
+    so a page is a range scan of an index on those columns (ex.
+    ``(amount, id)``) rather than DRF's offset within runs of equal
+    values.  The ordering columns must not be nullable.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if ordering[-1].lstrip("-") != "id":
+            ordering += ("-id" if ordering[-1].startswith("-") else "id",)
+        return ordering
+
+    def _position(self, instance) -> str:
+        return json.dumps(
+            [str(getattr(instance, order.lstrip("-"))) for order in self.ordering]
+        )
+
+    def _after(self, position, reverse) -> Q:
+        """Rows after ``position`` in the (reversed) ordering."""
+        after = Q()
+        ties = Q()
+        for order, value in zip(self.ordering, position):
+            field = order.lstrip("-")
+            lookup = "lt" if order.startswith("-") != reverse else "gt"
+            after |= ties & Q(**{f"{field}__{lookup}": value})
+            ties &= Q(**{field: value})
+        # The bound on the first column alone starts the index range scan.
+        first = self.ordering[0].lstrip("-")
+        lookup = "lte" if self.ordering[0].startswith("-") != reverse else "gte"
+        return Q(**{f"{first}__{lookup}": position[0]}) & after
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        reverse, position = False, None
+        if self.cursor is not None:
+            reverse = self.cursor.reverse
+            try:
+                position = json.loads(self.cursor.position)
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+
+        # One extra row tells whether a page follows.
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        more = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, more
+        else:
+            self.has_next, self.has_previous = more, position is not None
+        self.position = self.cursor.position if self.cursor is not None else None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._position(self.page[-1]) if self.page else self.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._position(self.page[0]) if self.page else self.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
@@ -0,0 +1,157 @@
+"""Routing of safe reads to read replicas.
+
+Replicas are the ``DATABASE_REPLICAS`` aliases, copies of ``default``
+kept by streaming replication.  Views opt in with ``ReplicaReadMixin``
+(``AsyncAPIView.replica_reads`` for the async views): the queries of
+their safe requests go to a replica.  Every other query, every write and
+every ``select_for_update`` goes to the primary.
+
+Replicas replay the primary's writes a little later, so a user who has
+just written reads from the primary for ``DATABASE_REPLICA_STICKY_SECONDS``
+and sees what they wrote.  The pin is kept in the cache and in a signed
+cookie of the response, so it holds whichever worker serves the next
+request, even when the workers do not share a cache.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.decorators import sync_and_async_middleware
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PINNED_KEY = "replicas:pinned:{}"
+PINNED_COOKIE = "replica_pin"
+PINNED_SALT = "config.replicas.pinned"
+
+_replica_reads = contextvars.ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads of the block to a replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def pin_to_primary(user, response=None) -> None:
+    seconds = settings.DATABASE_REPLICA_STICKY_SECONDS
+    cache.set(PINNED_KEY.format(user.pk), True, seconds)
+    if response is not None:
+        response.set_signed_cookie(
+            PINNED_COOKIE,
+            str(user.pk),
+            salt=PINNED_SALT,
+            max_age=seconds,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite="Lax",
+        )
+
+
+def is_pinned_to_primary(user, request=None) -> bool:
+    if not user.is_authenticated:
+        return False
+    if request is not None:
+        pinned = request.get_signed_cookie(
+            PINNED_COOKIE,
+            default=None,
+            salt=PINNED_SALT,
+            max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+        )
+        if pinned == str(user.pk):
+            return True
+    return cache.get(PINNED_KEY.format(user.pk), False)
+
+
+def may_read_from_replica(request) -> bool:
+    """Whether the reads of ``request``, authenticated by now, may lag."""
+    return (
+        bool(settings.DATABASE_REPLICAS)
+        and request.method in SAFE_METHODS
+        and not is_pinned_to_primary(request.user, request)
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            # Related objects come from where their instance came from.
+            return instance._state.db
+        if _replica_reads.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class ReplicaReadMixin:
+    """Safe requests of the view's ``replica_actions``, of every action
+    when ``None``, read from a replica."""
+
+    replica_actions = None
+
+    def reads_from_replica(self, request) -> bool:
+        return (
+            self.replica_actions is None
+            or getattr(self, "action", None) in self.replica_actions
+        ) and may_read_from_replica(request)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.reads_from_replica(request):
+            self._replica_reads = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_reads", None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self._replica_reads = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def _pin_writer(request, response) -> None:
+    user = getattr(request, "user", None)
+    if (
+        settings.DATABASE_REPLICAS
+        and request.method not in SAFE_METHODS
+        and response.status_code < 400
+        and user is not None
+        and user.is_authenticated
+    ):
+        pin_to_primary(user, response)
+
+
+@sync_and_async_middleware
+def pin_writers_to_primary(get_response):
+    """Pin users who wrote to the primary.  DRF views set ``request.user``
+    once they have authenticated the token, before the response."""
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            response = await get_response(request)
+            _pin_writer(request, response)
+            return response
+
+    else:
+
+        def middleware(request):
+            response = get_response(request)
+            _pin_writer(request, response)
+            return response
+
+    return middleware
@@ -0,0 +1,14 @@
+"""Settings of the environment named by ``DJANGO_ENV``: "development",
+the default, or "production"."""
+import os
+
+ENVIRONMENTS = ("development", "production")
+
+DJANGO_ENV = os.getenv("DJANGO_ENV", "development")
+if DJANGO_ENV not in ENVIRONMENTS:
+    raise ValueError(f"DJANGO_ENV has to be one of: {', '.join(ENVIRONMENTS)}")
+
+if DJANGO_ENV == "production":
+    from .production import *  # noqa: F401,F403
+else:
+    from .development import *  # noqa: F401,F403
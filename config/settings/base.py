@@ -0,0 +1,338 @@
+"""
+Django settings for config project shared by every environment.
+
+``config.settings`` picks ``development`` or ``production`` on top of
+these by the ``DJANGO_ENV`` environment variable.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/4.2/ref/settings/
+"""
+import os
+from datetime import timedelta
+from pathlib import Path
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+DEBUG = False
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "django.contrib.postgres",
+    "rest_framework",
+    "rest_framework_simplejwt",
+    "users",
+    "books",
+    "borrowings",
+    "payments",
+    "notification",
+    "reports",
+    "drf_spectacular",
+    "django_celery_beat",
+]
+
+MIDDLEWARE = [
+    "config.instrumentation.instrument_requests",
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "config.replicas.pin_writers_to_primary",
+]
+
+# The ASGI app (config/asgi.py) answers the hottest reads with async views
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "False") == "True"
+ROOT_URLCONF = "config.async_urls" if ASYNC_READ_VIEWS else "config.urls"
+# Requests of an ASGI worker whose queries run at once, each on its own
+# connection; keep workers times this under the server's max_connections
+ASYNC_DATABASE_CONCURRENCY = int(os.getenv("ASYNC_DATABASE_CONCURRENCY", "10"))
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [BASE_DIR / "templates"],
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.debug",
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
+
+
+# Database
+# https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+
+# Database connection settings
+
+# Seconds a connection is kept for the following requests and Celery tasks
+# of its thread, 0 to close it after each.  An ASGI request runs on a
+# thread of its own, which would leave its connection unused, so there it
+# is always 0.
+DATABASE_CONN_MAX_AGE = (
+    0 if ASYNC_READ_VIEWS else int(os.getenv("DATABASE_CONN_MAX_AGE", "60"))
+)
+# "session" for Postgres itself or a pgbouncer in session pooling mode,
+# "transaction" for a pgbouncer in transaction pooling mode
+DATABASE_POOLING = os.getenv("DATABASE_POOLING", "session")
+if DATABASE_POOLING not in ("session", "transaction"):
+    raise ValueError('DATABASE_POOLING has to be "session" or "transaction"')
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.postgresql",
+        "HOST": os.environ["POSTGRES_HOST"],
+        "NAME": os.environ["POSTGRES_DB"],
+        "USER": os.environ["POSTGRES_USER"],
+        "PASSWORD": os.environ["POSTGRES_PASSWORD"],
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": DATABASE_CONN_MAX_AGE != 0,
+        # pgbouncer in transaction pooling mode hands every transaction a
+        # server connection of its own, which cursors kept open across
+        # transactions would not find.
+        "DISABLE_SERVER_SIDE_CURSORS": DATABASE_POOLING == "transaction",
+    }
+}
+
+# Read replica settings
+
+# Hosts of streaming replicas of the database, each an alias of DATABASES
+# that safe reads of listings and reports are spread over (config.replicas)
+DATABASE_REPLICA_HOSTS = [
+    host for host in os.getenv("DATABASE_REPLICA_HOSTS", "").split(",") if host
+]
+DATABASE_REPLICAS = []
+for index, host in enumerate(DATABASE_REPLICA_HOSTS):
+    DATABASE_REPLICAS.append(f"replica{index}")
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "NAME": os.getenv("DATABASE_REPLICA_NAME", os.environ["POSTGRES_DB"]),
+        # Tests run against a single database.
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["config.replicas.ReplicaRouter"]
+# Seconds a user who wrote reads from the primary, to see their writes
+# before the replicas replay them
+DATABASE_REPLICA_STICKY_SECONDS = int(
+    os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "5")
+)
+
+# Password validation
+# https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+
+AUTH_USER_MODEL = "users.User"
+
+# Internationalization
+# https://docs.djangoproject.com/en/4.2/topics/i18n/
+
+LANGUAGE_CODE = "en-us"
+
+TIME_ZONE = "UTC"
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/4.2/howto/static-files/
+
+STATIC_URL = "static/"
+DOMAIN_URL = "http://127.0.0.1:8000/"
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+REST_FRAMEWORK = {
+    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_THROTTLE_CLASSES": [
+        "rest_framework.throttling.AnonRateThrottle",
+        "rest_framework.throttling.UserRateThrottle",
+    ],
+    # An empty rate turns that throttle off, e.g. for load tests.
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": os.getenv("ANON_THROTTLE_RATE", "101/minute") or None,
+        "user": os.getenv("USER_THROTTLE_RATE", "301/minute") or None,
+    },
+    "DEFAULT_AUTHENTICATION_CLASSES": (
+        "rest_framework_simplejwt.authentication.JWTAuthentication",
+    ),
+    "DEFAULT_PAGINATION_CLASS": "config.pagination.IdCursorPagination",
+}
+
+SPECTACULAR_SETTINGS = {
+    "TITLE": "Library service API",
+    "DESCRIPTION": "books borrowing service",
+    "VERSION": "1.0.0",
+    "SERVE_INCLUDE_SCHEMA": False,
+    "SWAGGER_UI_SETTINGS": {
+        "deepLinking": True,
+        "defaultModelRendering": "model",
+        "defaultModelsExpandDepth": 2,
+        "defaultModelExpandDepth": 2,
+    },
+}
+
+SIMPLE_JWT = {
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
+    "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "ROTATE_REFRESH_TOKENS": True,
+}
+
+# Telegram settings
+TELEGRAM_TOKEN_API = os.getenv("TELEGRAM_TOKEN_API")
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+# "http", or "fake" to record messages instead of sending them.
+TELEGRAM_TRANSPORT = os.getenv("TELEGRAM_TRANSPORT", "http")
+# Pooled keep-alive connections to the Bot API, and (connect, read) timeouts.
+TELEGRAM_MAX_IN_FLIGHT = int(os.getenv("TELEGRAM_MAX_IN_FLIGHT", "4"))
+TELEGRAM_TIMEOUT = (3.05, 10)
+# Telegram allows about one message per second to the same chat.
+TELEGRAM_SEND_INTERVAL = float(os.getenv("TELEGRAM_SEND_INTERVAL", "1.0"))
+
+# Notification settings
+# Borrowing events are buffered in "redis", or "local" when the flush
+# runs in the same process (tests, eager Celery).
+NOTIFICATION_BUFFER = os.getenv("NOTIFICATION_BUFFER", "redis")
+# Seconds to coalesce events for before they are sent together.
+NOTIFICATION_WINDOW = float(os.getenv("NOTIFICATION_WINDOW", "2"))
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "500"))
+
+# Outbox settings
+# Dotted path of the callable each outbox topic is relayed to.
+OUTBOX_HANDLERS = {
+    "borrowing.created": "notification.dispatcher.notify_borrowing",
+    "borrowings.created": "notification.dispatcher.notify_borrowings",
+}
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+
+
+# Celery settings
+CELERY_BROKER_URL = "redis://redis:6379"
+CELERY_RESULT_BACKEND = "redis://redis:6379"
+CELERY_TIMEZONE = "Europe/Kyiv"
+CELERY_TASK_TRACK_STARTED = True
+CELERY_TASK_TIME_LIMIT = 30 * 60
+
+# Inventory settings
+# "database", or "redis"/"local" to put a counter store in front of the DB
+INVENTORY_BACKEND = os.getenv("INVENTORY_BACKEND", "database")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+
+# Cache settings
+if os.getenv("CACHE_BACKEND") == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+# Book payloads are only cached by default in the shared redis cache: the
+# versions that invalidate them would not reach other processes' memory.
+BOOK_CACHE_ENABLED = (
+    os.getenv("BOOK_CACHE_ENABLED", str(os.getenv("CACHE_BACKEND") == "redis"))
+    == "True"
+)
+BOOK_CACHE_TIMEOUT = int(os.getenv("BOOK_CACHE_TIMEOUT", 10 * 60))
+
+# Reports settings
+# Seconds a staff report is served from the cache; 0 disables caching
+REPORTS_CACHE_TIMEOUT = int(os.getenv("REPORTS_CACHE_TIMEOUT", 5 * 60))
+# Read history from the nightly rollup tables instead of raw rows
+REPORTS_USE_ROLLUPS = os.getenv("REPORTS_USE_ROLLUPS", "True") == "True"
+
+# Book search settings
+# "postgres" full-text search, or the "inverted_index" every process keeps
+# in memory, rebuilt when a book changes, for databases without it
+BOOK_SEARCH_BACKEND = os.getenv("BOOK_SEARCH_BACKEND", "postgres")
+
+# Stripe settings
+STRIPE_API_KEY = os.getenv("STRIPE_API_KEY")
+STRIPE_PUBLIC_KEY = os.getenv("STRIPE_PUBLIC_KEY")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+# (connect, read) timeouts of each call to Stripe, in seconds
+STRIPE_TIMEOUT = (3.05, 10)
+# Pooled keep-alive connections to Stripe per process
+STRIPE_MAX_IN_FLIGHT = int(os.getenv("STRIPE_MAX_IN_FLIGHT", "10"))
+STRIPE_MAX_RETRIES = int(os.getenv("STRIPE_MAX_RETRIES", "2"))
+# Start no retry once a call has taken this many seconds
+STRIPE_DEADLINE = float(os.getenv("STRIPE_DEADLINE", "15"))
+# Fail fast for STRIPE_BREAKER_RESET seconds after this many failures in a row
+STRIPE_BREAKER_THRESHOLD = int(os.getenv("STRIPE_BREAKER_THRESHOLD", "5"))
+STRIPE_BREAKER_RESET = float(os.getenv("STRIPE_BREAKER_RESET", "30"))
+# Reject webhook deliveries signed longer ago than this many seconds
+STRIPE_WEBHOOK_TOLERANCE = int(os.getenv("STRIPE_WEBHOOK_TOLERANCE", "300"))
+STRIPE_EVENT_BATCH_SIZE = int(os.getenv("STRIPE_EVENT_BATCH_SIZE", "1000"))
+# Stop waiting for the payment of a paid checkout session after this many
+# seconds (checkout sessions expire after a day)
+STRIPE_EVENT_MAX_AGE = int(os.getenv("STRIPE_EVENT_MAX_AGE", "86400"))
+# Currency of every payment, as Stripe spells it
+PAYMENTS_CURRENCY = os.getenv("PAYMENTS_CURRENCY", "usd")
+# Create checkout sessions in a Celery task instead of during the request
+PAYMENTS_DEFERRED_SESSIONS = os.getenv("PAYMENTS_DEFERRED_SESSIONS", "True") == "True"
+
+# Instrumentation settings
+# Record per-endpoint latency and timings, served at /metrics
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "True") == "True"
+# Share of requests run under cProfile, each into a file of PROFILE_DIR
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", str(BASE_DIR / "profiles"))
+# "redis" serves at /metrics the counters of every worker added up, "local"
+# those of the worker that answered
+METRICS_BACKEND = os.getenv(
+    "METRICS_BACKEND", "redis" if os.getenv("CACHE_BACKEND") == "redis" else "local"
+)
+# Seconds a process keeps its counters before adding them to redis
+METRICS_PUSH_INTERVAL = float(os.getenv("METRICS_PUSH_INTERVAL", "5"))
@@ -0,0 +1,18 @@
+"""Settings for running the project locally and for the tests."""
+from .base import *  # noqa: F401,F403
+from .base import ASYNC_READ_VIEWS, INSTALLED_APPS, MIDDLEWARE
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = "django-insecure-q@)^jh3z2gv(lb5jxc#&d=rp(dnj52q4fhst7y6(plpid)jcn-"
+
+DEBUG = True
+
+# The toolbar middleware is sync only: under ASGI it would push every
+# request into the one thread that runs sync code.
+if not ASYNC_READ_VIEWS:
+    INSTALLED_APPS = [*INSTALLED_APPS, "debug_toolbar"]
+    MIDDLEWARE = [
+        MIDDLEWARE[0],
+        "debug_toolbar.middleware.DebugToolbarMiddleware",
+        *MIDDLEWARE[1:],
+    ]
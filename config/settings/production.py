@@ -0,0 +1,18 @@
+"""Settings for serving the project, see the ``serve`` command."""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR
+
+SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.environ["DJANGO_ALLOWED_HOSTS"].split(",")
+
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# Served behind a proxy that terminates TLS and sets X-Forwarded-Proto
+SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+SESSION_COOKIE_SECURE = os.getenv("DJANGO_SECURE_COOKIES", "True") == "True"
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
@@ -14,6 +14,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import (
@@ -22,13 +23,17 @@ from drf_spectacular.views import (
     SpectacularRedocView,
 )
 
+from config.views import DatabaseHealthView, MetricsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("books/", include("books.urls", namespace="books")),
     path("borrowings/", include("borrowings.urls", namespace="borrowings")),
     path("users/", include("users.urls", namespace="users")),
+    path("reports/", include("reports.urls", namespace="reports")),
+    path("health/database/", DatabaseHealthView.as_view(), name="database-health"),
+    path("metrics", MetricsView.as_view(), name="metrics"),
     path("", include("payments.urls", namespace="payments")),
-    path("__debug__/", include("debug_toolbar.urls")),
     path("api/doc/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/doc/swagger/",
@@ -39,3 +44,6 @@ urlpatterns = [
         "api/doc/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"
     ),
 ]
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
@@ -0,0 +1,58 @@
+import time
+
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import database, instrumentation
+
+
+@extend_schema(
+    description=(
+        "Round trip to the database, and the connections opened by the "
+        "process that answered, per request and Celery task"
+    ),
+    responses={200: OpenApiTypes.OBJECT, 503: OpenApiTypes.OBJECT},
+)
+class DatabaseHealthView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        started = time.perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except DatabaseError as error:
+            return Response(
+                {"status": "unavailable", "error": str(error)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response(
+            {
+                "status": "ok",
+                "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+                "connections": database.metrics(),
+            }
+        )
+
+
+@extend_schema(
+    description=(
+        "Latency histograms and query, external call and serializer time per "
+        "endpoint, of every process with METRICS_BACKEND=redis, in the "
+        "Prometheus text format"
+    ),
+    responses={(200, "text/plain"): OpenApiTypes.STR},
+)
+class MetricsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            instrumentation.exposition(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
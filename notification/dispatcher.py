@@ -0,0 +1,208 @@
+"""Coalescing dispatcher for borrowing notifications.
+
+Instead of one Celery task and one Bot API request per borrowing, events
+are appended to a buffer.  The first event of a window schedules
+``flush_notifications`` ``NOTIFICATION_WINDOW`` seconds later; the flush
+drains the buffer in batches, loads the books and users of a batch with
+one ``in_bulk`` each, and sends the rendered lines in as few messages as
+fit.
+
+A batch leaves the buffer only once its messages are sent, so a failed
+send leaves it for the retry.  One flush runs at a time, or two would
+send the same batch.
+"""
+import json
+import threading
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from books.models import Book
+from .reports import chunk_messages
+from .telegram import send_messages
+
+
+class LocalEventBuffer:
+    """In-process buffer; the flush has to run in the same process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flushing = threading.Lock()
+        self._events = deque()
+        self._window_open = False
+
+    def push(self, event: dict) -> bool:
+        """Buffer the event; returns True if it opened a new window."""
+        with self._lock:
+            self._events.append(event)
+            opened, self._window_open = not self._window_open, True
+            return opened
+
+    def close_window(self) -> None:
+        with self._lock:
+            self._window_open = False
+
+    def peek_batch(self, size: int) -> list:
+        with self._lock:
+            return list(islice(self._events, size))
+
+    def trim(self, count: int) -> None:
+        with self._lock:
+            for _ in range(min(count, len(self._events))):
+                self._events.popleft()
+
+    def start_flush(self) -> bool:
+        """Take the flush lock; False if another flush holds it."""
+        return self._flushing.acquire(blocking=False)
+
+    def extend_flush(self) -> None:
+        pass
+
+    def end_flush(self) -> None:
+        self._flushing.release()
+
+
+class RedisEventBuffer:
+    """Events in a Redis list, shared by web and worker processes."""
+
+    EVENTS_KEY = "notification:events"
+    WINDOW_KEY = "notification:window"
+    FLUSH_KEY = "notification:flushing"
+
+    def __init__(self, client, window):
+        self.client = client
+        # A lost flush must not keep the window shut forever.
+        self.window_ttl = max(int(window * 10), 60)
+        # Nor a crashed one the flush lock, which each batch renews.
+        self._flushing = client.lock(self.FLUSH_KEY, timeout=self.window_ttl)
+
+    def push(self, event: dict) -> bool:
+        pipe = self.client.pipeline()
+        pipe.rpush(self.EVENTS_KEY, json.dumps(event))
+        pipe.set(self.WINDOW_KEY, 1, nx=True, ex=self.window_ttl)
+        return bool(pipe.execute()[1])
+
+    def close_window(self) -> None:
+        self.client.delete(self.WINDOW_KEY)
+
+    def peek_batch(self, size: int) -> list:
+        return [
+            json.loads(event)
+            for event in self.client.lrange(self.EVENTS_KEY, 0, size - 1)
+        ]
+
+    def trim(self, count: int) -> None:
+        # Pushes only append, so the head is still the batch peeked at.
+        self.client.ltrim(self.EVENTS_KEY, count, -1)
+
+    def start_flush(self) -> bool:
+        """Take the flush lock; False if another flush holds it."""
+        return self._flushing.acquire(blocking=False)
+
+    def extend_flush(self) -> None:
+        self._flushing.reacquire()
+
+    def end_flush(self) -> None:
+        from redis.exceptions import LockError
+
+        try:
+            self._flushing.release()
+        except LockError:
+            # Expired and maybe taken by the next flush already.
+            pass
+
+
+@lru_cache
+def _build_buffer(backend: str):
+    if backend == "local":
+        return LocalEventBuffer()
+    if backend == "redis":
+        import redis
+
+        return RedisEventBuffer(
+            redis.Redis.from_url(settings.REDIS_URL), settings.NOTIFICATION_WINDOW
+        )
+    raise ValueError(f"Unknown notification buffer: {backend}")
+
+
+def get_event_buffer():
+    """Return the buffer configured by ``NOTIFICATION_BUFFER``."""
+    return _build_buffer(settings.NOTIFICATION_BUFFER)
+
+
+def notify_borrowing(book_id, user_id, expected_return_date) -> None:
+    """Queue a "book borrowed" message for the library chat."""
+    notify_borrowings([book_id], user_id, expected_return_date)
+
+
+def notify_borrowings(book_ids, user_id, expected_return_date) -> None:
+    """Queue one message for several books borrowed together."""
+    from .tasks import flush_notifications
+
+    event = {
+        "book_ids": [int(book_id) for book_id in book_ids],
+        "user_id": int(user_id),
+        "expected_return_date": str(expected_return_date),
+    }
+    if get_event_buffer().push(event):
+        flush_notifications.apply_async(countdown=settings.NOTIFICATION_WINDOW)
+
+
+def _book_ids(event) -> list:
+    # Events buffered before books borrowed together shared one carry a
+    # single "book_id".
+    return event.get("book_ids") or [event["book_id"]]
+
+
+def render(events):
+    """Yield one message line per event whose user still exists, leaving
+    out deleted books."""
+    books = Book.objects.in_bulk(
+        {book_id for event in events for book_id in _book_ids(event)}
+    )
+    users = get_user_model().objects.in_bulk({event["user_id"] for event in events})
+    for event in events:
+        borrowed = [books[id] for id in _book_ids(event) if id in books]
+        user = users.get(event["user_id"])
+        if not borrowed or user is None:
+            continue
+        titles = ", ".join(book.title for book in borrowed)
+        daily_fee = sum(book.daily_fee for book in borrowed)
+        yield (
+            f"{user.first_name} {user.last_name} borrowed {titles} "
+            f"expected return date: {event['expected_return_date']}. "
+            f"Price per day: {daily_fee}.\n"
+        )
+
+
+def flush(transport=None, batch_size=None, interval=None) -> int:
+    """Send every buffered event; returns the number of messages.
+
+    Events whose messages fail to send stay buffered, and the error is
+    raised for the task to retry.
+    """
+    from .tasks import flush_notifications
+
+    buffer = get_event_buffer()
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    if not buffer.start_flush():
+        # The running flush may be done before it sees this window's events.
+        flush_notifications.apply_async(countdown=settings.NOTIFICATION_WINDOW)
+        return 0
+    try:
+        # Events pushed from now on open a new window and a new flush.
+        buffer.close_window()
+
+        sent = 0
+        while events := buffer.peek_batch(batch_size):
+            sent += send_messages(
+                chunk_messages(render(events)), transport, interval=interval
+            )
+            buffer.trim(len(events))
+            buffer.extend_flush()
+        return sent
+    finally:
+        buffer.end_flush()
@@ -0,0 +1,84 @@
+"""A local stand-in for the Telegram Bot API, for benchmarks and tests.
+
+It answers ``sendMessage`` like Telegram does, keeps HTTP/1.1
+connections alive, and counts messages and TCP connections.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTelegramServer:
+    def __init__(self, latency=0.0, rate_limit_every=None):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.messages = []
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def answer(self, payload: dict) -> dict:
+        with self._lock:
+            self.requests += 1
+            limited = (
+                self.rate_limit_every and self.requests % self.rate_limit_every == 0
+            )
+            if not limited:
+                self.messages.append((payload["chat_id"], payload["text"]))
+        if self.latency:
+            time.sleep(self.latency)
+        if limited:
+            return {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }
+        return {"ok": True, "result": {"message_id": self.requests}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                result = server.answer(json.loads(self.rfile.read(length)))
+                body = json.dumps(result).encode()
+                self.send_response(200 if result["ok"] else result["error_code"])
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,106 @@
+import statistics
+import time
+import uuid
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.views import BorrowingViewSet
+from notification.models import OutboxEvent
+from notification.outbox import relay
+from payments.stripe_stub import fake_stripe
+
+
+class Command(BaseCommand):
+    """Django command to compare POST /borrowings/ latency when the event
+    goes straight to the broker against writing it to the outbox, and to
+    measure how fast the relay drains the outbox"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--broker-latencies",
+            type=float,
+            nargs="+",
+            default=[0.0005, 0.02],
+            help="Simulated broker round trips in seconds (co-located, remote)",
+        )
+
+    def handle(self, *args, **options) -> None:
+        user = get_user_model().objects.create_user(
+            f"benchmark-{uuid.uuid4().hex}@example.com", "benchmark"
+        )
+        book = Book.objects.create(
+            title="Benchmark book",
+            author="Benchmark author",
+            cover=Book.CoverType.SOFT,
+            inventory=options["requests"] * (len(options["broker_latencies"]) * 2 + 1),
+            daily_fee=1,
+        )
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(user)
+
+        self.stdout.write(
+            f"{'mode':<10}{'broker ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}"
+        )
+        try:
+            for latency in options["broker_latencies"]:
+                for mode in ("direct", "outbox"):
+                    timings = self.run_mode(
+                        client, book, mode, latency, options["requests"]
+                    )
+                    percentiles = statistics.quantiles(timings, n=100)
+                    self.stdout.write(
+                        f"{mode:<10}{latency * 1000:>10.1f}"
+                        f"{percentiles[49] * 1000:>10.1f}"
+                        f"{percentiles[98] * 1000:>10.1f}"
+                        f"{statistics.mean(timings) * 1000:>10.1f}"
+                    )
+
+            pending = OutboxEvent.objects.count()
+            with patch("notification.outbox.get_handler"):
+                started = time.perf_counter()
+                relayed = relay()
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"Relayed {relayed} of {pending} events in {elapsed:.2f}s "
+                f"({relayed / elapsed:.0f} events/s)"
+            )
+        finally:
+            user.delete()
+            book.delete()
+
+    def run_mode(self, client, book, mode, broker_latency, requests):
+        """In ``direct`` mode the outbox insert is replaced by a broker
+        round trip inside the request, like the old ``.delay()`` call."""
+
+        def broker_round_trip(topic, **payload):
+            time.sleep(broker_latency)
+
+        payload = {"book": book.id, "expected_return_date": "2100-01-01"}
+        timings = []
+        with ExitStack() as stack:
+            stack.enter_context(override_settings(PAYMENTS_DEFERRED_SESSIONS=True))
+            stack.enter_context(fake_stripe())
+            stack.enter_context(
+                patch("payments.tasks.create_stripe_session_for_payment.delay")
+            )
+            stack.enter_context(patch.object(BorrowingViewSet, "throttle_classes", []))
+            if mode == "direct":
+                stack.enter_context(
+                    patch("borrowings.views.publish", side_effect=broker_round_trip)
+                )
+
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.post(reverse("borrowings:borrowing-list"), payload)
+                timings.append(time.perf_counter() - started)
+                if response.status_code != 201:
+                    raise RuntimeError(f"Unexpected response: {response.data}")
+        return timings
@@ -0,0 +1,61 @@
+import time
+import tracemalloc
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from borrowings.models import Borrowing
+from notification.reports import chunk_messages, overdue_lines
+from notification.telegram import MESSAGE_LIMIT, FakeTransport, send_messages
+
+
+def legacy_report():
+    """The report as it used to be built: every row in memory, one string."""
+    borrowings = Borrowing.objects.filter(
+        actual_return_date__isnull=True, expected_return_date__lt=date.today()
+    ).select_related("user", "book")
+    message = ""
+    for borrowing in borrowings:
+        days_overdue = date.today() - borrowing.expected_return_date
+        int_days_overdue = int(str(days_overdue).split()[0])
+        message_days = (
+            f"{int_days_overdue} days" if int_days_overdue > 1 else "1 day"
+        )
+        message += (
+            f"{borrowing.user.first_name} {borrowing.user.last_name} "
+            f"overdue the book {borrowing.book.title} for "
+            f"{message_days}\n"
+        )
+    return [message]
+
+
+def streamed_report():
+    transport = FakeTransport()
+    send_messages(
+        chunk_messages(overdue_lines()), transport, chat_id=1, interval=0
+    )
+    return [text for _, text in transport.messages]
+
+
+class Command(BaseCommand):
+    """Django command to compare time, peak Python memory and message sizes
+    of the legacy and the streamed overdue report"""
+
+    def handle(self, *args, **options) -> None:
+        self.stdout.write(
+            f"{'mode':<10}{'seconds':>10}{'peak MB':>10}"
+            f"{'messages':>10}{'longest':>10}{'sendable':>10}"
+        )
+        for mode, build in (("legacy", legacy_report), ("streamed", streamed_report)):
+            tracemalloc.start()
+            started = time.perf_counter()
+            messages = build()
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+
+            longest = max(len(message) for message in messages)
+            self.stdout.write(
+                f"{mode:<10}{elapsed:>10.2f}{peak:>10.1f}{len(messages):>10}"
+                f"{longest:>10}{str(longest <= MESSAGE_LIMIT):>10}"
+            )
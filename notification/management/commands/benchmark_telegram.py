@@ -0,0 +1,75 @@
+import time
+from unittest.mock import patch
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from books.models import Book
+from notification import dispatcher
+from notification.fake_telegram import FakeTelegramServer
+from notification.telegram import HttpTransport
+
+
+class Command(BaseCommand):
+    """Django command to compare borrowing notifications sent one request
+    per event against the coalescing dispatcher, on a local fake Bot API"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=1000)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.01,
+            help="Simulated Bot API response time in seconds",
+        )
+
+    def handle(self, *args, **options) -> None:
+        book_ids = list(Book.objects.values_list("id", flat=True)[:100])
+        user_ids = list(get_user_model().objects.values_list("id", flat=True)[:100])
+        if not book_ids or not user_ids:
+            raise CommandError("No books or users found, run seed_library first.")
+        events = [
+            (book_ids[index % len(book_ids)], user_ids[index % len(user_ids)])
+            for index in range(options["events"])
+        ]
+
+        self.stdout.write(
+            f"{'mode':<12}{'seconds':>10}{'events/s':>10}"
+            f"{'messages':>10}{'connections':>12}"
+        )
+        for mode, run in (("per-event", self.per_event), ("dispatcher", self.dispatch)):
+            with FakeTelegramServer(latency=options["latency"]) as server:
+                started = time.perf_counter()
+                run(server, events)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{mode:<12}{elapsed:>10.2f}{len(events) / elapsed:>10.0f}"
+                f"{len(server.messages):>10}{server.connections:>12}"
+            )
+
+    def per_event(self, server, events):
+        """What every send_to_chat_borrowing_book task used to do."""
+        for book_id, user_id in events:
+            book = Book.objects.get(id=book_id)
+            user = get_user_model().objects.get(id=user_id)
+            requests.post(
+                f"{server.url}/bottest/sendMessage",
+                json={
+                    "chat_id": 1,
+                    "text": f"{user.first_name} {user.last_name} borrowed "
+                    f"{book.title} expected return date: 2100-01-01. "
+                    f"Price per day: {book.daily_fee}.",
+                },
+                timeout=10,
+            )
+
+    def dispatch(self, server, events):
+        transport = HttpTransport(base_url=server.url, token="test")
+        with override_settings(NOTIFICATION_BUFFER="local", TELEGRAM_CHAT_ID=1), patch(
+            "notification.tasks.flush_notifications.apply_async"
+        ):
+            for book_id, user_id in events:
+                dispatcher.notify_borrowing(book_id, user_id, "2100-01-01")
+            dispatcher.flush(transport, interval=0)
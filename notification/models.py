@@ -1,3 +1,13 @@
 from django.db import models
 
-# Create your models here.
+
+class OutboxEvent(models.Model):
+    """An event written in the same transaction as the change it
+    describes, and handed to its sink by ``relay_outbox`` afterwards."""
+
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.topic} #{self.id}"
@@ -0,0 +1,56 @@
+"""Transactional outbox.
+
+``publish`` only inserts an ``OutboxEvent`` row, so an event exists if
+and only if the transaction that caused it commits, and the request pays
+for one local insert instead of a broker round trip.  ``relay`` drains
+the table in batches, oldest first, handing each event to the handler
+``OUTBOX_HANDLERS`` configures for its topic.  Rows are deleted in the
+transaction that relayed them: a handler that raises leaves its whole
+batch for the next run, so delivery is at least once.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+
+BORROWING_CREATED = "borrowing.created"
+BORROWINGS_CREATED = "borrowings.created"
+
+
+def publish(topic: str, **payload) -> OutboxEvent:
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def get_handler(topic: str):
+    try:
+        return import_string(settings.OUTBOX_HANDLERS[topic])
+    except KeyError:
+        raise ValueError(f"No outbox handler for topic: {topic}")
+
+
+def relay_batch(batch_size: int) -> int:
+    """Relay up to ``batch_size`` events; returns how many were relayed.
+
+    Rows locked by a concurrent relay are skipped, so several workers can
+    drain the outbox side by side.
+    """
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True).order_by("id")[
+                :batch_size
+            ]
+        )
+        for event in events:
+            get_handler(event.topic)(**event.payload)
+        OutboxEvent.objects.filter(id__in=[event.id for event in events]).delete()
+    return len(events)
+
+
+def relay(batch_size=None) -> int:
+    """Relay batches until the outbox is empty."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    relayed = 0
+    while count := relay_batch(batch_size):
+        relayed += count
+    return relayed
@@ -0,0 +1,55 @@
+"""Overdue borrowing report, streamed from the database into messages
+that fit Telegram's size limit."""
+from datetime import date
+
+from django.db.models import DateField, F, Value
+
+from borrowings.models import Borrowing
+from payments.fees import DaysBetween
+from .telegram import MESSAGE_LIMIT
+
+REPORT_CHUNK_SIZE = 2000
+
+
+def overdue_lines(today=None, chunk_size=REPORT_CHUNK_SIZE):
+    """Yield one report line per overdue borrowing, oldest first.
+
+    Rows come from a server-side cursor, with the days overdue computed
+    by the database.
+    """
+    today = today or date.today()
+    rows = (
+        Borrowing.objects.filter(
+            actual_return_date__isnull=True, expected_return_date__lt=today
+        )
+        .annotate(
+            days_overdue=DaysBetween(
+                Value(today, output_field=DateField()), F("expected_return_date")
+            )
+        )
+        .order_by("expected_return_date", "id")
+        .values_list(
+            "user__first_name", "user__last_name", "book__title", "days_overdue"
+        )
+    )
+    for first_name, last_name, title, days in rows.iterator(chunk_size=chunk_size):
+        yield (
+            f"{first_name} {last_name} overdue the book {title} for "
+            f"{days} {'day' if days == 1 else 'days'}\n"
+        )
+
+
+def chunk_messages(lines, limit=MESSAGE_LIMIT):
+    """Pack lines into messages of at most ``limit`` characters, splitting
+    a line only when it does not fit in a message of its own."""
+    message = ""
+    for line in lines:
+        if len(message) + len(line) > limit and message:
+            yield message
+            message = ""
+        while len(line) > limit:
+            yield line[:limit]
+            line = line[limit:]
+        message += line
+    if message:
+        yield message
@@ -1,15 +1,13 @@
 from datetime import date
+from itertools import chain
 
 from celery import shared_task
-import telebot
-from django.conf import settings
-from django.contrib.auth import get_user_model
+from telebot.apihelper import ApiTelegramException
 
-from books.models import Book
-from borrowings.models import Borrowing
-
-
-bot = telebot.TeleBot(settings.TELEGRAM_TOKEN_API)
+from .dispatcher import flush, notify_borrowing
+from .outbox import relay
+from .reports import chunk_messages, overdue_lines
+from .telegram import RETRYABLE_ERRORS, send_messages
 
 
 @shared_task
@@ -18,33 +16,33 @@ def send_to_chat_borrowing_book(
         user_id,
         expected_return_date: date,
 ) -> None:
-    book = Book.objects.get(id=book_id)
-    user = get_user_model().objects.get(id=user_id)
-    message = (
-       f"{user.first_name} {user.last_name} borrowed {book.title} "
-       f"expected return date: {expected_return_date}. "
-       f"Price per day: {book.daily_fee}.")
-    bot.send_message(settings.TELEGRAM_CHAT_ID, message)
+    """Kept for tasks queued before the dispatcher; new events go
+    straight to ``notify_borrowing``."""
+    notify_borrowing(book_id, user_id, expected_return_date)
+
+
+# The events of a failed flush stay buffered; a retry sends them.
+@shared_task(
+    autoretry_for=(*RETRYABLE_ERRORS, ApiTelegramException),
+    retry_backoff=True,
+    retry_jitter=True,
+    max_retries=8,
+)
+def flush_notifications() -> int:
+    return flush()
+
+
+@shared_task
+def relay_outbox() -> int:
+    return relay()
 
 
 @shared_task
-def filter_borrowing_which_are_overdue() -> None:
-    borrowings = Borrowing.objects.filter(
-        actual_return_date__isnull=True,
-        expected_return_date__lt=date.today()
-    ).select_related("user", "book")
-    message = ""
-    if borrowings:
-        for borrowing in borrowings:
-            days_overdue = date.today() - borrowing.expected_return_date
-            int_days_overdue = int(str(days_overdue).split()[0])
-            message_days = f"{int_days_overdue} days" if int_days_overdue > 1 else f"{int_days_overdue} day"
-            message += (
-                f"{borrowing.user.first_name} {borrowing.user.last_name} "
-                f"overdue the book {borrowing.book.title} for "
-                f"{message_days}\n"
-            )
-    else:
-        message = "No borrowings overdue today!"
-
-    bot.send_message(settings.TELEGRAM_CHAT_ID, message)
+def filter_borrowing_which_are_overdue() -> int:
+    """Send the overdue borrowings report; returns the number of messages."""
+    messages = chunk_messages(overdue_lines())
+    first = next(messages, None)
+    if first is None:
+        return send_messages(["No borrowings overdue today!"])
+
+    return send_messages(chain([first], messages))
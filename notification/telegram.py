@@ -0,0 +1,172 @@
+"""Sending messages to the library's Telegram chat.
+
+``send_messages`` paces messages to stay under Telegram's per-chat rate
+limit, waits out ``429 Too Many Requests`` replies for as long as
+Telegram asks, and retries network errors with exponential backoff.
+``TELEGRAM_TRANSPORT=fake`` swaps the Bot API client for
+``FakeTransport``, which records messages instead of sending them.
+"""
+import threading
+import time
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, RequestException, Timeout
+from telebot.apihelper import ApiTelegramException
+
+from config.instrumentation import timed
+
+# Telegram rejects longer messages.
+MESSAGE_LIMIT = 4096
+
+
+class TelegramUnavailable(RequestException):
+    """Telegram, or a proxy in front of it, did not answer with the Bot
+    API's JSON, like an HTML ``502 Bad Gateway`` page."""
+
+
+RETRYABLE_ERRORS = (ConnectionError, Timeout, TelegramUnavailable)
+
+
+class HttpTransport:
+    """Bot API client on one pooled keep-alive ``requests.Session``.
+
+    At most ``max_in_flight`` requests are outstanding at once; further
+    senders block until a connection frees up instead of opening more.
+    """
+
+    def __init__(self, base_url=None, token=None, max_in_flight=None, timeout=None):
+        self.base_url = base_url or settings.TELEGRAM_API_URL
+        self.token = token or settings.TELEGRAM_TOKEN_API
+        self.timeout = timeout or settings.TELEGRAM_TIMEOUT
+        max_in_flight = max_in_flight or settings.TELEGRAM_MAX_IN_FLIGHT
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=max_in_flight, pool_block=True
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def send(self, chat_id, text) -> None:
+        with timed("telegram"):
+            response = self.session.post(
+                f"{self.base_url}/bot{self.token}/sendMessage",
+                json={"chat_id": chat_id, "text": text},
+                timeout=self.timeout,
+            )
+        try:
+            result = response.json()
+        except ValueError:
+            raise TelegramUnavailable(
+                f"sendMessage answered {response.status_code} without JSON",
+                response=response,
+            )
+        if not result.get("ok"):
+            raise ApiTelegramException("sendMessage", response, result)
+
+
+class FakeTransport:
+    """Records messages, optionally answering every ``rate_limit_every``-th
+    send with a 429 and sleeping ``latency`` seconds per call."""
+
+    def __init__(self, latency=0.0, rate_limit_every=None, retry_after=1):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.messages = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def send(self, chat_id, text) -> None:
+        if len(text) > MESSAGE_LIMIT:
+            raise ApiTelegramException(
+                "sendMessage",
+                None,
+                {
+                    "error_code": 400,
+                    "description": "Bad Request: message is too long",
+                },
+            )
+        with self._lock:
+            self.calls += 1
+            limited = self.rate_limit_every and self.calls % self.rate_limit_every == 0
+        if self.latency:
+            time.sleep(self.latency)
+        if limited:
+            raise ApiTelegramException(
+                "sendMessage",
+                None,
+                {
+                    "error_code": 429,
+                    "description": "Too Many Requests",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+            )
+        with self._lock:
+            self.messages.append((chat_id, text))
+
+
+TRANSPORTS = {
+    "http": HttpTransport,
+    "fake": FakeTransport,
+}
+
+
+@lru_cache
+def _build_transport(name: str):
+    try:
+        return TRANSPORTS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown Telegram transport: {name}")
+
+
+def get_transport():
+    """Return the transport configured by ``TELEGRAM_TRANSPORT``."""
+    return _build_transport(settings.TELEGRAM_TRANSPORT)
+
+
+def send_messages(
+    messages,
+    transport=None,
+    chat_id=None,
+    interval=None,
+    max_retries=5,
+    sleep=time.sleep,
+) -> int:
+    """Send ``messages`` one by one, at most one per ``interval`` seconds.
+
+    Returns the number of messages sent.  A message that still fails
+    after ``max_retries`` retries raises, leaving the rest unsent.
+    """
+    transport = transport or get_transport()
+    chat_id = chat_id or settings.TELEGRAM_CHAT_ID
+    if interval is None:
+        interval = settings.TELEGRAM_SEND_INTERVAL
+
+    sent = 0
+    next_send = 0.0
+    for text in messages:
+        for attempt in range(max_retries + 1):
+            wait = next_send - time.monotonic()
+            if wait > 0:
+                sleep(wait)
+            try:
+                transport.send(chat_id, text)
+                break
+            except ApiTelegramException as error:
+                if error.error_code != 429 or attempt == max_retries:
+                    raise
+                retry_after = error.result_json.get("parameters", {}).get(
+                    "retry_after", 1
+                )
+                next_send = time.monotonic() + retry_after
+            except RETRYABLE_ERRORS:
+                if attempt == max_retries:
+                    raise
+                next_send = time.monotonic() + min(2**attempt, 30)
+        sent += 1
+        next_send = time.monotonic() + interval
+    return sent
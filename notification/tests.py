@@ -1,3 +1,374 @@
-from django.test import TestCase
+import datetime
+from unittest.mock import patch
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from requests.exceptions import ConnectionError
+from rest_framework.test import APIClient
+from telebot.apihelper import ApiTelegramException
+
+from books.models import Book
+from borrowings.models import Borrowing
+from notification.dispatcher import (
+    flush,
+    get_event_buffer,
+    notify_borrowing,
+    notify_borrowings,
+)
+from notification.fake_telegram import FakeTelegramServer
+from notification.models import OutboxEvent
+from notification.outbox import BORROWING_CREATED, publish, relay
+from notification.reports import chunk_messages, overdue_lines
+from notification.tasks import filter_borrowing_which_are_overdue
+from notification.telegram import (
+    MESSAGE_LIMIT,
+    RETRYABLE_ERRORS,
+    FakeTransport,
+    HttpTransport,
+    TelegramUnavailable,
+    get_transport,
+    send_messages,
+)
+
+TODAY = datetime.date.today()
+
+
+class FlakyTransport(FakeTransport):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = list(failures)
+
+    def send(self, chat_id, text) -> None:
+        if self.failures:
+            raise self.failures.pop(0)
+        super().send(chat_id, text)
+
+
+def rate_limited(retry_after):
+    return ApiTelegramException(
+        "sendMessage",
+        None,
+        {
+            "error_code": 429,
+            "description": "Too Many Requests",
+            "parameters": {"retry_after": retry_after},
+        },
+    )
+
+
+@override_settings(TELEGRAM_TRANSPORT="fake", TELEGRAM_SEND_INTERVAL=0)
+class OverdueReportTests(TestCase):
+    def setUp(self) -> None:
+        self.transport = get_transport()
+        self.transport.messages.clear()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass", first_name="Ada", last_name="Lovelace"
+        )
+        self.book = Book.objects.create(
+            title="Sample book",
+            author="Sample author",
+            cover=Book.CoverType.HARD,
+            inventory=1000,
+            daily_fee=1,
+        )
+
+    def borrow(self, expected_in_days, returned=False):
+        return Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=TODAY + datetime.timedelta(days=expected_in_days),
+            actual_return_date=TODAY if returned else None,
+        )
+
+    def test_lines_compute_days_overdue(self):
+        self.borrow(-1)
+        self.borrow(-3)
+        self.borrow(-5, returned=True)
+        self.borrow(2)
+
+        self.assertEqual(
+            list(overdue_lines()),
+            [
+                "Ada Lovelace overdue the book Sample book for 3 days\n",
+                "Ada Lovelace overdue the book Sample book for 1 day\n",
+            ],
+        )
+
+    def test_report_is_split_into_messages_under_the_limit(self):
+        for _ in range(300):
+            self.borrow(-2)
+
+        sent = filter_borrowing_which_are_overdue()
+
+        texts = [text for _, text in self.transport.messages]
+        self.assertEqual(sent, len(texts))
+        self.assertGreater(sent, 1)
+        self.assertTrue(all(len(text) <= MESSAGE_LIMIT for text in texts))
+        self.assertEqual("".join(texts).count("overdue the book"), 300)
+
+    def test_empty_report(self):
+        self.borrow(1)
+
+        filter_borrowing_which_are_overdue()
+
+        self.assertEqual(
+            [text for _, text in self.transport.messages],
+            ["No borrowings overdue today!"],
+        )
+
+
+class ChunkMessagesTests(TestCase):
+    def test_lines_are_not_split_unless_too_long(self):
+        messages = list(chunk_messages(["aaaa\n", "bbbb\n", "c" * 12], limit=10))
+
+        self.assertEqual(messages, ["aaaa\nbbbb\n", "c" * 10, "cc"])
+
+
+class SendMessagesTests(TestCase):
+    def test_rate_limit_waits_retry_after(self):
+        transport = FlakyTransport([rate_limited(7)])
+        waits = []
+
+        sent = send_messages(
+            ["one", "two"], transport, chat_id=1, interval=0, sleep=waits.append
+        )
+
+        self.assertEqual(sent, 2)
+        self.assertEqual([text for _, text in transport.messages], ["one", "two"])
+        self.assertEqual(len(waits), 1)
+        self.assertAlmostEqual(waits[0], 7, places=1)
+
+    def test_network_errors_are_retried_then_raised(self):
+        transport = FlakyTransport([ConnectionError()] * 3)
+
+        with self.assertRaises(ConnectionError):
+            send_messages(
+                ["one"], transport, chat_id=1, max_retries=2, sleep=lambda _: None
+            )
+        self.assertEqual(transport.messages, [])
+
+    def test_other_api_errors_are_not_retried(self):
+        transport = FakeTransport()
+
+        with self.assertRaises(ApiTelegramException):
+            send_messages(["x" * (MESSAGE_LIMIT + 1)], transport, chat_id=1)
+
+
+@override_settings(
+    NOTIFICATION_BUFFER="local", TELEGRAM_TRANSPORT="fake", TELEGRAM_SEND_INTERVAL=0
+)
+class DispatcherTests(TestCase):
+    def setUp(self) -> None:
+        self.transport = get_transport()
+        self.transport.messages.clear()
+        get_event_buffer().trim(1000)
+        get_event_buffer().close_window()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass", first_name="Ada", last_name="Lovelace"
+        )
+        self.books = [
+            Book.objects.create(
+                title=f"Book {index}",
+                author="Author",
+                cover=Book.CoverType.HARD,
+                inventory=1,
+                daily_fee=1,
+            )
+            for index in range(3)
+        ]
+
+    def test_events_are_coalesced_into_one_message(self):
+        with patch("notification.tasks.flush_notifications.apply_async") as flush_task:
+            for book in self.books:
+                notify_borrowing(book.id, self.user.id, "2100-01-01")
+
+        flush_task.assert_called_once_with(countdown=settings.NOTIFICATION_WINDOW)
+        with self.assertNumQueries(2):
+            sent = flush()
+
+        self.assertEqual(sent, 1)
+        text = self.transport.messages[0][1]
+        self.assertEqual(text.count("Ada Lovelace borrowed Book"), 3)
+
+    def test_flush_opens_a_new_window(self):
+        with patch("notification.tasks.flush_notifications.apply_async") as flush_task:
+            notify_borrowing(self.books[0].id, self.user.id, "2100-01-01")
+            flush()
+            notify_borrowing(self.books[1].id, self.user.id, "2100-01-01")
+
+        self.assertEqual(flush_task.call_count, 2)
+
+    def test_books_borrowed_together_share_a_line(self):
+        with patch("notification.tasks.flush_notifications.apply_async"):
+            notify_borrowings(
+                [book.id for book in self.books], self.user.id, "2100-01-01"
+            )
+
+        flush()
+
+        self.assertEqual(
+            self.transport.messages[0][1],
+            "Ada Lovelace borrowed Book 0, Book 1, Book 2 expected return date: "
+            "2100-01-01. Price per day: 3.00.\n",
+        )
+
+    def test_events_buffered_with_a_single_book_id(self):
+        get_event_buffer().push(
+            {
+                "book_id": self.books[0].id,
+                "user_id": self.user.id,
+                "expected_return_date": "2100-01-01",
+            }
+        )
+
+        flush()
+
+        self.assertIn("Ada Lovelace borrowed Book 0", self.transport.messages[0][1])
+
+    def test_failed_sends_keep_the_events_buffered(self):
+        with patch("notification.tasks.flush_notifications.apply_async"):
+            notify_borrowing(self.books[0].id, self.user.id, "2100-01-01")
+        forbidden = ApiTelegramException(
+            "sendMessage", None, {"error_code": 403, "description": "Forbidden"}
+        )
+        transport = FlakyTransport([forbidden])
+
+        with self.assertRaises(ApiTelegramException):
+            flush(transport=transport, interval=0)
+        self.assertEqual(flush(transport=transport, interval=0), 1)
+
+        self.assertIn("Book 0", transport.messages[0][1])
+        self.assertEqual(get_event_buffer().peek_batch(10), [])
+
+    def test_one_flush_at_a_time(self):
+        buffer = get_event_buffer()
+        self.assertTrue(buffer.start_flush())
+        try:
+            with patch(
+                "notification.tasks.flush_notifications.apply_async"
+            ) as flush_task:
+                notify_borrowing(self.books[0].id, self.user.id, "2100-01-01")
+                self.assertEqual(flush(), 0)
+        finally:
+            buffer.end_flush()
+
+        # The flush that found the lock taken runs again after the window.
+        self.assertEqual(flush_task.call_count, 2)
+        self.assertEqual(len(buffer.peek_batch(10)), 1)
+
+    def test_events_of_deleted_books_are_skipped(self):
+        with patch("notification.tasks.flush_notifications.apply_async"):
+            notify_borrowing(self.books[0].id, self.user.id, "2100-01-01")
+            notify_borrowing(self.books[1].id, self.user.id, "2100-01-01")
+        self.books[0].delete()
+
+        flush()
+
+        self.assertNotIn("Book 0", self.transport.messages[0][1])
+
+
+class HttpTransportTests(TestCase):
+    def test_messages_share_one_keep_alive_connection(self):
+        with FakeTelegramServer() as server:
+            transport = HttpTransport(base_url=server.url, token="test")
+            for index in range(5):
+                transport.send(42, f"message {index}")
+
+        self.assertEqual(len(server.messages), 5)
+        self.assertEqual(server.connections, 1)
+
+    def test_answers_without_json_are_retryable(self):
+        response = requests.Response()
+        response.status_code = 502
+        response._content = b"<html><body>502 Bad Gateway</body></html>"
+        transport = HttpTransport(base_url="http://telegram.invalid", token="test")
+
+        with patch.object(transport.session, "post", return_value=response):
+            with self.assertRaises(TelegramUnavailable):
+                transport.send(42, "hello")
+
+        self.assertTrue(issubclass(TelegramUnavailable, RETRYABLE_ERRORS))
+
+    def test_rate_limit_reply_is_raised_as_429(self):
+        with FakeTelegramServer(rate_limit_every=1) as server:
+            transport = HttpTransport(base_url=server.url, token="test")
+            with self.assertRaises(ApiTelegramException) as raised:
+                transport.send(42, "hello")
+
+        self.assertEqual(raised.exception.error_code, 429)
+        self.assertEqual(raised.exception.result_json["parameters"]["retry_after"], 1)
+
+
+class OutboxTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.book = Book.objects.create(
+            title="Sample book",
+            author="Sample author",
+            cover=Book.CoverType.HARD,
+            inventory=1,
+            daily_fee=1,
+        )
+
+    @patch("payments.utils.create_stripe_session")
+    def test_borrowing_and_event_are_written_together(self, _):
+        res = self.client.post(
+            reverse("borrowings:borrowing-list"),
+            {"book": self.book.id, "expected_return_date": "2100-01-01"},
+        )
+
+        self.assertEqual(res.status_code, 201)
+        event = OutboxEvent.objects.get()
+        self.assertEqual(
+            event.payload,
+            {
+                "book_id": self.book.id,
+                "user_id": self.user.id,
+                "expected_return_date": "2100-01-01",
+            },
+        )
+
+    @patch(
+        "payments.utils.create_stripe_session",
+        side_effect=RuntimeError("Stripe is down"),
+    )
+    def test_no_event_when_the_borrowing_rolls_back(self, _):
+        with override_settings(PAYMENTS_DEFERRED_SESSIONS=False), self.assertRaises(
+            RuntimeError
+        ):
+            self.client.post(
+                reverse("borrowings:borrowing-list"),
+                {"book": self.book.id, "expected_return_date": "2100-01-01"},
+            )
+
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertFalse(Borrowing.objects.exists())
+
+    def test_relay_hands_events_to_handler_in_order_and_deletes_them(self):
+        for index in range(5):
+            publish(BORROWING_CREATED, index=index)
+
+        with patch("notification.outbox.get_handler") as get_handler:
+            relayed = relay(batch_size=2)
+
+        self.assertEqual(relayed, 5)
+        self.assertEqual(
+            [call.kwargs for call in get_handler.return_value.call_args_list],
+            [{"index": index} for index in range(5)],
+        )
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_failed_batch_is_kept_for_the_next_run(self):
+        publish(BORROWING_CREATED, index=0)
+
+        with patch("notification.outbox.get_handler") as get_handler:
+            get_handler.return_value.side_effect = ConnectionError()
+            with self.assertRaises(ConnectionError):
+                relay()
+
+        self.assertEqual(OutboxEvent.objects.count(), 1)
@@ -0,0 +1,27 @@
+from rest_framework import permissions
+from rest_framework.exceptions import NotFound
+
+from config.async_api import AsyncAPIView
+from .models import Payment
+from .permissions import IsAdminOrSelf
+from .serializers import PaymentSerializer
+from .views import PaymentDetail as SyncPaymentDetail
+
+
+class PaymentDetail(AsyncAPIView):
+    """``GET /payments/<pk>/`` of the DRF ``PaymentDetail``."""
+
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrSelf]
+    sync_view = staticmethod(SyncPaymentDetail.as_view())
+
+    async def get(self, request, pk):
+        try:
+            # The book too: a payment without a stored amount is priced
+            # from it, and no query may run lazily here.
+            payment = await Payment.objects.select_related("borrowing__book").aget(
+                pk=pk
+            )
+        except Payment.DoesNotExist:
+            raise NotFound()
+        self.check_object_permissions(request, payment)
+        return PaymentSerializer(payment).data
@@ -0,0 +1,178 @@
+"""Rental and fine amounts, computed in one place.
+
+``rental_expression`` and ``fine_expression`` compute the amounts in SQL;
+``amount_for`` does the same arithmetic for a borrowing that is already in
+memory.  Both are exact to the cent: day counts are whole numbers and
+``Book.daily_fee`` has two decimal places.
+
+``Payment.amount`` stores the result in cents, and listings, exports and
+Stripe all read it: ``price`` sets it on a payment before it is saved,
+``price_many`` on a batch of them, and ``reprice`` recomputes it for a
+whole queryset in one ``UPDATE``.
+
+A fine accrues from the expected return date until the book comes back,
+so the fine of a borrowing that is still out grows every day; the nightly
+accrual reprices those fines.
+"""
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import (
+    Case,
+    DateField,
+    DecimalField,
+    F,
+    Func,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
+
+from borrowings.models import Borrowing
+from .models import Payment
+
+FINE_MULTIPLIER = 2
+
+AMOUNT_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
+class DaysBetween(Func):
+    """Whole days from ``start`` to ``end``; PostgreSQL subtracts two
+    dates to an integer."""
+
+    arg_joiner = " - "
+    template = "(%(expressions)s)"
+    output_field = IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+
+def rental_expression(prefix=""):
+    """Rental of the borrowing at ``prefix`` (ex. ``"borrowing__"``)."""
+    return DaysBetween(
+        F(f"{prefix}expected_return_date"), F(f"{prefix}borrow_date")
+    ) * F(f"{prefix}book__daily_fee")
+
+
+def fine_expression(prefix="", today=None):
+    """Fine of the borrowing at ``prefix``, accrued until ``today`` if the
+    book is still out."""
+    returned = Coalesce(
+        F(f"{prefix}actual_return_date"),
+        Value(today or datetime.date.today(), output_field=DateField()),
+    )
+    return (
+        DaysBetween(returned, F(f"{prefix}expected_return_date"))
+        * F(f"{prefix}book__daily_fee")
+        * Value(FINE_MULTIPLIER)
+    )
+
+
+def amount_for(borrowing, payment_type, today=None) -> Decimal:
+    if payment_type == Payment.TypeType.PAYMENT:
+        days_borrowed = borrowing.expected_return_date - borrowing.borrow_date
+        return days_borrowed.days * borrowing.book.daily_fee
+
+    if payment_type == Payment.TypeType.FINE:
+        returned = (
+            borrowing.actual_return_date or today or datetime.date.today()
+        )
+        days_overdue = returned - borrowing.expected_return_date
+        return days_overdue.days * borrowing.book.daily_fee * FINE_MULTIPLIER
+
+    raise ValueError("Payment type has to be either PAYMENT or FINE")
+
+
+def to_cents(amount) -> int:
+    return round(Decimal(str(amount)) * 100)
+
+
+def price(payment, today=None):
+    """Set the amount and currency of an unsaved ``payment`` whose
+    borrowing and book are already in memory."""
+    payment.amount = to_cents(amount_for(payment.borrowing, payment.type, today))
+    payment.currency = settings.PAYMENTS_CURRENCY
+    return payment
+
+
+def _in_cents(borrowings, payment_type, today=None):
+    """``borrowings`` annotated with the amount of their ``payment_type``
+    payment in cents, as ``cents``."""
+    if payment_type == Payment.TypeType.PAYMENT:
+        amount = rental_expression()
+    else:
+        amount = fine_expression(today=today)
+    return borrowings.annotate(cents=Cast(amount * Value(100), IntegerField()))
+
+
+def price_from_database(payment, today=None):
+    """``price`` with a single query instead of the loaded borrowing."""
+    borrowing = Borrowing.objects.filter(pk=payment.borrowing_id)
+    payment.amount = (
+        _in_cents(borrowing, payment.type, today)
+        .values_list("cents", flat=True)
+        .get()
+    )
+    payment.currency = settings.PAYMENTS_CURRENCY
+    return payment
+
+
+def price_many(payments, today=None) -> list:
+    """``price_from_database`` for many unsaved payments, with a query per
+    payment type."""
+    for payment_type in Payment.TypeType.values:
+        unpriced = [payment for payment in payments if payment.type == payment_type]
+        if not unpriced:
+            continue
+        borrowings = Borrowing.objects.filter(
+            pk__in={payment.borrowing_id for payment in unpriced}
+        )
+        cents = dict(
+            _in_cents(borrowings, payment_type, today).values_list("id", "cents")
+        )
+        for payment in unpriced:
+            payment.amount = cents[payment.borrowing_id]
+            payment.currency = settings.PAYMENTS_CURRENCY
+    return payments
+
+
+def reprice(payments, today=None) -> int:
+    """Recompute the stored amounts of ``payments`` in one ``UPDATE``;
+    returns how many."""
+    borrowing = Borrowing.objects.filter(pk=OuterRef("borrowing_id"))
+    return payments.update(
+        amount=Case(
+            *[
+                When(
+                    type=payment_type,
+                    then=Subquery(
+                        _in_cents(borrowing, payment_type, today).values("cents")
+                    ),
+                )
+                for payment_type in Payment.TypeType.values
+            ]
+        ),
+        currency=settings.PAYMENTS_CURRENCY,
+    )
+
+
+def totals(payments) -> list:
+    """Stored amounts of ``payments`` summed per currency, in cents."""
+    return list(
+        payments.order_by("currency")
+        .values("currency")
+        .annotate(
+            total=Sum("amount", default=0),
+            pending=Sum(
+                "amount", filter=Q(status=Payment.StatusType.PENDING), default=0
+            ),
+            paid=Sum("amount", filter=Q(status=Payment.StatusType.PAID), default=0),
+        )
+    )
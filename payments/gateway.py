@@ -0,0 +1,173 @@
+"""The payments app's one configured Stripe client.
+
+``StripeGateway`` sends Stripe API calls over a pooled keep-alive
+``requests.Session`` with connect and read timeouts, and retries
+transient failures with jittered exponential backoff under the same
+idempotency key, so a retried create never opens a second session.
+After repeated failures its ``CircuitBreaker`` opens and calls raise
+``StripeUnavailable`` at once instead of tying up workers on a degraded
+Stripe; ``payments.utils`` then defers session creation to Celery.
+"""
+import random
+import threading
+import time
+import uuid
+from functools import lru_cache
+from urllib.parse import quote_plus
+
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from stripe.api_requestor import APIRequestor
+from stripe.http_client import RequestsClient
+from stripe.util import convert_to_stripe_object
+
+from config.instrumentation import timed
+
+# Failures worth retrying later: Stripe could not be reached or answered
+# with a server error or rate limit.
+TRANSIENT_ERRORS = (
+    stripe.error.APIConnectionError,
+    stripe.error.APIError,
+    stripe.error.RateLimitError,
+)
+
+SESSIONS_URL = stripe.checkout.Session.class_url()
+
+
+class StripeUnavailable(stripe.error.APIConnectionError):
+    """Raised without calling Stripe while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures.
+
+    While open, ``allow`` refuses calls for ``reset_timeout`` seconds;
+    then it lets a single trial call through, which closes the circuit
+    on success and opens it again on failure.
+    """
+
+    def __init__(self, threshold, reset_timeout, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+class StripeGateway:
+    """Stripe API calls with deadlines, retries and a circuit breaker.
+
+    No retry is started once a call has been going on for ``deadline``
+    seconds.
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        http_client=None,
+        max_retries=None,
+        backoff=0.5,
+        deadline=None,
+        breaker=None,
+        sleep=time.sleep,
+    ):
+        self.api_key = api_key or settings.STRIPE_API_KEY
+        self.http_client = http_client or self.pooled_client()
+        self.max_retries = (
+            settings.STRIPE_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.backoff = backoff
+        self.deadline = deadline or settings.STRIPE_DEADLINE
+        self.breaker = breaker or CircuitBreaker(
+            settings.STRIPE_BREAKER_THRESHOLD, settings.STRIPE_BREAKER_RESET
+        )
+        self.sleep = sleep
+
+    @staticmethod
+    def pooled_client():
+        """A Stripe HTTP client on one keep-alive session, with at most
+        ``STRIPE_MAX_IN_FLIGHT`` connections."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.STRIPE_MAX_IN_FLIGHT,
+            pool_block=True,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return RequestsClient(timeout=settings.STRIPE_TIMEOUT, session=session)
+
+    def create_checkout_session(self, idempotency_key=None, **params):
+        return self.request(
+            "post",
+            SESSIONS_URL,
+            params,
+            idempotency_key=idempotency_key or str(uuid.uuid4()),
+        )
+
+    def retrieve_checkout_session(self, session_id):
+        return self.request("get", f"{SESSIONS_URL}/{quote_plus(session_id)}")
+
+    def request(self, method, url, params=None, idempotency_key=None):
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        give_up_at = time.monotonic() + self.deadline
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise StripeUnavailable("Stripe is unavailable, try again later.")
+            requestor = APIRequestor(key=self.api_key, client=self.http_client)
+            try:
+                with timed("stripe"):
+                    response, api_key = requestor.request(method, url, params, headers)
+            except TRANSIENT_ERRORS:
+                self.breaker.failure()
+                delay = self.backoff * 2**attempt * random.uniform(0.5, 1)
+                if attempt == self.max_retries or time.monotonic() + delay > give_up_at:
+                    raise
+                self.sleep(delay)
+                continue
+            except stripe.error.StripeError:
+                # Stripe answered; the request itself was wrong.
+                self.breaker.success()
+                raise
+            self.breaker.success()
+            return convert_to_stripe_object(response, api_key, None, None)
+
+
+@lru_cache
+def _build_gateway() -> StripeGateway:
+    return StripeGateway()
+
+
+def get_gateway() -> StripeGateway:
+    """Return the process-wide gateway, built from the Stripe settings."""
+    return _build_gateway()
@@ -0,0 +1,80 @@
+import statistics
+import time
+import uuid
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.views import BorrowingViewSet
+from payments.stripe_stub import fake_stripe
+
+
+class Command(BaseCommand):
+    """Django command to measure POST /borrowings/ latency with Stripe
+    sessions created inline versus by the deferred payment pipeline"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--stripe-latency",
+            type=float,
+            default=0.3,
+            help="Simulated Stripe round trip in seconds",
+        )
+
+    def handle(self, *args, **options) -> None:
+        user = get_user_model().objects.create_user(
+            f"benchmark-{uuid.uuid4().hex}@example.com", "benchmark"
+        )
+        book = Book.objects.create(
+            title="Benchmark book",
+            author="Benchmark author",
+            cover=Book.CoverType.SOFT,
+            inventory=options["requests"] * 2,
+            daily_fee=1,
+        )
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(user)
+
+        self.stdout.write(
+            f"{options['requests']} requests, simulated Stripe latency "
+            f"{options['stripe_latency'] * 1000:.0f} ms"
+        )
+        self.stdout.write(f"{'mode':<10}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+        try:
+            for mode, deferred in (("inline", False), ("deferred", True)):
+                timings = self.run_mode(client, book, deferred, **options)
+                percentiles = statistics.quantiles(timings, n=100)
+                self.stdout.write(
+                    f"{mode:<10}{percentiles[49] * 1000:>10.1f}"
+                    f"{percentiles[98] * 1000:>10.1f}"
+                    f"{statistics.mean(timings) * 1000:>10.1f}"
+                )
+        finally:
+            user.delete()
+            book.delete()
+
+    def run_mode(self, client, book, deferred, requests, stripe_latency, **options):
+        payload = {"book": book.id, "expected_return_date": "2100-01-01"}
+        timings = []
+
+        with override_settings(PAYMENTS_DEFERRED_SESSIONS=deferred), fake_stripe(
+            stripe_latency
+        ), patch.object(BorrowingViewSet, "throttle_classes", []), patch(
+            "borrowings.views.notify_borrowing"
+        ), patch(
+            "payments.tasks.create_stripe_session_for_payment.delay"
+        ):
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.post(reverse("borrowings:borrowing-list"), payload)
+                timings.append(time.perf_counter() - started)
+                if response.status_code != 201:
+                    raise RuntimeError(f"Unexpected response: {response.data}")
+
+        return timings
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from payments.fees import amount_for, to_cents
+from payments.models import Payment
+
+
+class Command(BaseCommand):
+    """Django command to compare computing payment amounts per object
+    against reading the stored amount column"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--payments", type=int, default=100_000)
+
+    def handle(self, *args, **options) -> None:
+        ids = Payment.objects.order_by("id").values_list("id", flat=True)
+        ids = list(ids[: options["payments"]])
+        if not ids:
+            raise CommandError("No payments found, run seed_library first.")
+        payments = Payment.objects.filter(id__gte=ids[0], id__lte=ids[-1])
+
+        started = time.perf_counter()
+        per_object = {
+            payment.id: amount_for(payment.borrowing, payment.type)
+            for payment in payments.select_related("borrowing__book").iterator(
+                chunk_size=2000
+            )
+        }
+        per_object_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        stored = dict(payments.values_list("id", "amount").iterator(chunk_size=2000))
+        stored_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        total = payments.aggregate(total=Sum("amount"))["total"]
+        stored_aggregate_time = time.perf_counter() - started
+
+        # Pending fines of books still out keep accruing until the nightly
+        # reprice, so only the rest has to match to the cent.
+        stale = [
+            payment_id
+            for payment_id, amount in stored.items()
+            if amount != to_cents(per_object[payment_id])
+        ]
+
+        self.stdout.write(
+            f"{len(ids)} payments, total {total} cents, "
+            f"{len(stale)} stored amounts behind amount_for"
+        )
+        self.stdout.write(f"{'mode':<24}{'seconds':>10}{'rows/s':>12}")
+        for mode, elapsed in (
+            ("per-object amount_for", per_object_time),
+            ("stored rows", stored_time),
+            ("stored total only", stored_aggregate_time),
+        ):
+            self.stdout.write(
+                f"{mode:<24}{elapsed:>10.3f}{len(ids) / elapsed:>12.0f}"
+            )
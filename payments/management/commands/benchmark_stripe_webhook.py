@@ -0,0 +1,146 @@
+import copy
+import json
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.fees import price
+from payments.models import Payment, StripeEvent
+from payments.stripe_stub import load_recorded_events, sign_payload
+from payments.webhooks import apply_events
+
+SECRET = "whsec_benchmark"
+
+
+class Command(BaseCommand):
+    """Django command to replay signed Stripe events, built from the
+    recorded fixtures, through the webhook and to measure how fast the
+    inbox is applied to payments in batches and one event at a time"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=5000)
+        parser.add_argument(
+            "--duplicates",
+            type=float,
+            default=0.1,
+            help="Share of deliveries that repeat an earlier event",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Deliveries in flight at once, as Stripe sends them in parallel",
+        )
+        parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 1000])
+
+    def handle(self, *args, **options) -> None:
+        user = get_user_model().objects.create_user(
+            f"benchmark-{uuid.uuid4().hex}@example.com", "benchmark"
+        )
+        book = Book.objects.create(
+            title="Benchmark book",
+            author="Benchmark author",
+            cover=Book.CoverType.SOFT,
+            inventory=0,
+            daily_fee=1,
+        )
+        try:
+            with override_settings(STRIPE_WEBHOOK_SECRET=SECRET):
+                for batch_size in options["batch_sizes"]:
+                    self.run_round(user, book, batch_size, **options)
+        finally:
+            StripeEvent.objects.filter(event_id__startswith="evt_bench_").delete()
+            user.delete()
+            book.delete()
+
+    def run_round(
+        self, user, book, batch_size, events, duplicates, concurrency, **options
+    ):
+        session_ids = [f"cs_bench_{uuid.uuid4().hex}" for _ in range(events)]
+        borrowings = Borrowing.objects.bulk_create(
+            Borrowing(user=user, book=book, expected_return_date="2100-01-01")
+            for _ in session_ids
+        )
+        Payment.objects.bulk_create(
+            price(
+                Payment(
+                    borrowing=borrowing,
+                    status=Payment.StatusType.PENDING,
+                    type=Payment.TypeType.PAYMENT,
+                    stripe_session_id=session_id,
+                )
+            )
+            for borrowing, session_id in zip(borrowings, session_ids)
+        )
+
+        deliveries = self.build_deliveries(session_ids, duplicates)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(
+                executor.map(
+                    self.deliver,
+                    [deliveries[index::concurrency] for index in range(concurrency)],
+                )
+            )
+        ingest = time.perf_counter() - started
+
+        started = time.perf_counter()
+        applied = apply_events(batch_size=batch_size)
+        apply = time.perf_counter() - started
+
+        paid = Payment.objects.filter(
+            stripe_session_id__in=session_ids, status=Payment.StatusType.PAID
+        ).count()
+        self.stdout.write(
+            f"batch {batch_size}: ingested {len(deliveries)} deliveries in "
+            f"{ingest:.2f}s ({len(deliveries) / ingest:.0f}/s), applied "
+            f"{applied} events in {apply:.2f}s ({applied / apply:.0f}/s), "
+            f"{paid} payments paid"
+        )
+
+    def deliver(self, payloads):
+        client = APIClient(SERVER_NAME="localhost")
+        url = reverse("payments:stripe_webhook")
+        try:
+            for payload in payloads:
+                response = client.post(
+                    url,
+                    payload,
+                    content_type="application/json",
+                    HTTP_STRIPE_SIGNATURE=sign_payload(payload, SECRET),
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(f"Unexpected response: {response.data}")
+        finally:
+            connection.close()
+
+    def build_deliveries(self, session_ids, duplicates):
+        """One paid-session event per payment, from the recorded events,
+        with a share of them delivered twice."""
+        templates = [
+            event
+            for event in load_recorded_events()
+            if event["data"]["object"].get("payment_status") == "paid"
+        ]
+        rng = random.Random(42)
+        payloads = []
+        for session_id in session_ids:
+            event = copy.deepcopy(rng.choice(templates))
+            event["id"] = f"evt_bench_{uuid.uuid4().hex}"
+            event["data"]["object"]["id"] = session_id
+            payloads.append(json.dumps(event))
+
+        repeats = rng.sample(payloads, int(len(payloads) * duplicates))
+        deliveries = payloads + repeats
+        rng.shuffle(deliveries)
+        return deliveries
@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-18 03:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_payments(apps, schema_editor):
+    """Keep one payment per borrowing and type before the constraint
+    forbids more: the paid one, else one with a Stripe session, else the
+    first.  The others, left by requests retried before, are deleted."""
+    Payment = apps.get_model("payments", "Payment")
+    duplicated = (
+        Payment.objects.values("borrowing_id", "type")
+        .annotate(copies=Count("id"))
+        .filter(copies__gt=1)
+    )
+    for group in duplicated.iterator():
+        payments = Payment.objects.filter(
+            borrowing_id=group["borrowing_id"], type=group["type"]
+        ).order_by(
+            models.Case(
+                models.When(status="PAID", then=0),
+                models.When(stripe_session_id__isnull=False, then=1),
+                default=2,
+            ),
+            "id",
+        )
+        kept = payments.values_list("id", flat=True).first()
+        payments.exclude(id=kept).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0004_alter_payment_stripe_session_url"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="payment",
+            name="stripe_session_id",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, null=True
+            ),
+        ),
+        migrations.RunPython(remove_duplicate_payments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                fields=("borrowing", "type"), name="unique_payment_type_per_borrowing"
+            ),
+        ),
+    ]
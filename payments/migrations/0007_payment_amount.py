@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-18 03:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0006_stripe_event"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="amount",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="currency",
+            field=models.CharField(default="usd", max_length=3),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["amount", "id"], name="payment_amount_idx"),
+        ),
+    ]
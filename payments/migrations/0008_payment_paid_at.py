@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-18 04:04
+
+from django.db import migrations, models
+from django.db.models import DateTimeField, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce
+
+
+def estimate_paid_at(apps, schema_editor):
+    """Payments paid before the column existed: rentals are paid when the
+    book is borrowed and fines when it comes back."""
+    Borrowing = apps.get_model("borrowings", "Borrowing")
+    Payment = apps.get_model("payments", "Payment")
+    borrowing = Borrowing.objects.filter(pk=OuterRef("borrowing_id"))
+    paid = Payment.objects.filter(status="PAID", paid_at__isnull=True)
+    for payment_type, paid_on in (
+        ("PAYMENT", borrowing.values("borrow_date")),
+        (
+            "FINE",
+            borrowing.annotate(
+                paid_on=Coalesce("actual_return_date", "borrow_date")
+            ).values("paid_on"),
+        ),
+    ):
+        paid.filter(type=payment_type).update(
+            paid_at=Cast(Subquery(paid_on), DateTimeField())
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("borrowings", "0003_borrowing_borrowing_overdue_idx_and_more"),
+        ("payments", "0007_payment_amount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="paid_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(estimate_paid_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                condition=models.Q(("status", "PAID")),
+                fields=["paid_at", "type"],
+                include=("amount",),
+                name="payment_revenue_idx",
+            ),
+        ),
+    ]
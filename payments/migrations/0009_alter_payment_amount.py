@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-18 06:30
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import DateField, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
+
+from payments.fees import DaysBetween
+
+FINE_MULTIPLIER = 2
+
+
+def fill_amounts(apps, schema_editor):
+    """Payments created before the amount was stored, priced like
+    ``payments.fees.reprice`` does."""
+    Borrowing = apps.get_model("borrowings", "Borrowing")
+    Payment = apps.get_model("payments", "Payment")
+    days = {
+        "PAYMENT": DaysBetween(F("expected_return_date"), F("borrow_date")),
+        "FINE": DaysBetween(
+            Coalesce(
+                F("actual_return_date"),
+                Value(datetime.date.today(), output_field=DateField()),
+            ),
+            F("expected_return_date"),
+        )
+        * Value(FINE_MULTIPLIER),
+    }
+    for payment_type, day_count in days.items():
+        cents = Borrowing.objects.filter(pk=OuterRef("borrowing_id")).annotate(
+            cents=Cast(day_count * F("book__daily_fee") * Value(100), IntegerField())
+        )
+        Payment.objects.filter(amount__isnull=True, type=payment_type).update(
+            amount=Subquery(cents.values("cents"))
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("borrowings", "0003_borrowing_borrowing_overdue_idx_and_more"),
+        ("payments", "0008_payment_paid_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_amounts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="payment",
+            name="amount",
+            field=models.IntegerField(),
+        ),
+    ]
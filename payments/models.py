@@ -1,16 +1,10 @@
-import os
-import stripe
-
-from _decimal import Decimal
+from decimal import Decimal
 
 from django.core.validators import URLValidator
 from django.db import models
-from rest_framework.exceptions import ValidationError
 
 from borrowings.models import Borrowing
 
-FINE_MULTIPLIER = 2
-
 
 class Payment(models.Model):
     class StatusType(models.TextChoices):
@@ -31,74 +25,66 @@ class Payment(models.Model):
         null=True,
         blank=True
     )
-    stripe_session_id = models.CharField(max_length=255, null=True, blank=True)
-
-    @property
-    def money_to_pay(self):
-        if self.type == "PAYMENT":
-            days_borrowed = (
-                self.borrowing.expected_return_date - self.borrowing.borrow_date
-            ).days
-            return Decimal(days_borrowed) * self.borrowing.book.daily_fee
-        if self.type == "FINE" and self.borrowing.actual_return_date:
-            days_overdue = (
-                self.borrowing.actual_return_date - self.borrowing.expected_return_date
-            ).days
-            return (
-                Decimal(days_overdue)
-                * self.borrowing.book.daily_fee
-                * Decimal(FINE_MULTIPLIER)
-            )
-
-    def create_stripe_session(self, success_url, cancel_url):
-        line_items = [
-            {
-                "price_data": {
-                    "currency": "usd",
-                    "product_data": {
-                        "name": f"{self.type} for {self.borrowing.book.title}",
-                    },
-                    "unit_amount": int(self.money_to_pay * 100),
-                },
-                "quantity": 1,
-            }
+    stripe_session_id = models.CharField(
+        max_length=255, null=True, blank=True, db_index=True
+    )
+    # In the smallest unit of the currency (cents); set on creation by
+    # payments.fees.
+    amount = models.IntegerField()
+    currency = models.CharField(max_length=3, default="usd")
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["borrowing", "type"],
+                name="unique_payment_type_per_borrowing",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["amount", "id"], name="payment_amount_idx"),
+            # Revenue reports: paid payments by date, read from the index.
+            models.Index(
+                fields=["paid_at", "type"],
+                include=["amount"],
+                condition=models.Q(status="PAID"),
+                name="payment_revenue_idx",
+            ),
         ]
 
-        stripe.api_key = os.getenv("STRIPE_API_KEY")
-        session = stripe.checkout.Session.create(
-            payment_method_types=["card"],
-            line_items=line_items,
-            mode="payment",
-            success_url=success_url,
-            cancel_url=cancel_url,
-        )
+    def save(self, *args, **kwargs):
+        if self.amount is None:
+            from .fees import price_from_database
 
-        self.stripe_session_id = session["id"]
-        self.stripe_session_url = session["url"]
-        self.save()
+            price_from_database(self)
+        super().save(*args, **kwargs)
 
-        return session
+    @property
+    def money_to_pay(self):
+        return Decimal(self.amount).scaleb(-2)
 
-    def validate_unique(self, exclude=None):
-        super().validate_unique(exclude)
+    def __str__(self) -> str:
+        return self.status
 
-        existing_payments = Payment.objects.filter(
-            borrowing=self.borrowing, type=self.type
-        )
 
-        if self.pk:
-            existing_payments = existing_payments.exclude(pk=self.pk)
+class StripeEvent(models.Model):
+    """Inbox of verified Stripe webhook events, one row per event id."""
 
-        if existing_payments.exists():
-            raise ValidationError(
-                {
-                    "type": f"A payment with type '{self.type}' already exists for this borrowing."
-                }
-            )
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
 
-    def save(self, *args, **kwargs):
-        self.validate_unique()
-        super().save(*args, **kwargs)
+    class Meta:
+        indexes = [
+            # The worker's queue: unprocessed events, oldest first.
+            models.Index(
+                fields=["id"],
+                condition=models.Q(processed_at__isnull=True),
+                name="stripe_event_pending_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
-        return self.status
+        return f"{self.type} {self.event_id}"
@@ -3,4 +3,4 @@ from rest_framework import permissions
 
 class IsAdminOrSelf(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return request.user.is_staff or request.user == obj.borrowing.user
+        return request.user.is_staff or request.user.id == obj.borrowing.user_id
@@ -1,9 +1,12 @@
 from django.urls import reverse
 from .models import Payment
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
 
+from config.instrumentation import TimedSerializerMixin
 
-class PaymentSerializer(serializers.ModelSerializer):
+
+class PaymentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = (
@@ -14,4 +17,31 @@ class PaymentSerializer(serializers.ModelSerializer):
             "stripe_session_url",
             "stripe_session_id",
             "money_to_pay",
+            "amount",
+            "currency",
         )
+        read_only_fields = ("amount", "currency")
+        validators = [
+            UniqueTogetherValidator(
+                queryset=Payment.objects.all(),
+                fields=("borrowing", "type"),
+                message="A payment with this type already exists for this borrowing.",
+            )
+        ]
+
+
+class PaymentFilterSerializer(serializers.Serializer):
+    min_amount = serializers.IntegerField(
+        required=False, help_text="In cents (ex. ?min_amount=500)"
+    )
+    max_amount = serializers.IntegerField(
+        required=False, help_text="In cents (ex. ?max_amount=2000)"
+    )
+    ordering = serializers.ChoiceField(
+        choices=["id", "-id", "amount", "-amount"], required=False
+    )
+    totals = serializers.BooleanField(
+        default=False,
+        help_text="Add the totals of every matching payment per currency "
+        "(ex. ?totals=true)",
+    )
@@ -0,0 +1,208 @@
+"""A local stand-in for the parts of the Stripe API this project uses.
+
+Used by tests and benchmarks so they neither need network access nor an
+API key, while still paying a configurable round-trip latency.
+``FakeStripeClient`` plugs it into a real ``StripeGateway`` as its HTTP
+client and can inject timeouts, server errors and outages.
+"""
+import hashlib
+import hmac
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qsl, unquote_plus, urlsplit
+
+import stripe
+from stripe.http_client import HTTPClient
+
+from .gateway import SESSIONS_URL, StripeGateway
+
+# Form-encoded parameters the fake reads back as integers.
+INTEGER_PARAMS = {"quantity", "unit_amount"}
+
+TIMEOUT, SERVER_ERROR = "timeout", "server_error"
+
+
+class FakeCheckoutSession:
+    """Answers ``stripe.checkout.Session`` calls from memory."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sessions = {}
+        self.calls = []
+        self._idempotent = {}
+        self._lock = threading.Lock()
+
+    def create(self, idempotency_key=None, **params):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls.append(dict(params, idempotency_key=idempotency_key))
+            if idempotency_key in self._idempotent:
+                return self._idempotent[idempotency_key]
+
+            session_id = f"cs_test_{uuid.uuid4().hex}"
+            session = {
+                "id": session_id,
+                "object": "checkout.session",
+                "url": f"https://checkout.stripe.com/c/pay/{session_id}",
+                "payment_status": "unpaid",
+                "line_items": params.get("line_items", []),
+            }
+            self.sessions[session_id] = session
+            if idempotency_key:
+                self._idempotent[idempotency_key] = session
+            return session
+
+    def retrieve(self, session_id, **params):
+        time.sleep(self.latency)
+        try:
+            return self.sessions[session_id]
+        except KeyError:
+            raise stripe.error.InvalidRequestError(
+                f"No such checkout.session: '{session_id}'", "id"
+            )
+
+    def pay(self, session_id) -> None:
+        """Complete the checkout, as the customer would on Stripe's page."""
+        self.sessions[session_id]["payment_status"] = "paid"
+
+
+def decode_form(body) -> dict:
+    """Parameters from Stripe's form encoding, e.g. ``items[0][name]=x``."""
+    params = {}
+    for key, value in parse_qsl(body or "", keep_blank_values=True):
+        *parents, name = re.findall(r"[^\[\]]+", key)
+        node = params
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[name] = int(value) if name in INTEGER_PARAMS else value
+    return _nest_lists(params)
+
+
+def _nest_lists(node):
+    if not isinstance(node, dict):
+        return node
+    if node and all(key.isdigit() for key in node):
+        return [_nest_lists(node[key]) for key in sorted(node, key=int)]
+    return {key: _nest_lists(value) for key, value in node.items()}
+
+
+class FakeStripeClient(HTTPClient):
+    """A Stripe HTTP client answered by a ``FakeCheckoutSession``.
+
+    A ``timeout_rate`` share of calls is processed but the answer is lost,
+    as after a read timeout, and an ``error_rate`` share is answered with
+    a 500.  ``inject`` queues faults for the next calls; while ``down``,
+    every call fails to connect.
+    """
+
+    name = "fake"
+
+    def __init__(self, server, timeout_rate=0.0, error_rate=0.0, seed=None):
+        super().__init__()
+        self.server = server
+        self.timeout_rate = timeout_rate
+        self.error_rate = error_rate
+        self.down = False
+        self.requests = 0
+        self._faults = deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def inject(self, *faults) -> None:
+        self._faults.extend(faults)
+
+    def _next_fault(self):
+        with self._lock:
+            self.requests += 1
+            if self._faults:
+                return self._faults.popleft()
+            roll = self._random.random()
+        if roll < self.timeout_rate:
+            return TIMEOUT
+        if roll < self.timeout_rate + self.error_rate:
+            return SERVER_ERROR
+        return None
+
+    def request(self, method, url, headers, post_data=None):
+        fault = self._next_fault()
+        if self.down:
+            raise stripe.error.APIConnectionError(
+                "Could not connect to Stripe.", should_retry=True
+            )
+        if fault == SERVER_ERROR:
+            return self._error(500, "api_error", "Something went wrong.")
+
+        path = urlsplit(url).path
+        try:
+            if method == "post" and path == SESSIONS_URL:
+                body = self.server.create(
+                    idempotency_key=headers.get("Idempotency-Key"),
+                    **decode_form(post_data),
+                )
+            elif method == "get" and path.startswith(f"{SESSIONS_URL}/"):
+                body = self.server.retrieve(
+                    unquote_plus(path[len(SESSIONS_URL) + 1 :])
+                )
+            else:
+                return self._error(
+                    404, "invalid_request_error", f"Unrecognized request URL: {path}"
+                )
+        except stripe.error.InvalidRequestError as error:
+            return self._error(
+                404, "invalid_request_error", error.user_message, error.param
+            )
+
+        if fault == TIMEOUT:
+            raise stripe.error.APIConnectionError(
+                "Request to Stripe timed out.", should_retry=True
+            )
+        return json.dumps(body), 200, {}
+
+    @staticmethod
+    def _error(code, error_type, message, param=None):
+        body = {"error": {"type": error_type, "message": message, "param": param}}
+        return json.dumps(body), code, {}
+
+    def close(self) -> None:
+        pass
+
+
+@contextmanager
+def fake_stripe(latency: float = 0.0, **faults):
+    """Answer the gateway's Stripe calls with a ``FakeCheckoutSession``.
+
+    ``faults`` configure its ``FakeStripeClient``, reachable as
+    ``.client``; the gateway is ``.gateway`` and retries without waiting.
+    """
+    fake = FakeCheckoutSession(latency)
+    fake.client = FakeStripeClient(fake, **faults)
+    fake.gateway = StripeGateway(
+        api_key="sk_test_fake", http_client=fake.client, backoff=0.0
+    )
+    with patch("payments.gateway._build_gateway", return_value=fake.gateway):
+        yield fake
+
+
+RECORDED_EVENTS = Path(__file__).parent / "tests" / "fixtures" / "stripe_events.json"
+
+
+def load_recorded_events() -> list:
+    """Webhook events recorded from the Stripe test mode."""
+    return json.loads(RECORDED_EVENTS.read_text())
+
+
+def sign_payload(payload: str, secret: str, timestamp=None) -> str:
+    """A ``Stripe-Signature`` header for ``payload``, as Stripe signs it."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
@@ -0,0 +1,135 @@
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+
+from celery import shared_task
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from borrowings.models import Borrowing
+from .fees import price_many, reprice
+from .gateway import TRANSIENT_ERRORS
+from .models import Payment
+from .utils import create_checkout_session, create_stripe_session
+from .webhooks import apply_events
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@shared_task(
+    autoretry_for=TRANSIENT_ERRORS,
+    retry_backoff=True,
+    retry_jitter=True,
+    max_retries=8,
+)
+def create_stripe_session_for_payment(payment_id: int) -> None:
+    payment = (
+        Payment.objects.select_related("borrowing__book")
+        .filter(pk=payment_id, stripe_session_id__isnull=True)
+        .first()
+    )
+    if payment is None:
+        # Deleted, or a previous attempt already stored the session.
+        return
+
+    create_stripe_session(payment)
+
+
+@shared_task(
+    autoretry_for=TRANSIENT_ERRORS,
+    retry_backoff=True,
+    retry_jitter=True,
+    max_retries=8,
+)
+def create_stripe_session_for_payments(payment_ids: list) -> None:
+    """One checkout session shared by several payments."""
+    payments = list(
+        Payment.objects.select_related("borrowing__book")
+        .filter(pk__in=payment_ids, stripe_session_id__isnull=True)
+        .order_by("id")
+    )
+    if not payments:
+        return
+
+    create_checkout_session(payments)
+
+
+@shared_task(
+    autoretry_for=TRANSIENT_ERRORS,
+    retry_backoff=True,
+    retry_jitter=True,
+    max_retries=8,
+)
+def create_stripe_session_for_each_payment(payment_ids: list) -> None:
+    """A separate checkout session per payment; a retry skips the
+    payments that already got theirs."""
+    payments = (
+        Payment.objects.select_related("borrowing__book")
+        .filter(pk__in=payment_ids, stripe_session_id__isnull=True)
+        .order_by("id")
+    )
+    for payment in payments:
+        create_stripe_session(payment)
+
+
+@shared_task
+def accrue_overdue_fines(batch_size: int = 5000) -> dict:
+    """Open a PENDING fine for every overdue borrowing that has none yet
+    and report the outstanding fines of books that are still out.
+
+    The fine amount keeps accruing until the book is returned, so every
+    run reprices the fines of books still out; on return, ``return_book``
+    gets the fine a Stripe session.
+    """
+    today = date.today()
+    overdue = (
+        Borrowing.objects.filter(
+            actual_return_date__isnull=True, expected_return_date__lt=today
+        )
+        .exclude(payments__type=Payment.TypeType.FINE)
+        .values_list("id", flat=True)
+    )
+
+    opened = 0
+    for batch in batched(overdue.iterator(chunk_size=batch_size), batch_size):
+        with transaction.atomic():
+            Payment.objects.bulk_create(
+                price_many(
+                    [
+                        Payment(
+                            borrowing_id=borrowing_id,
+                            status=Payment.StatusType.PENDING,
+                            type=Payment.TypeType.FINE,
+                        )
+                        for borrowing_id in batch
+                    ],
+                    today,
+                ),
+                # A return may have opened the fine since the batch was read.
+                ignore_conflicts=True,
+            )
+            opened += len(batch)
+
+    # Fines of books still out have grown by another day.
+    outstanding = Payment.objects.filter(
+        type=Payment.TypeType.FINE,
+        status=Payment.StatusType.PENDING,
+        borrowing__actual_return_date__isnull=True,
+    )
+    reprice(outstanding, today)
+    outstanding = outstanding.aggregate(count=Count("id"), total=Sum("amount"))
+
+    return {
+        "opened": opened,
+        "outstanding": outstanding["count"],
+        "total": str(Decimal(outstanding["total"] or 0).scaleb(-2)),
+    }
+
+
+@shared_task
+def apply_stripe_events() -> int:
+    return apply_events()
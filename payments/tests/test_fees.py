@@ -0,0 +1,106 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.fees import amount_for, to_cents
+from payments.models import Payment
+from payments.tasks import accrue_overdue_fines
+
+TODAY = datetime.date.today()
+
+
+def days(count):
+    return TODAY + datetime.timedelta(days=count)
+
+
+class FeeEngineTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.book = Book.objects.create(
+            title="Sample book",
+            author="Sample author",
+            cover=Book.CoverType.HARD,
+            inventory=3,
+            daily_fee=Decimal("0.33"),
+        )
+
+    def borrow(self, expected, actual=None, borrowed=-10):
+        borrowing = Borrowing.objects.create(
+            user=self.user, book=self.book, expected_return_date=expected
+        )
+        Borrowing.objects.filter(pk=borrowing.pk).update(
+            borrow_date=days(borrowed), actual_return_date=actual
+        )
+        borrowing.refresh_from_db()
+        return borrowing
+
+    def pay(self, borrowing, payment_type):
+        return Payment.objects.create(
+            borrowing=borrowing,
+            status=Payment.StatusType.PENDING,
+            type=payment_type,
+        )
+
+    def test_stored_amounts_match_per_object_amounts_to_the_cent(self):
+        returned_late = self.borrow(days(-4), actual=days(-1))
+        still_out = self.borrow(days(-3))
+        self.pay(returned_late, Payment.TypeType.PAYMENT)
+        self.pay(returned_late, Payment.TypeType.FINE)
+        self.pay(still_out, Payment.TypeType.FINE)
+
+        stored = dict(Payment.objects.values_list("id", "amount"))
+        expected = {
+            payment.id: to_cents(amount_for(payment.borrowing, payment.type))
+            for payment in Payment.objects.select_related("borrowing__book")
+        }
+
+        self.assertEqual(stored, expected)
+        self.assertEqual(sorted(stored.values()), [198, 198, 198])
+
+    def test_accrue_overdue_fines_opens_each_fine_once(self):
+        overdue = self.borrow(days(-2))
+        self.borrow(days(3))
+        self.borrow(days(-5), actual=days(-1))
+
+        result = accrue_overdue_fines()
+        again = accrue_overdue_fines()
+
+        fine = Payment.objects.get(type=Payment.TypeType.FINE)
+        self.assertEqual(fine.borrowing, overdue)
+        self.assertEqual(result, {"opened": 1, "outstanding": 1, "total": "1.32"})
+        self.assertEqual(again["opened"], 0)
+
+    @override_settings(PAYMENTS_DEFERRED_SESSIONS=True)
+    def test_return_reuses_accrued_fine(self):
+        overdue = self.borrow(days(-2))
+        accrue_overdue_fines()
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.post(
+            reverse("borrowings:borrowing-return-book", args=[overdue.id])
+        )
+
+        self.assertEqual(res.status_code, 200)
+        fine = Payment.objects.get(type=Payment.TypeType.FINE)
+        self.assertIn(
+            reverse("payments:payment_session", args=[fine.id]), res.data["link"]
+        )
+        self.assertEqual(fine.money_to_pay, Decimal("1.32"))
+
+    def test_payment_list_includes_amount(self):
+        self.pay(self.borrow(days(2)), Payment.TypeType.PAYMENT)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        # The stored amount: no query per row for the borrowing or book.
+        with self.assertNumQueries(1):
+            res = client.get(reverse("payments:payment_list"))
+
+        self.assertEqual(res.data["results"][0]["money_to_pay"], Decimal("3.96"))
@@ -0,0 +1,115 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+
+PAYMENT_URL = reverse("payments:payment_list")
+TODAY = datetime.date.today()
+
+
+def days(count):
+    return TODAY + datetime.timedelta(days=count)
+
+
+class PaymentAmountTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.book = Book.objects.create(
+            title="Sample book",
+            author="Sample author",
+            cover=Book.CoverType.HARD,
+            inventory=10,
+            daily_fee=Decimal("0.75"),
+        )
+
+    def pay(self, rental_days, status=Payment.StatusType.PENDING):
+        borrowing = Borrowing.objects.create(
+            user=self.user, book=self.book, expected_return_date=days(rental_days)
+        )
+        return Payment.objects.create(
+            borrowing=borrowing, status=status, type=Payment.TypeType.PAYMENT
+        )
+
+    def test_amount_is_stored_on_creation(self):
+        payment = self.pay(4)
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.amount, 300)
+        self.assertEqual(payment.currency, "usd")
+        with self.assertNumQueries(0):
+            self.assertEqual(payment.money_to_pay, Decimal("3.00"))
+
+    def test_list_orders_and_filters_by_amount(self):
+        small, large, medium = self.pay(1), self.pay(6), self.pay(3)
+
+        res = self.client.get(PAYMENT_URL, {"ordering": "-amount"})
+        self.assertEqual(
+            [payment["id"] for payment in res.data["results"]],
+            [large.id, medium.id, small.id],
+        )
+
+        res = self.client.get(PAYMENT_URL, {"min_amount": 100, "max_amount": 300})
+        self.assertEqual(
+            [payment["id"] for payment in res.data["results"]], [medium.id]
+        )
+
+        res = self.client.get(PAYMENT_URL, {"min_amount": "a lot"})
+        self.assertEqual(res.status_code, 400)
+
+    def test_list_totals_are_opt_in(self):
+        self.pay(1)
+        self.pay(2, status=Payment.StatusType.PAID)
+
+        res = self.client.get(PAYMENT_URL)
+        self.assertNotIn("totals", res.data)
+
+        res = self.client.get(PAYMENT_URL, {"totals": "true"})
+        self.assertEqual(
+            res.data["totals"],
+            [{"currency": "usd", "total": 225, "pending": 75, "paid": 150}],
+        )
+
+    def walk(self, url, link):
+        ids = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            ids.append([payment["id"] for payment in res.data["results"]])
+            last_url, url = url, res.data[link]
+        return ids, last_url
+
+    def test_pages_by_amount_without_offsets(self):
+        payments = [self.pay(rental_days) for rental_days in (2, 1, 2, 2, 1, 3)]
+        by_amount = sorted(payments, key=lambda payment: (payment.amount, payment.id))
+
+        for ordering, expected in (
+            ("amount", by_amount),
+            ("-amount", by_amount[::-1]),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                pages, last = self.walk(
+                    f"{PAYMENT_URL}?ordering={ordering}&page_size=2", "next"
+                )
+                back, _ = self.walk(last, "previous")
+
+            self.assertEqual(sum(pages, []), [payment.id for payment in expected])
+            self.assertEqual(back, pages[::-1])
+            self.assertFalse(
+                [query for query in queries if "OFFSET" in query["sql"].upper()]
+            )
+
+    def test_invalid_cursor(self):
+        res = self.client.get(PAYMENT_URL, {"cursor": "bm9wZQ=="})
+
+        self.assertEqual(res.status_code, 404)
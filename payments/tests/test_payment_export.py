@@ -0,0 +1,80 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+
+EXPORT_URL = reverse("payments:payment_export")
+
+
+def sample_payment(user, book, **params):
+    borrowing = Borrowing.objects.create(
+        user=user, book=book, expected_return_date="2023-04-30"
+    )
+    defaults = {
+        "borrowing": borrowing,
+        "status": Payment.StatusType.PENDING,
+        "type": Payment.TypeType.PAYMENT,
+    }
+    defaults.update(params)
+
+    return Payment.objects.create(**defaults)
+
+
+class PaymentExportTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.other = get_user_model().objects.create_user(
+            "other@test.com",
+            "testpass",
+        )
+        self.book = Book.objects.create(
+            title="Sample book",
+            author="Sample author",
+            cover=Book.CoverType.SOFT,
+            inventory=5,
+            daily_fee=1,
+        )
+        self.own = sample_payment(self.user, self.book)
+        self.foreign = sample_payment(self.other, self.book)
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        body = b"".join(res.streaming_content).decode()
+        return res, [json.loads(line) for line in body.splitlines()]
+
+    def test_auth_required(self):
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_exports_only_own_payments(self):
+        self.client.force_authenticate(self.user)
+
+        res, rows = self.export()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in rows], [self.own.id])
+        self.assertEqual(rows[0]["user_id"], self.user.id)
+
+    def test_staff_exports_all_payments(self):
+        admin = get_user_model().objects.create_superuser(
+            "admin@admin.com", "testpass"
+        )
+        self.client.force_authenticate(admin)
+
+        res, rows = self.export()
+
+        self.assertEqual(
+            [row["id"] for row in rows], [self.own.id, self.foreign.id]
+        )
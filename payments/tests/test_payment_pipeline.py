@@ -0,0 +1,114 @@
+import datetime
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+from payments.stripe_stub import fake_stripe
+from payments.tasks import create_stripe_session_for_payment
+from payments.utils import create_payment_and_stripe_session
+
+
+def session_url(payment_id):
+    return reverse("payments:payment_session", args=[payment_id])
+
+
+class DeferredPaymentPipelineTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+        )
+        self.client.force_authenticate(self.user)
+        self.book = Book.objects.create(
+            title="Sample book",
+            author="Sample author",
+            cover=Book.CoverType.HARD,
+            inventory=3,
+            daily_fee=2,
+        )
+        self.borrowing = Borrowing.objects.create(
+            user=self.user,
+            book=self.book,
+            expected_return_date=datetime.date.today() + datetime.timedelta(days=3),
+        )
+
+    @override_settings(PAYMENTS_DEFERRED_SESSIONS=True)
+    def test_payment_is_created_pending_and_session_is_queued(self):
+        with fake_stripe() as stripe, patch(
+            "payments.tasks.create_stripe_session_for_payment.delay"
+        ) as mock_task:
+            with self.captureOnCommitCallbacks(execute=True):
+                payment = create_payment_and_stripe_session(
+                    self.borrowing, payment_type="PAYMENT"
+                )
+
+        self.assertEqual(payment.status, Payment.StatusType.PENDING)
+        self.assertIsNone(payment.stripe_session_url)
+        self.assertEqual(stripe.calls, [])
+        mock_task.assert_called_once_with(payment.id)
+
+    @override_settings(PAYMENTS_DEFERRED_SESSIONS=True)
+    def test_second_payment_of_same_type_is_rejected(self):
+        create_payment_and_stripe_session(self.borrowing, payment_type="PAYMENT")
+
+        with self.assertRaises(IntegrityError):
+            create_payment_and_stripe_session(self.borrowing, payment_type="PAYMENT")
+
+    def test_task_creates_session_once(self):
+        payment = Payment.objects.create(
+            borrowing=self.borrowing,
+            status=Payment.StatusType.PENDING,
+            type=Payment.TypeType.PAYMENT,
+        )
+
+        with fake_stripe() as stripe:
+            create_stripe_session_for_payment(payment.id)
+            create_stripe_session_for_payment(payment.id)
+
+        payment.refresh_from_db()
+        self.assertEqual(len(stripe.calls), 1)
+        self.assertIn(str(payment.id), stripe.calls[0]["idempotency_key"])
+        self.assertEqual(
+            stripe.calls[0]["line_items"][0]["price_data"]["unit_amount"], 600
+        )
+        self.assertIsNotNone(payment.stripe_session_url)
+
+    def test_poll_session_until_ready(self):
+        payment = Payment.objects.create(
+            borrowing=self.borrowing,
+            status=Payment.StatusType.PENDING,
+            type=Payment.TypeType.PAYMENT,
+        )
+
+        res = self.client.get(session_url(payment.id))
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+        with fake_stripe():
+            create_stripe_session_for_payment(payment.id)
+
+        res = self.client.get(session_url(payment.id))
+        payment.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["session_url"], payment.stripe_session_url)
+
+    def test_cannot_poll_session_of_other_user(self):
+        other = get_user_model().objects.create_user("other@test.com", "testpass")
+        payment = Payment.objects.create(
+            borrowing=self.borrowing,
+            status=Payment.StatusType.PENDING,
+            type=Payment.TypeType.PAYMENT,
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(session_url(payment.id))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,118 @@
+import datetime
+from unittest.mock import patch
+
+import stripe
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.gateway import CircuitBreaker, StripeUnavailable
+from payments.models import Payment
+from payments.stripe_stub import SERVER_ERROR, TIMEOUT, fake_stripe
+from payments.utils import create_payment_and_stripe_session, create_stripe_session
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.breaker = CircuitBreaker(2, 30, clock=lambda: self.now)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.failure()
+        self.breaker.success()
+        self.breaker.failure()
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.failure()
+
+        self.assertTrue(self.breaker.is_open)
+        self.assertFalse(self.breaker.allow())
+
+    def test_lets_one_trial_through_after_the_reset_timeout(self):
+        self.breaker.failure()
+        self.breaker.failure()
+        self.now = 31
+
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.failure()
+        self.assertFalse(self.breaker.allow())
+
+        self.now = 62
+        self.assertTrue(self.breaker.allow())
+        self.breaker.success()
+        self.assertFalse(self.breaker.is_open)
+        self.assertTrue(self.breaker.allow())
+
+
+class StripeGatewayTests(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user("test@test.com", "testpass")
+        book = Book.objects.create(
+            title="Sample book",
+            author="Sample author",
+            cover=Book.CoverType.HARD,
+            inventory=3,
+            daily_fee=2,
+        )
+        self.borrowing = Borrowing.objects.create(
+            user=user,
+            book=book,
+            expected_return_date=datetime.date.today() + datetime.timedelta(days=3),
+        )
+        self.payment = Payment.objects.create(
+            borrowing=self.borrowing,
+            status=Payment.StatusType.PENDING,
+            type=Payment.TypeType.PAYMENT,
+        )
+
+    def test_lost_answer_is_retried_with_the_same_idempotency_key(self):
+        with fake_stripe() as stripe_fake:
+            stripe_fake.client.inject(TIMEOUT, SERVER_ERROR)
+            session = create_stripe_session(self.payment)
+
+        self.assertEqual(stripe_fake.client.requests, 3)
+        keys = {call["idempotency_key"] for call in stripe_fake.calls}
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(list(stripe_fake.sessions), [session["id"]])
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.stripe_session_id, session["id"])
+
+    @override_settings(STRIPE_MAX_RETRIES=1, STRIPE_BREAKER_THRESHOLD=2)
+    def test_open_circuit_fails_fast(self):
+        with fake_stripe() as stripe_fake:
+            stripe_fake.client.down = True
+            with self.assertRaises(stripe.error.APIConnectionError):
+                create_stripe_session(self.payment)
+            requests = stripe_fake.client.requests
+
+            with self.assertRaises(StripeUnavailable):
+                create_stripe_session(self.payment)
+
+        self.assertEqual(requests, 2)
+        self.assertEqual(stripe_fake.client.requests, requests)
+
+    def test_client_errors_do_not_trip_the_circuit(self):
+        with fake_stripe() as stripe_fake:
+            for _ in range(10):
+                with self.assertRaises(stripe.error.InvalidRequestError):
+                    stripe_fake.gateway.retrieve_checkout_session("cs_test_unknown")
+
+        self.assertEqual(stripe_fake.client.requests, 10)
+        self.assertFalse(stripe_fake.gateway.breaker.is_open)
+
+    @override_settings(PAYMENTS_DEFERRED_SESSIONS=False)
+    def test_session_is_deferred_while_stripe_is_down(self):
+        self.payment.delete()
+
+        with fake_stripe() as stripe_fake, patch(
+            "payments.tasks.create_stripe_session_for_payment.delay"
+        ) as mock_task, self.captureOnCommitCallbacks(execute=True):
+            stripe_fake.client.down = True
+            payment = create_payment_and_stripe_session(
+                self.borrowing, payment_type="PAYMENT"
+            )
+
+        self.assertIsNone(payment.stripe_session_url)
+        mock_task.assert_called_once_with(payment.id)
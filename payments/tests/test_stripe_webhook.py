@@ -0,0 +1,156 @@
+import copy
+import datetime
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment, StripeEvent
+from payments.stripe_stub import fake_stripe, load_recorded_events, sign_payload
+from payments.webhooks import apply_events
+
+WEBHOOK_URL = reverse("payments:stripe_webhook")
+SECRET = "whsec_test"
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=SECRET)
+class StripeWebhookTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.events = {event["id"]: event for event in load_recorded_events()}
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.book = Book.objects.create(
+            title="Sample book",
+            author="Sample author",
+            cover=Book.CoverType.HARD,
+            inventory=3,
+            daily_fee=1,
+        )
+
+    def payment(self, session_id):
+        borrowing = Borrowing.objects.create(
+            user=self.user, book=self.book, expected_return_date="2100-01-01"
+        )
+        return Payment.objects.create(
+            borrowing=borrowing,
+            status=Payment.StatusType.PENDING,
+            type=Payment.TypeType.PAYMENT,
+            stripe_session_id=session_id,
+        )
+
+    def deliver(self, event, secret=SECRET):
+        payload = json.dumps(event)
+        return self.client.post(
+            WEBHOOK_URL,
+            payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign_payload(payload, secret),
+        )
+
+    def test_rejects_bad_signatures(self):
+        event = next(iter(self.events.values()))
+
+        res = self.deliver(event, secret="whsec_other")
+        unsigned = self.client.post(
+            WEBHOOK_URL, json.dumps(event), content_type="application/json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(unsigned.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_duplicate_deliveries_are_stored_once(self):
+        for event in [*self.events.values(), *self.events.values()]:
+            res = self.deliver(event)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(StripeEvent.objects.count(), len(self.events))
+
+    def test_apply_marks_paid_sessions_only(self):
+        paid = self.payment("cs_test_a1completedpaid")
+        paid_later = self.payment("cs_test_b1asyncsucceeded")
+        unpaid = self.payment("cs_test_c1completedunpaid")
+        expired = self.payment("cs_test_d1expired")
+        for event in self.events.values():
+            self.deliver(event)
+
+        applied = apply_events(batch_size=2)
+
+        self.assertEqual(applied, len(self.events))
+        self.assertFalse(StripeEvent.objects.filter(processed_at__isnull=True).exists())
+        statuses = dict(Payment.objects.values_list("id", "status"))
+        self.assertEqual(statuses[paid.id], Payment.StatusType.PAID)
+        self.assertEqual(
+            Payment.objects.filter(paid_at__isnull=False).count(), 2
+        )
+        self.assertEqual(statuses[paid_later.id], Payment.StatusType.PAID)
+        self.assertEqual(statuses[unpaid.id], Payment.StatusType.PENDING)
+        self.assertEqual(statuses[expired.id], Payment.StatusType.PENDING)
+
+    def test_replaying_an_event_changes_nothing(self):
+        self.payment("cs_test_a1completedpaid")
+        event = self.events["evt_1OqGa2LkdIwHu7ix0sPaid001"]
+        self.deliver(event)
+        apply_events()
+
+        self.deliver(event)
+        retry = copy.deepcopy(event)
+        retry["id"] = "evt_retry"
+        self.deliver(retry)
+
+        self.assertEqual(apply_events(), 1)
+        self.assertEqual(
+            Payment.objects.filter(status=Payment.StatusType.PAID).count(), 1
+        )
+
+    def test_paid_event_waits_for_its_payment(self):
+        event = self.events["evt_1OqGa2LkdIwHu7ix0sPaid001"]
+        self.deliver(event)
+        payment = self.payment(None)
+
+        self.assertEqual(apply_events(), 1)
+        self.assertEqual(apply_events(), 1)
+        Payment.objects.filter(pk=payment.pk).update(
+            stripe_session_id="cs_test_a1completedpaid"
+        )
+        apply_events()
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.StatusType.PAID)
+        self.assertEqual(apply_events(), 0)
+
+    @override_settings(STRIPE_EVENT_MAX_AGE=60)
+    def test_unmatched_paid_event_expires(self):
+        self.deliver(self.events["evt_1OqGa2LkdIwHu7ix0sPaid001"])
+        apply_events()
+        StripeEvent.objects.update(
+            received_at=timezone.now() - datetime.timedelta(minutes=2)
+        )
+
+        self.assertEqual(apply_events(), 1)
+        self.assertEqual(apply_events(), 0)
+        self.assertFalse(StripeEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_success_redirect_requires_a_paid_session(self):
+        with fake_stripe() as stripe:
+            session = stripe.create(line_items=[])
+            payment = self.payment(session["id"])
+            url = reverse("payments:payment_success")
+
+            unpaid = self.client.get(url, {"session_id": session["id"]})
+            unknown = self.client.get(url, {"session_id": "cs_test_unknown"})
+            stripe.pay(session["id"])
+            paid = self.client.get(url, {"session_id": session["id"]})
+
+        self.assertEqual(unpaid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(unknown.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(paid.status_code, status.HTTP_200_OK)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.StatusType.PAID)
+        self.assertIsNotNone(payment.paid_at)
@@ -2,14 +2,23 @@ from django.urls import path
 from .views import (
     PaymentList,
     PaymentDetail,
+    PaymentExport,
+    PaymentSession,
     create_stripe_session,
     payment_success,
     payment_cancel,
+    stripe_webhook,
 )
 
 urlpatterns = [
     path("payments/", PaymentList.as_view(), name="payment_list"),
+    path("payments/export/", PaymentExport.as_view(), name="payment_export"),
     path("payments/<int:pk>/", PaymentDetail.as_view(), name="payment_detail"),
+    path(
+        "payments/<int:pk>/session/",
+        PaymentSession.as_view(),
+        name="payment_session",
+    ),
     path(
         "payments/<int:pk>/create-stripe-session/",
         create_stripe_session,
@@ -17,6 +26,7 @@ urlpatterns = [
     ),
     path("payments/success/", payment_success, name="payment_success"),
     path("payments/cancel/", payment_cancel, name="payment_cancel"),
+    path("payments/webhook/", stripe_webhook, name="stripe_webhook"),
 ]
 
 app_name = "payments"
@@ -1,63 +1,132 @@
-import stripe
-from _decimal import Decimal
 from django.conf import settings
-from rest_framework import status
-from rest_framework.response import Response
+from django.db import transaction
 
+from .fees import price, to_cents
+from .gateway import TRANSIENT_ERRORS, get_gateway
 from .models import Payment
 
-stripe.api_key = settings.STRIPE_API_KEY
+SUCCESS_URL = (
+    f"{settings.DOMAIN_URL}/payments/success?session_id={{CHECKOUT_SESSION_ID}}"
+)
+CANCEL_URL = f"{settings.DOMAIN_URL}/payments/cancel?session_id={{CHECKOUT_SESSION_ID}}"
 
-FINE_MULTIPLIER = 2
 
+def create_stripe_session(payment, success_url=SUCCESS_URL, cancel_url=CANCEL_URL):
+    """Open a Stripe checkout session for the payment and store it."""
+    return create_checkout_session([payment], success_url, cancel_url)
 
-def create_payment_and_stripe_session(borrowing, success_url, cancel_url, payment_type):
-    if payment_type == "PAYMENT":
-        days_borrowed = borrowing.expected_return_date - borrowing.borrow_date
-        money_to_pay = Decimal(days_borrowed.days) * borrowing.book.daily_fee
-        payment_type = Payment.TypeType.PAYMENT
 
-    elif payment_type == "FINE":
-        days_overdue = (
-            borrowing.actual_return_date - borrowing.expected_return_date
-        ).days
-        money_to_pay = (
-            Decimal(days_overdue) * borrowing.book.daily_fee * FINE_MULTIPLIER
-        )
-        payment_type = Payment.TypeType.FINE
-    else:
-        return Response(
-            {"error": "Payment type has to be either PAYMENT or FINE"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
+def create_checkout_session(payments, success_url=SUCCESS_URL, cancel_url=CANCEL_URL):
+    """Open one Stripe checkout session with a line item per payment and
+    store it on all of them.
 
+    The idempotency key is derived from the payments and the session they
+    replace, so retrying after a timeout returns the session Stripe
+    already created instead of opening a second one.
+    """
     line_items = [
         {
             "price_data": {
-                "currency": "usd",
+                "currency": payment.currency,
                 "product_data": {
-                    "name": f"{payment_type} for {borrowing.book.title}",
+                    "name": f"{payment.type} for {payment.borrowing.book.title}",
                 },
-                "unit_amount": int(money_to_pay * 100),
+                "unit_amount": to_cents(payment.money_to_pay),
             },
             "quantity": 1,
         }
+        for payment in payments
     ]
+    payment_ids = "-".join(str(payment.id) for payment in payments)
 
-    session = stripe.checkout.Session.create(
+    session = get_gateway().create_checkout_session(
         payment_method_types=["card"],
         line_items=line_items,
         mode="payment",
         success_url=success_url,
         cancel_url=cancel_url,
+        idempotency_key=(
+            f"payment-{payment_ids}-session-after-{payments[0].stripe_session_id}"
+        ),
     )
 
-    payment = Payment.objects.create(
-        borrowing=borrowing,
-        stripe_session_url=session["url"],
+    for payment in payments:
+        payment.stripe_session_id = session["id"]
+        payment.stripe_session_url = session["url"]
+    Payment.objects.filter(pk__in=[payment.pk for payment in payments]).update(
         stripe_session_id=session["id"],
-        status=Payment.StatusType.PENDING,
-        type=payment_type,
+        stripe_session_url=session["url"],
     )
 
+    return session
+
+
+def create_payment_and_stripe_session(borrowing, payment_type):
+    """Create a PENDING payment and get it a Stripe checkout session.
+
+    With ``PAYMENTS_DEFERRED_SESSIONS`` the session is created by a Celery
+    task once the surrounding transaction commits; clients poll
+    ``payments:payment_session`` for the URL.
+    """
+    payment = price(
+        Payment(
+            borrowing=borrowing,
+            status=Payment.StatusType.PENDING,
+            type=Payment.TypeType(payment_type),
+        )
+    )
+    payment.save(force_insert=True)
+    request_stripe_session(payment)
+
     return payment
+
+
+def request_stripe_session(payment):
+    """Get an existing payment a Stripe checkout session, in the
+    background when ``PAYMENTS_DEFERRED_SESSIONS`` is set or when Stripe
+    is degraded."""
+    from .tasks import create_stripe_session_for_payment
+
+    if not settings.PAYMENTS_DEFERRED_SESSIONS:
+        try:
+            create_stripe_session(payment)
+            return
+        except TRANSIENT_ERRORS:
+            pass
+    transaction.on_commit(lambda: create_stripe_session_for_payment.delay(payment.id))
+
+
+def request_checkout_session(payments):
+    """``request_stripe_session`` for several payments sharing one
+    checkout session, opened once the surrounding transaction commits so
+    that Stripe is not waited on while their books are locked."""
+    from .tasks import create_stripe_session_for_payments
+
+    deferred = settings.PAYMENTS_DEFERRED_SESSIONS
+    payment_ids = [payment.id for payment in payments]
+
+    def open_session():
+        if not deferred:
+            try:
+                create_checkout_session(payments)
+                return
+            except TRANSIENT_ERRORS:
+                pass
+        create_stripe_session_for_payments.delay(payment_ids)
+
+    transaction.on_commit(open_session)
+
+
+def request_stripe_sessions(payment_ids):
+    """Get many payments each its own checkout session from a single task
+    once the surrounding transaction commits, whatever
+    ``PAYMENTS_DEFERRED_SESSIONS`` says: that many Stripe calls must not
+    run while the caller holds its row locks."""
+    from .tasks import create_stripe_session_for_each_payment
+
+    if not payment_ids:
+        return
+    payment_ids = list(payment_ids)
+    transaction.on_commit(
+        lambda: create_stripe_session_for_each_payment.delay(payment_ids)
+    )
@@ -1,24 +1,133 @@
+from decimal import Decimal
+
+import stripe
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, Value
+from django.db.models.functions import Coalesce, Now, Round
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import generics, permissions, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+    throttle_classes,
+)
+from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 
-
+from config.exports import EXPORT_FORMATS, export_response
+from config.pagination import KeysetCursorPagination
+from config.replicas import ReplicaReadMixin
+from users.summary import SummaryChanges
+from .fees import AMOUNT_FIELD, totals
+from .gateway import TRANSIENT_ERRORS, get_gateway
 from .models import Payment
 from .permissions import IsAdminOrSelf
-from .serializers import PaymentSerializer
+from .serializers import PaymentFilterSerializer, PaymentSerializer
+from .utils import create_stripe_session as create_payment_stripe_session
+from .webhooks import InvalidEvent, receive
 
 
-class PaymentList(generics.ListCreateAPIView):
-    serializer_class = PaymentSerializer
-    permission_classes = [permissions.IsAuthenticated]
+EXPORT_FIELDS = {
+    "id": "id",
+    "borrowing_id": "borrowing_id",
+    "user_id": "borrowing__user_id",
+    "book_title": "borrowing__book__title",
+    "type": "type",
+    "status": "status",
+    "stripe_session_id": "stripe_session_id",
+    "money_to_pay": "amount_due",
+}
+
+
+def stripe_unavailable():
+    return Response(
+        {"error": "The payment provider is unavailable, try again later."},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(int(settings.STRIPE_BREAKER_RESET))},
+    )
+
+
+class PaymentQuerysetMixin:
+    def get_filters(self):
+        serializer = PaymentFilterSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_staff:
-            return Payment.objects.all()
-        return Payment.objects.filter(borrowing__user=user)
+        queryset = Payment.objects.all()
+        if not user.is_staff:
+            queryset = queryset.filter(borrowing__user=user)
+
+        filters = self.get_filters()
+        if filters.get("min_amount") is not None:
+            queryset = queryset.filter(amount__gte=filters["min_amount"])
+        if filters.get("max_amount") is not None:
+            queryset = queryset.filter(amount__lte=filters["max_amount"])
+        return queryset
+
+
+class PaymentList(ReplicaReadMixin, PaymentQuerysetMixin, generics.ListCreateAPIView):
+    serializer_class = PaymentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["id", "amount"]
+    ordering = "id"
+    # ?ordering=amount pages over (amount, id), payment_amount_idx
+    pagination_class = KeysetCursorPagination
+
+    @extend_schema(parameters=[PaymentFilterSerializer])
+    def list(self, request, *args, **kwargs):
+        """Payments page by page; with ?totals=true, also the totals of
+        every matching payment per currency, in cents"""
+        response = super().list(request, *args, **kwargs)
+        if self.get_filters()["totals"]:
+            response.data["totals"] = totals(self.get_queryset())
+        return response
+
+
+class PaymentExport(PaymentQuerysetMixin, generics.GenericAPIView):
+    """Stream every payment visible to the user as NDJSON or CSV"""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "output",
+                enum=list(EXPORT_FORMATS),
+                description="Export format, ndjson by default (ex. ?output=csv)",
+            ),
+        ],
+        responses={(200, "application/x-ndjson"): OpenApiTypes.STR},
+    )
+    def get(self, request):
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Output has to be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        payments = self.get_queryset().annotate(
+            amount_due=Round(
+                ExpressionWrapper(
+                    F("amount") / Value(Decimal(100)), output_field=AMOUNT_FIELD
+                ),
+                2,
+            )
+        )
+        return export_response(
+            payments.order_by("id"),
+            EXPORT_FIELDS,
+            output=output,
+            filename="payments",
+        )
 
 
 class PaymentDetail(generics.RetrieveAPIView):
@@ -26,15 +135,38 @@ class PaymentDetail(generics.RetrieveAPIView):
     permission_classes = (permissions.IsAuthenticated, IsAdminOrSelf)
 
     def get_object(self):
-        obj = get_object_or_404(Payment, pk=self.kwargs["pk"])
+        obj = get_object_or_404(
+            Payment.objects.select_related("borrowing"),
+            pk=self.kwargs["pk"],
+        )
         self.check_object_permissions(self.request, obj)
         return obj
 
 
+class PaymentSession(PaymentDetail):
+    """Poll for the Stripe checkout session of a payment, which is
+    created in the background after the payment itself"""
+
+    def retrieve(self, request, *args, **kwargs):
+        payment = self.get_object()
+        if not payment.stripe_session_url:
+            return Response(
+                {"message": "The checkout session is being created."},
+                status=status.HTTP_202_ACCEPTED,
+                headers={"Retry-After": "1"},
+            )
+        return Response(
+            {
+                "session_id": payment.stripe_session_id,
+                "session_url": payment.stripe_session_url,
+            }
+        )
+
+
 @api_view(["POST"])
 def create_stripe_session(request, pk):
     try:
-        payment = Payment.objects.get(pk=pk)
+        payment = Payment.objects.select_related("borrowing__book").get(pk=pk)
     except Payment.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
@@ -50,7 +182,10 @@ def create_stripe_session(request, pk):
     if not success_url or not cancel_url:
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
-    session = payment.create_stripe_session(success_url, cancel_url)
+    try:
+        session = create_payment_stripe_session(payment, success_url, cancel_url)
+    except TRANSIENT_ERRORS:
+        return stripe_unavailable()
 
     return Response(
         {
@@ -63,16 +198,63 @@ def create_stripe_session(request, pk):
 @api_view(["GET"])
 def payment_success(request):
     session_id = request.GET.get("session_id")
-    if session_id:
-        payment = Payment.objects.get(stripe_session_id=session_id)
-        payment.status = Payment.StatusType.PAID
-        payment.save()
-        return Response({"message": "Payment was successful!"})
-    else:
+    if not session_id:
         return Response(
             {"error": "Session ID not found."}, status=status.HTTP_400_BAD_REQUEST
         )
 
+    # The redirect alone proves nothing; ask Stripe whether it was paid.
+    try:
+        session = get_gateway().retrieve_checkout_session(session_id)
+    except TRANSIENT_ERRORS:
+        return stripe_unavailable()
+    except stripe.error.InvalidRequestError:
+        return Response(
+            {"error": "Session ID not found."}, status=status.HTTP_404_NOT_FOUND
+        )
+    if session["payment_status"] != "paid":
+        return Response(
+            {"error": "The payment has not been completed yet."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # A multi-book checkout pays for several payments at once.
+    payments = Payment.objects.filter(stripe_session_id=session_id)
+    with transaction.atomic():
+        pending = list(
+            payments.select_for_update(of=("self",))
+            .filter(status=Payment.StatusType.PENDING)
+            .annotate(user_id=F("borrowing__user_id"))
+            .only("id", "type", "status", "amount")
+        )
+        paid = payments.update(
+            status=Payment.StatusType.PAID, paid_at=Coalesce("paid_at", Now())
+        )
+        changes = SummaryChanges()
+        for payment in pending:
+            changes.payment(payment.user_id, payment, sign=-1)
+            payment.status = Payment.StatusType.PAID
+            changes.payment(payment.user_id, payment)
+        changes.record()
+    if not paid:
+        return Response(
+            {"error": "Session ID not found."}, status=status.HTTP_404_NOT_FOUND
+        )
+    return Response({"message": "Payment was successful!"})
+
+
+@extend_schema(request=OpenApiTypes.OBJECT, responses={200: None})
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+@throttle_classes([])
+def stripe_webhook(request):
+    """Receive Stripe events; payments are updated from them shortly after"""
+    try:
+        receive(request.body, request.META.get("HTTP_STRIPE_SIGNATURE"))
+    except InvalidEvent as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(status=status.HTTP_200_OK)
 
 
 @api_view(["GET", "POST"])
@@ -0,0 +1,130 @@
+"""Stripe webhook inbox.
+
+``receive`` verifies the signature of a delivery and stores the event;
+event ids are unique, so Stripe's retries and duplicate deliveries are
+stored once.  ``apply_events`` later applies stored events to payments
+in batches, which keeps the webhook itself down to one insert.  Paid
+events are kept until their checkout session has a payment.
+"""
+import json
+from datetime import timedelta
+
+import stripe
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from users.summary import SummaryChanges
+from .models import Payment, StripeEvent
+
+# Checkout session events that can mean the session has been paid for.
+PAID_EVENTS = {
+    "checkout.session.completed",
+    "checkout.session.async_payment_succeeded",
+}
+
+
+class InvalidEvent(Exception):
+    """Raised for deliveries that are not signed, well-formed events."""
+
+
+def receive(payload: bytes, signature: str) -> None:
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise ImproperlyConfigured("STRIPE_WEBHOOK_SECRET is not set.")
+
+    try:
+        payload = payload.decode("utf-8")
+        stripe.WebhookSignature.verify_header(
+            payload,
+            signature or "",
+            settings.STRIPE_WEBHOOK_SECRET,
+            settings.STRIPE_WEBHOOK_TOLERANCE,
+        )
+        event = json.loads(payload)
+        event_id, event_type = event["id"], event["type"]
+    except (stripe.error.SignatureVerificationError, ValueError, KeyError) as error:
+        raise InvalidEvent(str(error))
+
+    StripeEvent.objects.bulk_create(
+        [StripeEvent(event_id=event_id, type=event_type, payload=event)],
+        ignore_conflicts=True,
+    )
+
+
+def paid_session_id(event: StripeEvent):
+    """The checkout session the event reports as paid, if any."""
+    if event.type not in PAID_EVENTS:
+        return None
+    session = event.payload["data"]["object"]
+    if session.get("payment_status") != "paid":
+        return None
+    return session["id"]
+
+
+def apply_batch(batch_size: int, after: int = 0) -> tuple:
+    """Apply up to ``batch_size`` pending events with an id above
+    ``after``; returns how many were looked at and the last id.
+
+    Events locked by a concurrent worker are skipped.  A paid event whose
+    session matches no payment yet stays pending: the session id is saved
+    after the payment's transaction commits, so Stripe can report the
+    payment first.  Such an event is dropped once it is older than
+    ``STRIPE_EVENT_MAX_AGE`` seconds.
+    """
+    with transaction.atomic():
+        events = list(
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, id__gt=after)
+            .order_by("id")
+            .only("id", "type", "payload", "received_at")[:batch_size]
+        )
+        if not events:
+            return 0, after
+
+        session_ids = {paid_session_id(event) for event in events} - {None}
+        payments = list(
+            Payment.objects.select_for_update(of=("self",))
+            .filter(stripe_session_id__in=session_ids)
+            .annotate(user_id=F("borrowing__user_id"))
+            .only("id", "type", "status", "amount", "paid_at", "stripe_session_id")
+        )
+        matched = {payment.stripe_session_id for payment in payments}
+        payments = [
+            payment
+            for payment in payments
+            if payment.status != Payment.StatusType.PAID
+        ]
+        now = timezone.now()
+        changes = SummaryChanges()
+        for payment in payments:
+            changes.payment(payment.user_id, payment, sign=-1)
+            payment.status = Payment.StatusType.PAID
+            payment.paid_at = now
+            changes.payment(payment.user_id, payment)
+        Payment.objects.bulk_update(payments, ["status", "paid_at"])
+        changes.record()
+
+        expired = now - timedelta(seconds=settings.STRIPE_EVENT_MAX_AGE)
+        StripeEvent.objects.filter(
+            id__in=[
+                event.id
+                for event in events
+                if paid_session_id(event) in matched | {None}
+                or event.received_at < expired
+            ]
+        ).update(processed_at=now)
+    return len(events), events[-1].id
+
+
+def apply_events(batch_size=None) -> int:
+    """Apply batches until no pending event is left; returns how many
+    events were looked at."""
+    batch_size = batch_size or settings.STRIPE_EVENT_BATCH_SIZE
+    applied = after = 0
+    while True:
+        count, after = apply_batch(batch_size, after)
+        if not count:
+            return applied
+        applied += count
@@ -0,0 +1,25 @@
+"""Time-based cache of report rows.
+
+Reports read history that only grows, so rows are simply kept for
+``REPORTS_CACHE_TIMEOUT`` seconds instead of being invalidated on every
+payment and return; a dashboard is at most that far behind.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def key(report: str, params: dict) -> str:
+    values = ":".join(f"{name}={params[name]}" for name in sorted(params))
+    return f"reports:{report}:{values}"
+
+
+def get_or_set(report: str, params: dict, produce):
+    """Return the cached rows of ``report`` for ``params``, computing them
+    with ``produce(**params)`` on a miss."""
+    if not settings.REPORTS_CACHE_TIMEOUT:
+        return produce(**params)
+    return cache.get_or_set(
+        key(report, params),
+        lambda: produce(**params),
+        settings.REPORTS_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,120 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from reports import queries
+from reports.rollups import roll_up_all
+
+REPORTS = {
+    "revenue by day": ("revenue", {"period": "day"}),
+    "revenue by week": ("revenue", {"period": "week"}),
+    "revenue by month": ("revenue", {"period": "month"}),
+    "top books": ("top_books", {}),
+    "utilization": ("utilization", {}),
+    "loan length by day": ("loan_length", {"period": "day"}),
+    "loan length by week": ("loan_length", {"period": "week"}),
+    "loan length by month": ("loan_length", {"period": "month"}),
+}
+
+QUERIES = {
+    "revenue": queries.revenue,
+    "top_books": queries.top_books,
+    "utilization": queries.utilization,
+    "loan_length": queries.loan_lengths,
+}
+
+
+class Command(BaseCommand):
+    """Django command to time every staff report against a library of at
+    least ``--borrowings`` borrowings, computed by the database and served
+    from the cache, and to fail when one misses its budget"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--borrowings",
+            type=int,
+            default=5_000_000,
+            help="Borrowings the library must hold for the budget to count",
+        )
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help="Seed the missing borrowings and roll them up first",
+        )
+        parser.add_argument(
+            "--budget",
+            type=float,
+            default=200,
+            help="Milliseconds each report may take uncached at the median",
+        )
+
+    def handle(self, *args, **options) -> None:
+        borrowings = Borrowing.objects.count()
+        missing = options["borrowings"] - borrowings
+        if missing > 0 and options["seed"]:
+            call_command(
+                "seed_library",
+                books=0 if Book.objects.exists() else 10_000,
+                users=0 if get_user_model().objects.exists() else 1_000,
+                borrowings=missing,
+                stdout=self.stdout,
+            )
+            # Reports read the rollups up to yesterday, as in production.
+            roll_up_all()
+            borrowings = Borrowing.objects.count()
+        elif missing > 0:
+            raise CommandError(
+                f"{borrowings} borrowings found, the budget holds for "
+                f"{options['borrowings']}; run with --seed or seed_library "
+                f"--borrowings {missing} first."
+            )
+        admin = get_user_model().objects.filter(is_staff=True).first()
+        if admin is None:
+            raise CommandError("No staff user found, run createsuperuser first.")
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(admin)
+
+        self.stdout.write(f"{borrowings} borrowings")
+        self.stdout.write(
+            f"{'report':<22}{'rows':>6}{'median ms':>12}{'max ms':>10}"
+            f"{'cached ms':>12}"
+        )
+        over_budget = []
+        for label, (name, params) in REPORTS.items():
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                rows = QUERIES[name](**params)
+                timings.append((time.perf_counter() - started) * 1000)
+            median = statistics.median(timings)
+            if median > options["budget"]:
+                over_budget.append(label)
+
+            cache.clear()
+            url = reverse(f"reports:{name}")
+            client.get(url, params)
+            started = time.perf_counter()
+            client.get(url, params)
+            cached = (time.perf_counter() - started) * 1000
+
+            self.stdout.write(
+                f"{label:<22}{len(rows):>6}{median:>12.1f}{max(timings):>10.1f}"
+                f"{cached:>12.1f}"
+            )
+
+        if over_budget:
+            raise CommandError(
+                f"Over the {options['budget']:.0f} ms budget: {', '.join(over_budget)}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Every report within {options['budget']:.0f} ms")
+        )
@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from borrowings.models import Borrowing
+from reports import queries
+from reports.models import RollupWatermark
+from reports.rollups import ROLLUPS, rewind, roll_up_all, watermark
+
+REPORTS = {
+    "revenue by day": (queries.revenue, {"period": "day"}),
+    "revenue by week": (queries.revenue, {"period": "week"}),
+    "revenue by month": (queries.revenue, {"period": "month"}),
+    "top books": (queries.top_books, {}),
+    "loan length by day": (queries.loan_lengths, {"period": "day"}),
+    "loan length by week": (queries.loan_lengths, {"period": "week"}),
+    "loan length by month": (queries.loan_lengths, {"period": "month"}),
+}
+
+
+def _median_ms(report, params, repeat) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        report(**params)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    """Django command to time rebuilding the report rollups, a nightly
+    run, and every rollup backed report against the raw scan it replaces"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--chunk-days", type=int, default=31)
+        parser.add_argument(
+            "--skip-rebuild",
+            action="store_true",
+            help="Keep the rollup tables as they are instead of rebuilding them",
+        )
+
+    def handle(self, *args, **options) -> None:
+        borrowings = Borrowing.objects.count()
+        if not borrowings:
+            raise CommandError("No borrowings found, run seed_library first.")
+        self.stdout.write(f"{borrowings} borrowings")
+
+        if not options["skip_rebuild"]:
+            # Without watermarks every rollup starts over from its first day.
+            RollupWatermark.objects.all().delete()
+        started = time.perf_counter()
+        rolled = roll_up_all(chunk_days=options["chunk_days"])
+        self.stdout.write(
+            f"rebuild: {sum(rolled.values())} rollup days in "
+            f"{time.perf_counter() - started:.1f} s"
+        )
+
+        through = min(watermark(name) for name in ROLLUPS)
+        rewind(through)
+        started = time.perf_counter()
+        roll_up_all()
+        self.stdout.write(
+            f"nightly run of one day: {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+        self.stdout.write(
+            f"{'report':<22}{'rollup ms':>12}{'raw ms':>10}{'speedup':>10}"
+        )
+        for label, (report, params) in REPORTS.items():
+            rollup = _median_ms(report, params, options["repeat"])
+            with override_settings(REPORTS_USE_ROLLUPS=False):
+                raw = _median_ms(report, params, options["repeat"])
+            self.stdout.write(
+                f"{label:<22}{rollup:>12.1f}{raw:>10.1f}{raw / rollup:>9.1f}x"
+            )
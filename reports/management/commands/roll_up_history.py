@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from reports.rollups import rewind, roll_up_all
+
+
+class Command(BaseCommand):
+    """Django command to bring the report rollup tables up to yesterday,
+    optionally rolling already rolled days again"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=datetime.date.fromisoformat,
+            help="Roll every day from this date on again (ex. 2024-01-31)",
+        )
+        parser.add_argument("--chunk-days", type=int, default=31)
+
+    def handle(self, *args, **options) -> None:
+        if options["since"]:
+            rewind(options["since"])
+        for name, days in roll_up_all(chunk_days=options["chunk_days"]).items():
+            self.stdout.write(f"{name}: {days} days rolled up")
+        self.stdout.write(self.style.SUCCESS("Report rollups are up to date"))
@@ -0,0 +1,104 @@
+# Generated by Django 4.2 on 2026-10-18 04:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("books", "0002_book_search_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyBookBorrowings",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("loans", models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyReturns",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(unique=True)),
+                ("loans", models.PositiveIntegerField()),
+                ("loan_days", models.BigIntegerField()),
+                ("longest_loan", models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyRevenue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "type",
+                    models.CharField(
+                        choices=[("PAYMENT", "Payment"), ("FINE", "Fine")], max_length=7
+                    ),
+                ),
+                ("amount", models.BigIntegerField()),
+                ("paid_count", models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("rolled_through", models.DateField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="dailyrevenue",
+            constraint=models.UniqueConstraint(
+                fields=("day", "type"), name="unique_daily_revenue"
+            ),
+        ),
+        migrations.AddField(
+            model_name="dailybookborrowings",
+            name="book",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="books.book",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailybookborrowings",
+            constraint=models.UniqueConstraint(
+                fields=("day", "book"), name="unique_daily_book_borrowings"
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import models
+
+from books.models import Book
+from payments.models import Payment
+
+
+class DailyRevenue(models.Model):
+    """Paid amounts of one day and payment type, in cents."""
+
+    day = models.DateField()
+    type = models.CharField(max_length=7, choices=Payment.TypeType.choices)
+    amount = models.BigIntegerField()
+    paid_count = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "type"], name="unique_daily_revenue"
+            ),
+        ]
+
+
+class DailyBookBorrowings(models.Model):
+    """Borrowings of one book that started on one day."""
+
+    day = models.DateField()
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="+")
+    loans = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "book"], name="unique_daily_book_borrowings"
+            ),
+        ]
+
+
+class DailyReturns(models.Model):
+    """Loans that ended on one day, with their total and longest length
+    in days."""
+
+    day = models.DateField(unique=True)
+    loans = models.PositiveIntegerField()
+    loan_days = models.BigIntegerField()
+    longest_loan = models.PositiveIntegerField()
+
+
+class RollupWatermark(models.Model):
+    """The last day a rollup table holds in full."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    rolled_through = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} through {self.rolled_through}"
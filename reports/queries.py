@@ -0,0 +1,245 @@
+"""Staff reports over the daily rollup tables.
+
+Every report takes an inclusive ``start``/``end`` date range and returns
+plain rows ready for serialization; amounts are in cents.  The days up
+to a rollup's watermark are summed from its small table and only the
+days after it, usually just today, from raw rows; both parts are grouped
+by the database and merged here, where running totals and averages are
+worked out over the few merged rows.  Ranks come from window functions.
+"""
+import datetime
+from itertools import accumulate
+
+from django.db import connection
+from django.db.models import Count, DateField, DecimalField, F, Max, Q, Sum, Window
+from django.db.models.functions import Cast, Rank, Round, Trunc
+from django.utils import timezone
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.fees import DaysBetween
+from payments.models import Payment
+from .models import DailyBookBorrowings, DailyReturns, DailyRevenue
+from .rollups import ONE_DAY, day_bounds, watermark
+
+PERIODS = ("day", "week", "month")
+
+# How far back a report reaches when no start date is given.
+DEFAULT_SPANS = {
+    "day": datetime.timedelta(days=30),
+    "week": datetime.timedelta(weeks=12),
+    "month": datetime.timedelta(days=365),
+}
+
+
+def date_range(period="day", start=None, end=None):
+    """``start`` and ``end`` with the defaults of ``period`` filled in."""
+    end = end or timezone.localdate()
+    return start or end - DEFAULT_SPANS[period], end
+
+
+def _split(rollup, start, end):
+    """The parts of ``start``..``end`` read from ``rollup`` and from raw
+    rows, each a date range or ``None``."""
+    through = watermark(rollup)
+    if through is None or through < start:
+        return None, (start, end)
+    if through >= end:
+        return (start, end), None
+    return (start, through), (through + ONE_DAY, end)
+
+
+def _truncate(field, period):
+    if period == "day":
+        # Already a date; truncating it would cost a call per row.
+        return F(field)
+    return Trunc(field, period, output_field=DateField())
+
+
+def _merge(parts, key, sums=(), maxima=()) -> list:
+    """Rows of ``parts`` with equal ``key`` combined, ordered by it."""
+    merged = {}
+    for row in (row for part in parts for row in part):
+        into = merged.setdefault(row[key], row)
+        if into is not row:
+            for name in sums:
+                into[name] += row[name]
+            for name in maxima:
+                into[name] = max(into[name], row[name])
+    return [merged[value] for value in sorted(merged)]
+
+
+def revenue(period="day", start=None, end=None) -> list:
+    """Paid amounts per period, split into rentals and fines, with the
+    running total since ``start``."""
+    start, end = date_range(period, start, end)
+    rolled, raw = _split("revenue", start, end)
+    parts = []
+    if rolled:
+        parts.append(
+            DailyRevenue.objects.filter(day__range=rolled)
+            .annotate(period=_truncate("day", period))
+            .values("period")
+            .annotate(
+                payments=Sum(
+                    "amount", filter=Q(type=Payment.TypeType.PAYMENT), default=0
+                ),
+                fines=Sum("amount", filter=Q(type=Payment.TypeType.FINE), default=0),
+                total=Sum("amount", default=0),
+                paid=Sum("paid_count", default=0),
+            )
+        )
+    if raw:
+        since, until = day_bounds(*raw)
+        parts.append(
+            Payment.objects.filter(
+                status=Payment.StatusType.PAID, paid_at__gte=since, paid_at__lt=until
+            )
+            .annotate(period=Trunc("paid_at", period, output_field=DateField()))
+            .values("period")
+            .annotate(
+                payments=Sum(
+                    "amount", filter=Q(type=Payment.TypeType.PAYMENT), default=0
+                ),
+                fines=Sum("amount", filter=Q(type=Payment.TypeType.FINE), default=0),
+                total=Sum("amount", default=0),
+                paid=Count("*"),
+            )
+        )
+
+    rows = _merge(parts, "period", sums=("payments", "fines", "total", "paid"))
+    for row, cumulative in zip(rows, accumulate(row["total"] for row in rows)):
+        row["cumulative"] = cumulative
+    return rows
+
+
+TOP_BOOKS_SQL = """
+SELECT
+    book_id,
+    SUM(borrowings)::bigint AS borrowings,
+    RANK() OVER (ORDER BY SUM(borrowings) DESC) AS rank,
+    (SUM(SUM(borrowings)) OVER ())::bigint AS total
+FROM ({parts}) AS parts
+GROUP BY book_id
+ORDER BY rank, book_id
+LIMIT %s
+"""
+
+
+def top_books(start=None, end=None, limit=10) -> list:
+    """The ``limit`` most borrowed books between ``start`` and ``end``,
+    ranked, with their share of all borrowings in the range."""
+    start, end = date_range("day", start, end)
+    rolled, raw = _split("borrowings", start, end)
+    parts = []
+    if rolled:
+        parts.append(
+            DailyBookBorrowings.objects.filter(day__range=rolled)
+            .values("book_id")
+            .annotate(borrowings=Sum("loans"))
+        )
+    if raw:
+        parts.append(
+            Borrowing.objects.filter(borrow_date__range=raw)
+            .values("book_id")
+            .annotate(borrowings=Count("*"))
+        )
+    rows = _ranked(parts, limit)
+    books = Book.objects.only("title", "author").in_bulk(
+        [row["book_id"] for row in rows]
+    )
+    for row in rows:
+        book = books[row["book_id"]]
+        row["title"] = book.title
+        row["author"] = book.author
+        row["share"] = round(row["borrowings"] / row.pop("total"), 4)
+    return rows
+
+
+def _ranked(parts, limit) -> list:
+    """The ``limit`` books with the most borrowings across ``parts``,
+    ranked by the database with the total of every book alongside.
+
+    The ORM cannot put a window over a ``UNION``, so the parts are
+    compiled and wrapped the way ``rollups._insert_from`` does.
+    """
+    if not parts:
+        return []
+    compiled = [part.order_by().query.sql_with_params() for part in parts]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            TOP_BOOKS_SQL.format(
+                parts=" UNION ALL ".join(f"({sql})" for sql, _ in compiled)
+            ),
+            [param for _, params in compiled for param in params] + [limit],
+        )
+        columns = [column.name for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def utilization(limit=50) -> list:
+    """The ``limit`` titles with the largest share of their copies out on
+    loan right now, ranked.
+
+    Only titles with a copy out can rank, so the active loans are grouped
+    by book rather than every book in the catalog counting its loans.
+    """
+    return list(
+        Borrowing.objects.filter(actual_return_date__isnull=True)
+        .values("book_id", "book__title", "book__author", "book__inventory")
+        .annotate(on_loan=Count("*"))
+        .annotate(copies=F("on_loan") + F("book__inventory"))
+        .annotate(
+            utilization=Round(
+                Cast("on_loan", DecimalField(max_digits=12, decimal_places=4))
+                / F("copies"),
+                4,
+            )
+        )
+        .annotate(rank=Window(Rank(), order_by=F("utilization").desc()))
+        .order_by("rank", "book_id")
+        .values(
+            "book_id",
+            "copies",
+            "on_loan",
+            "utilization",
+            "rank",
+            title=F("book__title"),
+            author=F("book__author"),
+        )[:limit]
+    )
+
+
+def loan_lengths(period="day", start=None, end=None) -> list:
+    """Average and longest loan in days per period, by return date."""
+    start, end = date_range(period, start, end)
+    rolled, raw = _split("returns", start, end)
+    parts = []
+    if rolled:
+        parts.append(
+            DailyReturns.objects.filter(day__range=rolled)
+            .annotate(period=_truncate("day", period))
+            .values("period")
+            .annotate(
+                returned=Sum("loans"),
+                total_days=Sum("loan_days"),
+                longest_days=Max("longest_loan"),
+            )
+        )
+    if raw:
+        days = DaysBetween(F("actual_return_date"), F("borrow_date"))
+        parts.append(
+            Borrowing.objects.filter(actual_return_date__range=raw)
+            .annotate(period=_truncate("actual_return_date", period))
+            .values("period")
+            .annotate(
+                returned=Count("*"), total_days=Sum(days), longest_days=Max(days)
+            )
+        )
+
+    rows = _merge(
+        parts, "period", sums=("returned", "total_days"), maxima=("longest_days",)
+    )
+    for row in rows:
+        row["average_days"] = round(row.pop("total_days") / row["returned"], 2)
+    return rows
@@ -0,0 +1,188 @@
+"""Daily rollup tables behind the staff reports.
+
+Each rollup sums one day of raw rows into a few rows of its table and
+remembers in a ``RollupWatermark`` the last day it holds in full.  The
+nightly ``roll_up_history`` job only aggregates the days after that
+watermark, up to yesterday, a chunk of days per transaction; a chunk
+first deletes whatever rows its days already had, so a crashed or
+repeated run never counts a day twice.
+
+Reports read the rollup tables up to the watermark and aggregate only
+the raw rows after it, usually today's.  Rows that change after their
+day was rolled up, such as a backdated correction, are picked up again
+by rewinding the watermark with ``rewind``.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from borrowings.models import Borrowing
+from payments.fees import DaysBetween
+from payments.models import Payment
+from .models import DailyBookBorrowings, DailyReturns, DailyRevenue, RollupWatermark
+
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def day_bounds(start, end):
+    """The aware datetimes from the first moment of ``start`` to the first
+    moment after ``end``, so range filters stay index friendly."""
+    tz = timezone.get_current_timezone()
+    return (
+        datetime.datetime.combine(start, datetime.time.min, tzinfo=tz),
+        datetime.datetime.combine(end + ONE_DAY, datetime.time.min, tzinfo=tz),
+    )
+
+
+def revenue_by_day(start, end):
+    since, until = day_bounds(start, end)
+    return (
+        Payment.objects.filter(
+            status=Payment.StatusType.PAID, paid_at__gte=since, paid_at__lt=until
+        )
+        .annotate(day=TruncDate("paid_at"))
+        .values("day", "type")
+        .annotate(amount=Sum("amount", default=0), paid_count=Count("*"))
+        .order_by()
+    )
+
+
+def borrowings_by_day(start, end):
+    return (
+        Borrowing.objects.filter(borrow_date__range=(start, end))
+        .annotate(day=F("borrow_date"))
+        .values("day", "book_id")
+        .annotate(loans=Count("*"))
+        .order_by()
+    )
+
+
+def returns_by_day(start, end):
+    days = DaysBetween(F("actual_return_date"), F("borrow_date"))
+    return (
+        Borrowing.objects.filter(actual_return_date__range=(start, end))
+        .annotate(day=F("actual_return_date"))
+        .values("day")
+        .annotate(loans=Count("*"), loan_days=Sum(days), longest_loan=Max(days))
+        .order_by()
+    )
+
+
+def _first_revenue_day():
+    paid_at = Payment.objects.filter(status=Payment.StatusType.PAID).aggregate(
+        first=Min("paid_at")
+    )["first"]
+    return paid_at and timezone.localdate(paid_at)
+
+
+class Rollup:
+    """A rollup table, the grouped raw rows of a date range that fill it,
+    and how to find the first day of raw data."""
+
+    def __init__(self, name, model, source, first_day):
+        self.name = name
+        self.model = model
+        self.source = source
+        self.first_day = first_day
+
+
+ROLLUPS = {
+    rollup.name: rollup
+    for rollup in (
+        Rollup("revenue", DailyRevenue, revenue_by_day, _first_revenue_day),
+        Rollup(
+            "borrowings",
+            DailyBookBorrowings,
+            borrowings_by_day,
+            lambda: Borrowing.objects.aggregate(first=Min("borrow_date"))["first"],
+        ),
+        Rollup(
+            "returns",
+            DailyReturns,
+            returns_by_day,
+            lambda: Borrowing.objects.aggregate(
+                first=Min("actual_return_date")
+            )["first"],
+        ),
+    )
+}
+
+
+def watermark(name):
+    """The last day rollup ``name`` holds, or ``None`` when reports have
+    to read raw rows only."""
+    if not settings.REPORTS_USE_ROLLUPS:
+        return None
+    return (
+        RollupWatermark.objects.filter(name=name)
+        .values_list("rolled_through", flat=True)
+        .first()
+    )
+
+
+def _insert_from(model, rows) -> None:
+    """``INSERT ... SELECT`` the grouped ``rows``, whose names are the
+    columns of ``model``'s table, without loading them."""
+    names = [*rows.query.values_select, *rows.query.annotation_select]
+    columns = ", ".join(connection.ops.quote_name(name) for name in names)
+    sql, params = rows.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(model._meta.db_table)} "
+            f"({columns}) SELECT {columns} FROM ({sql}) AS rows",
+            params,
+        )
+
+
+def roll_up(rollup, through=None, chunk_days=31) -> int:
+    """Roll the days after ``rollup``'s watermark up to ``through``,
+    yesterday by default, into its table; returns how many days.
+
+    The watermark row is locked for each chunk, so concurrent runs take
+    turns instead of rolling the same days.
+    """
+    through = through or timezone.localdate() - ONE_DAY
+    rolled = 0
+    while True:
+        with transaction.atomic():
+            mark = (
+                RollupWatermark.objects.select_for_update()
+                .filter(name=rollup.name)
+                .first()
+            )
+            if mark is None:
+                first_day = rollup.first_day()
+                if first_day is None:
+                    return rolled
+                mark = RollupWatermark.objects.create(
+                    name=rollup.name, rolled_through=first_day - ONE_DAY
+                )
+
+            start = mark.rolled_through + ONE_DAY
+            if start > through:
+                return rolled
+            end = min(start + datetime.timedelta(days=chunk_days - 1), through)
+
+            rollup.model.objects.filter(day__range=(start, end)).delete()
+            _insert_from(rollup.model, rollup.source(start, end))
+            mark.rolled_through = end
+            mark.save(update_fields=["rolled_through", "updated_at"])
+        rolled += (end - start).days + 1
+
+
+def roll_up_all(through=None, chunk_days=31) -> dict:
+    """Days rolled up per rollup."""
+    return {
+        name: roll_up(rollup, through, chunk_days) for name, rollup in ROLLUPS.items()
+    }
+
+
+def rewind(since) -> int:
+    """Make the next run roll every day from ``since`` on again."""
+    return RollupWatermark.objects.filter(rolled_through__gte=since).update(
+        rolled_through=since - ONE_DAY
+    )
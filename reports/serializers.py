@@ -0,0 +1,33 @@
+from rest_framework import serializers
+
+from .queries import PERIODS
+
+
+class ReportRangeSerializer(serializers.Serializer):
+    start = serializers.DateField(
+        required=False,
+        help_text="First day included, a report dependent span back from end "
+        "by default (ex. ?start=2024-01-01)",
+    )
+    end = serializers.DateField(
+        required=False, help_text="Last day included, today by default"
+    )
+
+    def validate(self, attrs):
+        if attrs.get("start") and attrs.get("end") and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("Start has to be before end.")
+        return attrs
+
+
+class PeriodReportSerializer(ReportRangeSerializer):
+    period = serializers.ChoiceField(
+        choices=PERIODS, default="day", help_text="Row per day, week or month"
+    )
+
+
+class TopBooksReportSerializer(ReportRangeSerializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class UtilizationReportSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=50)
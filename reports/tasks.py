@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .rollups import roll_up_all
+
+
+@shared_task
+def roll_up_history() -> dict:
+    """Roll every day since the last run into the report rollup tables."""
+    return roll_up_all()
@@ -0,0 +1,228 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+from reports import queries
+
+TODAY = datetime.date(2024, 3, 20)
+
+
+def days(count):
+    return TODAY + datetime.timedelta(days=count)
+
+
+def at(day):
+    return datetime.datetime.combine(
+        day, datetime.time(12), tzinfo=timezone.get_current_timezone()
+    )
+
+
+class ReportQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        cls.popular, cls.quiet = [
+            Book.objects.create(
+                title=title,
+                author="Sample author",
+                cover=Book.CoverType.HARD,
+                inventory=inventory,
+                daily_fee=Decimal("1.00"),
+            )
+            for title, inventory in (("Popular", 1), ("Quiet", 3))
+        ]
+
+    def borrow(self, book, borrowed, returned=None):
+        borrowing = Borrowing.objects.create(
+            user=self.user, book=book, expected_return_date=days(borrowed + 5)
+        )
+        Borrowing.objects.filter(pk=borrowing.pk).update(
+            borrow_date=days(borrowed), actual_return_date=returned
+        )
+        return borrowing
+
+    def pay(self, borrowing, payment_type, amount, paid_on=None):
+        return Payment.objects.create(
+            borrowing=borrowing,
+            type=payment_type,
+            amount=amount,
+            status=Payment.StatusType.PAID if paid_on else Payment.StatusType.PENDING,
+            paid_at=paid_on and at(paid_on),
+        )
+
+    def test_revenue_splits_rentals_and_fines_with_a_running_total(self):
+        first = self.borrow(self.popular, -3, returned=days(-1))
+        second = self.borrow(self.quiet, -1)
+        self.pay(first, Payment.TypeType.PAYMENT, 500, paid_on=days(-3))
+        self.pay(first, Payment.TypeType.FINE, 200, paid_on=days(-1))
+        self.pay(second, Payment.TypeType.PAYMENT, 300, paid_on=days(-1))
+        self.pay(second, Payment.TypeType.FINE, 900)
+
+        rows = queries.revenue("day", start=days(-5), end=TODAY)
+
+        self.assertEqual(
+            rows,
+            [
+                {
+                    "period": days(-3),
+                    "payments": 500,
+                    "fines": 0,
+                    "total": 500,
+                    "paid": 1,
+                    "cumulative": 500,
+                },
+                {
+                    "period": days(-1),
+                    "payments": 300,
+                    "fines": 200,
+                    "total": 500,
+                    "paid": 2,
+                    "cumulative": 1000,
+                },
+            ],
+        )
+        self.assertEqual(
+            [row["total"] for row in queries.revenue("month", end=TODAY)], [1000]
+        )
+
+    def test_top_books_are_ranked_with_their_share(self):
+        for borrowed in (-4, -3, -2):
+            self.borrow(self.popular, borrowed, returned=days(borrowed + 1))
+        self.borrow(self.quiet, -2)
+        self.borrow(self.quiet, -40, returned=days(-39))
+
+        rows = queries.top_books(start=days(-10), end=TODAY)
+
+        self.assertEqual(
+            [(row["title"], row["borrowings"], row["rank"]) for row in rows],
+            [("Popular", 3, 1), ("Quiet", 1, 2)],
+        )
+        self.assertEqual(rows[0]["share"], 0.75)
+        self.assertEqual(len(queries.top_books(days(-10), TODAY, limit=1)), 1)
+
+    def test_tied_books_share_a_rank(self):
+        third = Book.objects.create(
+            title="Third",
+            author="Sample author",
+            cover=Book.CoverType.HARD,
+            inventory=1,
+            daily_fee=Decimal("1.00"),
+        )
+        for book in (self.popular, self.popular, self.quiet, self.quiet, third):
+            self.borrow(book, -2, returned=days(-1))
+
+        rows = queries.top_books(start=days(-10), end=TODAY, limit=2)
+
+        self.assertEqual(
+            [(row["title"], row["rank"], row["share"]) for row in rows],
+            [("Popular", 1, 0.4), ("Quiet", 1, 0.4)],
+        )
+
+    def test_utilization_ranks_titles_by_share_of_copies_out(self):
+        self.borrow(self.popular, -2)
+        self.borrow(self.quiet, -2)
+        self.borrow(self.quiet, -3, returned=days(-1))
+
+        rows = queries.utilization()
+
+        self.assertEqual(
+            [
+                (row["title"], row["on_loan"], row["copies"], row["utilization"])
+                for row in rows
+            ],
+            [("Popular", 1, 2, Decimal("0.5")), ("Quiet", 1, 4, Decimal("0.25"))],
+        )
+
+    def test_loan_lengths_per_period_of_return(self):
+        self.borrow(self.popular, -10, returned=days(-6))
+        self.borrow(self.quiet, -8, returned=days(-6))
+        self.borrow(self.quiet, -3, returned=days(-2))
+        self.borrow(self.quiet, -1)
+
+        rows = queries.loan_lengths("day", start=days(-7), end=TODAY)
+
+        self.assertEqual(
+            rows,
+            [
+                {
+                    "period": days(-6),
+                    "returned": 2,
+                    "average_days": 3.0,
+                    "longest_days": 4,
+                },
+                {
+                    "period": days(-2),
+                    "returned": 1,
+                    "average_days": 1.0,
+                    "longest_days": 1,
+                },
+            ],
+        )
+
+
+class ReportApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@test.com", "testpass"
+        )
+        self.client.force_authenticate(self.admin)
+
+    def test_reports_are_for_staff_only(self):
+        user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client.force_authenticate(user)
+
+        res = self.client.get(reverse("reports:revenue"))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_every_report_responds_with_its_range(self):
+        for name in ("revenue", "top_books", "utilization", "loan_length"):
+            with self.subTest(report=name):
+                res = self.client.get(reverse(f"reports:{name}"))
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res.data["results"], [])
+
+        res = self.client.get(reverse("reports:revenue"), {"period": "week"})
+        self.assertEqual(
+            res.data["end"] - res.data["start"], datetime.timedelta(weeks=12)
+        )
+
+    def test_invalid_parameters_are_rejected(self):
+        for name, params in (
+            ("revenue", {"period": "year"}),
+            ("loan_length", {"start": "2024-02-01", "end": "2024-01-01"}),
+            ("top_books", {"limit": 0}),
+        ):
+            with self.subTest(report=name, params=params):
+                res = self.client.get(reverse(f"reports:{name}"), params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reports_are_cached(self):
+        url = reverse("reports:revenue")
+        self.client.get(url, {"start": "2024-01-01", "end": "2024-01-31"})
+
+        with self.assertNumQueries(0):
+            self.client.get(url, {"start": "2024-01-01", "end": "2024-01-31"})
+
+    @override_settings(REPORTS_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        url = reverse("reports:revenue")
+        self.client.get(url)
+
+        # The rollup watermark, then the report.
+        with self.assertNumQueries(2):
+            self.client.get(url)
@@ -0,0 +1,156 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.models import Payment
+from reports import queries
+from reports.models import DailyBookBorrowings, DailyReturns, DailyRevenue
+from reports.rollups import ROLLUPS, rewind, roll_up, roll_up_all, watermark
+
+TODAY = timezone.localdate()
+
+
+def days(count):
+    return TODAY + datetime.timedelta(days=count)
+
+
+def at(day, hour=12):
+    return datetime.datetime.combine(
+        day, datetime.time(hour), tzinfo=timezone.get_current_timezone()
+    )
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        cls.books = [
+            Book.objects.create(
+                title=f"Book {index}",
+                author="Sample author",
+                cover=Book.CoverType.HARD,
+                inventory=5,
+                daily_fee=Decimal("1.00"),
+            )
+            for index in range(3)
+        ]
+        # Loans spread over the last two months, a third still out.
+        for index in range(45):
+            borrowed = -60 + index
+            returned = None if index % 3 == 0 else days(borrowed + 1 + index % 7)
+            cls.loan(cls.books[index % 3], borrowed, min(returned or TODAY, TODAY))
+        for index, borrowing in enumerate(Borrowing.objects.order_by("id")):
+            payment_type = Payment.TypeType.PAYMENT
+            Payment.objects.create(
+                borrowing=borrowing,
+                type=payment_type,
+                amount=100 + index,
+                status=Payment.StatusType.PAID,
+                paid_at=at(borrowing.borrow_date, hour=index % 24),
+            )
+            if borrowing.actual_return_date and index % 2:
+                Payment.objects.create(
+                    borrowing=borrowing,
+                    type=Payment.TypeType.FINE,
+                    amount=50,
+                    status=Payment.StatusType.PAID,
+                    paid_at=at(borrowing.actual_return_date),
+                )
+
+    @classmethod
+    def loan(cls, book, borrowed, returned=None):
+        borrowing = Borrowing.objects.create(
+            user=cls.user, book=book, expected_return_date=days(borrowed + 3)
+        )
+        Borrowing.objects.filter(pk=borrowing.pk).update(
+            borrow_date=days(borrowed), actual_return_date=returned
+        )
+        borrowing.refresh_from_db()
+        return borrowing
+
+    def reports(self):
+        rows = {}
+        for period in queries.PERIODS:
+            start = days(-70)
+            rows[f"revenue {period}"] = queries.revenue(period, start, TODAY)
+            rows[f"loan lengths {period}"] = queries.loan_lengths(period, start, TODAY)
+        rows["top books"] = queries.top_books(days(-70), TODAY)
+        rows["top books lately"] = queries.top_books(days(-20), TODAY)
+        return rows
+
+    def assertReportsMatchRawRows(self):
+        from_rollups = self.reports()
+        with override_settings(REPORTS_USE_ROLLUPS=False):
+            from_raw_rows = self.reports()
+        for name, rows in from_raw_rows.items():
+            with self.subTest(report=name):
+                self.assertTrue(rows)
+                self.assertEqual(from_rollups[name], rows)
+
+    def test_rollup_tables_match_raw_aggregation(self):
+        roll_up_all(chunk_days=7)
+
+        for rollup in ROLLUPS.values():
+            with self.subTest(rollup=rollup.name):
+                fields = [
+                    field.attname
+                    for field in rollup.model._meta.concrete_fields
+                    if not field.primary_key
+                ]
+                stored = rollup.model.objects.values(*fields).order_by(*fields)
+                expected = rollup.source(days(-90), days(-1)).order_by(*fields)
+                self.assertEqual(list(stored), list(expected))
+                self.assertEqual(watermark(rollup.name), days(-1))
+
+    def test_reports_match_raw_aggregation(self):
+        roll_up_all(chunk_days=7)
+
+        self.assertReportsMatchRawRows()
+
+    def test_days_after_the_watermark_are_read_from_raw_rows(self):
+        roll_up_all(through=days(-10))
+        self.loan(self.books[2], 0)
+
+        self.assertEqual(watermark("borrowings"), days(-10))
+        self.assertReportsMatchRawRows()
+
+    def test_runs_only_roll_days_since_the_watermark(self):
+        first = roll_up_all(through=days(-5))
+
+        self.assertEqual(roll_up_all(through=days(-5)), dict.fromkeys(first, 0))
+        self.assertEqual(roll_up_all(through=days(-1))["revenue"], 4)
+        self.assertEqual(
+            roll_up(ROLLUPS["returns"], through=days(-1)), 0
+        )
+
+    def test_rewinding_rolls_days_again_without_double_counting(self):
+        roll_up_all()
+        counts = [
+            model.objects.count()
+            for model in (DailyRevenue, DailyBookBorrowings, DailyReturns)
+        ]
+
+        rewind(days(-20))
+        rolled = roll_up_all()
+
+        self.assertEqual(rolled, dict.fromkeys(rolled, 20))
+        self.assertEqual(
+            [
+                model.objects.count()
+                for model in (DailyRevenue, DailyBookBorrowings, DailyReturns)
+            ],
+            counts,
+        )
+        self.assertReportsMatchRawRows()
+
+
+class EmptyRollupTests(TestCase):
+    def test_nothing_to_roll_up(self):
+        self.assertEqual(roll_up_all(), dict.fromkeys(ROLLUPS, 0))
+        self.assertIsNone(watermark("revenue"))
+        self.assertEqual(queries.revenue(), [])
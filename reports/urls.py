@@ -0,0 +1,12 @@
+from django.urls import path
+
+from .views import LoanLengthReport, RevenueReport, TopBooksReport, UtilizationReport
+
+urlpatterns = [
+    path("revenue/", RevenueReport.as_view(), name="revenue"),
+    path("top-books/", TopBooksReport.as_view(), name="top_books"),
+    path("utilization/", UtilizationReport.as_view(), name="utilization"),
+    path("loan-length/", LoanLengthReport.as_view(), name="loan_length"),
+]
+
+app_name = "reports"
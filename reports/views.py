@@ -0,0 +1,78 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.replicas import ReplicaReadMixin
+from . import cache, queries
+from .serializers import (
+    PeriodReportSerializer,
+    TopBooksReportSerializer,
+    UtilizationReportSerializer,
+)
+
+
+class ReportView(ReplicaReadMixin, APIView):
+    """Rows of ``report``, computed by the database and cached for
+    ``REPORTS_CACHE_TIMEOUT`` seconds"""
+
+    permission_classes = [permissions.IsAdminUser]
+    report_name = None
+    report = None
+    params_serializer_class = None
+
+    def get(self, request):
+        serializer = self.params_serializer_class(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        if "start" in serializer.fields:
+            params["start"], params["end"] = queries.date_range(
+                params.get("period", "day"), params.get("start"), params.get("end")
+            )
+        rows = cache.get_or_set(self.report_name, params, self.report)
+        return Response({**params, "results": rows})
+
+
+@extend_schema(
+    description="Paid rentals and fines per period, in cents, with a running total",
+    parameters=[PeriodReportSerializer],
+    responses={200: OpenApiTypes.OBJECT},
+)
+class RevenueReport(ReportView):
+    report_name = "revenue"
+    report = staticmethod(queries.revenue)
+    params_serializer_class = PeriodReportSerializer
+
+
+@extend_schema(
+    description="The most borrowed books in the range, ranked",
+    parameters=[TopBooksReportSerializer],
+    responses={200: OpenApiTypes.OBJECT},
+)
+class TopBooksReport(ReportView):
+    report_name = "top_books"
+    report = staticmethod(queries.top_books)
+    params_serializer_class = TopBooksReportSerializer
+
+
+@extend_schema(
+    description="Titles with the largest share of their copies on loan",
+    parameters=[UtilizationReportSerializer],
+    responses={200: OpenApiTypes.OBJECT},
+)
+class UtilizationReport(ReportView):
+    report_name = "utilization"
+    report = staticmethod(queries.utilization)
+    params_serializer_class = UtilizationReportSerializer
+
+
+@extend_schema(
+    description="Average and longest loan in days per period of return",
+    parameters=[PeriodReportSerializer],
+    responses={200: OpenApiTypes.OBJECT},
+)
+class LoanLengthReport(ReportView):
+    report_name = "loan_length"
+    report = staticmethod(queries.loan_lengths)
+    params_serializer_class = PeriodReportSerializer
@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-18 03:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserSummary",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="summary",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("active_loans", models.PositiveIntegerField(default=0)),
+                ("overdue_loans", models.PositiveIntegerField(default=0)),
+                (
+                    "outstanding",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("total_borrowings", models.PositiveIntegerField(default=0)),
+                ("total_fines", models.PositiveIntegerField(default=0)),
+                (
+                    "total_paid",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("as_of", models.DateField()),
+            ],
+        ),
+    ]
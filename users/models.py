@@ -47,3 +47,19 @@ class User(AbstractUser):
     REQUIRED_FIELDS = []
 
     objects = UserManager()
+
+
+class UserSummary(models.Model):
+    """Borrowing and payment totals of a user, kept up to date by
+    ``users.summary`` so the account panel reads a single row."""
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="summary"
+    )
+    active_loans = models.PositiveIntegerField(default=0)
+    overdue_loans = models.PositiveIntegerField(default=0)
+    outstanding = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_borrowings = models.PositiveIntegerField(default=0)
+    total_fines = models.PositiveIntegerField(default=0)
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    as_of = models.DateField()
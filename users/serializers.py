@@ -2,8 +2,11 @@ from django.contrib.auth import get_user_model, authenticate
 from rest_framework import serializers
 from django.utils.translation import gettext as _
 
+from config.instrumentation import TimedSerializerMixin
+from users.models import UserSummary
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
         fields = ("id", "email", "first_name", "last_name", "password", "is_staff")
@@ -25,6 +28,20 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
+class UserSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = UserSummary
+        fields = (
+            "active_loans",
+            "overdue_loans",
+            "outstanding",
+            "total_borrowings",
+            "total_fines",
+            "total_paid",
+            "as_of",
+        )
+
+
 class AuthTokenSerializer(serializers.Serializer):
     email = serializers.CharField(label=_("Email"))
     password = serializers.CharField(
@@ -0,0 +1,202 @@
+"""Per-user borrowing and payment totals for the account panel.
+
+Every borrow, return and payment transition adds up what it changed in a
+``SummaryChanges`` and records it, which applies the changes to the
+``UserSummary`` rows with ``F()`` expressions in the same transaction.
+Reads then cost a single row lookup.
+
+Overdue counts and the fines of books still out, which the nightly
+accrual reprices, change with the date, so a row of a user with active
+loans is only current for its ``as_of`` day; the nightly
+``refresh_active_summaries`` job renews those rows from scratch, and
+``get_summary`` refreshes a missing or stale one itself.  ``record``
+drops the stale rows it meets, as changes made today cannot be added to
+the totals of an earlier day.
+"""
+import datetime
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+
+from borrowings.models import Borrowing
+from payments.models import Payment
+from .models import UserSummary
+
+COUNTERS = {
+    "active_loans": 0,
+    "overdue_loans": 0,
+    "outstanding": 0,
+    "total_borrowings": 0,
+    "total_fines": 0,
+    "total_paid": 0,
+}
+
+
+def compute(user_ids, today=None) -> dict:
+    """The summary counters of ``user_ids`` from scratch, per user id."""
+    today = today or datetime.date.today()
+    summaries = {user_id: dict(COUNTERS) for user_id in user_ids}
+
+    borrowings = (
+        Borrowing.objects.filter(user_id__in=user_ids)
+        .values("user_id")
+        .annotate(
+            total_borrowings=Count("id"),
+            active_loans=Count("id", filter=Q(actual_return_date__isnull=True)),
+            overdue_loans=Count(
+                "id",
+                filter=Q(
+                    actual_return_date__isnull=True, expected_return_date__lt=today
+                ),
+            ),
+        )
+        .order_by()
+    )
+    for row in borrowings:
+        summaries[row.pop("user_id")].update(row)
+
+    payments = (
+        Payment.objects.filter(borrowing__user_id__in=user_ids)
+        .values("borrowing__user_id")
+        .annotate(
+            outstanding=Sum(
+                "amount", filter=Q(status=Payment.StatusType.PENDING), default=0
+            ),
+            total_paid=Sum(
+                "amount", filter=Q(status=Payment.StatusType.PAID), default=0
+            ),
+            total_fines=Count("id", filter=Q(type=Payment.TypeType.FINE)),
+        )
+        .order_by()
+    )
+    for row in payments:
+        summary = summaries[row.pop("borrowing__user_id")]
+        summary.update(row)
+        # Stored amounts are in cents.
+        for field in ("outstanding", "total_paid"):
+            summary[field] = Decimal(summary[field]).scaleb(-2)
+
+    return summaries
+
+
+def lock_users(user_ids) -> None:
+    """Lock ``user_ids`` in id order until the transaction ends; every
+    write to their summaries holds these locks."""
+    list(
+        get_user_model()
+        .objects.select_for_update()
+        .filter(id__in=user_ids)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def refresh(user_ids, today=None) -> list:
+    """Recompute and store the summaries of ``user_ids``.
+
+    The users are locked first, so a refresh that started earlier cannot
+    overwrite a later one with older totals.
+    """
+    today = today or datetime.date.today()
+    user_ids = sorted(set(user_ids))
+    with transaction.atomic():
+        lock_users(user_ids)
+        summaries = [
+            UserSummary(user_id=user_id, as_of=today, **counters)
+            for user_id, counters in compute(user_ids, today).items()
+        ]
+        return UserSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=[*COUNTERS, "as_of"],
+        )
+
+
+class SummaryChanges(defaultdict):
+    """What one transaction changed in the summaries, ``{user id:
+    {counter: change}}``, applied to the stored rows by ``record``."""
+
+    def __init__(self):
+        super().__init__(Counter)
+
+    def borrowed(self, user_id) -> None:
+        self[user_id]["total_borrowings"] += 1
+        self[user_id]["active_loans"] += 1
+
+    def returned(self, user_id, expected_return_date, today=None) -> None:
+        self[user_id]["active_loans"] -= 1
+        if expected_return_date < (today or datetime.date.today()):
+            self[user_id]["overdue_loans"] -= 1
+
+    def payment(self, user_id, payment, sign=1) -> None:
+        """Add ``payment`` to the totals of ``user_id``, or take it away
+        with ``sign=-1``; a payment that changes is taken away as it was
+        and added as it is."""
+        if payment.type == Payment.TypeType.FINE:
+            self[user_id]["total_fines"] += sign
+        # Stored amounts are in cents.
+        amount = sign * Decimal(payment.amount).scaleb(-2)
+        if payment.status == Payment.StatusType.PAID:
+            self[user_id]["total_paid"] += amount
+        else:
+            self[user_id]["outstanding"] += amount
+
+    def record(self, today=None) -> None:
+        """Apply the changes to the stored summaries in the current
+        transaction.
+
+        The users are locked first, as ``refresh`` does, so a concurrent
+        refresh either counts the transition or runs after it.
+        Users without a current row are left to ``get_summary``.
+        """
+        today = today or datetime.date.today()
+        user_ids = sorted(self)
+        if not user_ids:
+            return
+
+        with transaction.atomic():
+            lock_users(user_ids)
+            # Totals without a book out do not change with the date, so
+            # those rows are current whatever their day.
+            current = Q(as_of=today) | Q(active_loans=0)
+            for user_id in user_ids:
+                # A row that drifted from the tables (ex. a loan made
+                # overdue by hand) waits for the nightly refresh rather
+                # than failing the transition.
+                UserSummary.objects.filter(current, user_id=user_id).update(
+                    as_of=today,
+                    **{
+                        field: Greatest(F(field) + change, 0)
+                        for field, change in self[user_id].items()
+                        if change
+                    },
+                )
+            UserSummary.objects.filter(
+                user_id__in=user_ids, as_of__lt=today
+            ).delete()
+
+
+def get_summary(user, today=None) -> UserSummary:
+    today = today or datetime.date.today()
+    summary = UserSummary.objects.filter(user=user).first()
+    if summary is None or (summary.as_of < today and summary.active_loans):
+        (summary,) = refresh([user.id], today)
+    return summary
+
+
+def refresh_active_summaries(batch_size: int = 1000, today=None) -> int:
+    """Renew the summaries of every user with a book still out."""
+    user_ids = list(
+        Borrowing.objects.filter(actual_return_date__isnull=True)
+        .order_by("user_id")
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+    for start in range(0, len(user_ids), batch_size):
+        refresh(user_ids[start : start + batch_size], today)
+    return len(user_ids)
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .summary import refresh_active_summaries
+
+
+@shared_task
+def refresh_user_summaries() -> int:
+    """Renew the date-dependent summaries of users with books still out."""
+    return refresh_active_summaries()
@@ -0,0 +1,193 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from books.models import Book
+from borrowings.models import Borrowing
+from payments.fees import amount_for, reprice
+from payments.models import Payment
+from payments.stripe_stub import fake_stripe
+from users.models import UserSummary
+from users.summary import get_summary, refresh, refresh_active_summaries
+
+SUMMARY_URL = reverse("users:summary")
+TODAY = datetime.date.today()
+
+
+def days(count):
+    return TODAY + datetime.timedelta(days=count)
+
+
+@override_settings(PAYMENTS_DEFERRED_SESSIONS=False)
+class UserSummaryTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("test@test.com", "testpass")
+        self.client.force_authenticate(self.user)
+        self.books = [
+            Book.objects.create(
+                title=f"Book {index}",
+                author="Sample author",
+                cover=Book.CoverType.HARD,
+                inventory=2,
+                daily_fee=Decimal("1.25"),
+            )
+            for index in range(3)
+        ]
+
+    def act(self, method, url, data=None):
+        with fake_stripe(), self.captureOnCommitCallbacks(execute=True):
+            res = getattr(self.client, method)(url, data)
+        self.assertLess(res.status_code, 300, res.data)
+        return res
+
+    def from_scratch(self, today):
+        """The summary the way clients used to add it up."""
+        borrowings = Borrowing.objects.filter(user=self.user)
+        active = [b for b in borrowings if b.actual_return_date is None]
+        payments = Payment.objects.filter(borrowing__user=self.user)
+        return {
+            "active_loans": len(active),
+            "overdue_loans": sum(b.expected_return_date < today for b in active),
+            "outstanding": sum(
+                amount_for(p.borrowing, p.type, today)
+                for p in payments
+                if p.status == Payment.StatusType.PENDING
+            ),
+            "total_borrowings": len(borrowings),
+            "total_fines": sum(p.type == Payment.TypeType.FINE for p in payments),
+            "total_paid": sum(
+                amount_for(p.borrowing, p.type, today)
+                for p in payments
+                if p.status == Payment.StatusType.PAID
+            ),
+        }
+
+    def assertSummaryIsCurrent(self, today=TODAY):
+        stored = UserSummary.objects.get(user=self.user)
+        self.assertEqual(stored.as_of, today)
+        expected = self.from_scratch(today)
+        self.assertEqual(
+            {field: getattr(stored, field) for field in expected}, expected
+        )
+        return stored
+
+    def test_summary_follows_borrows_returns_and_payments(self):
+        get_summary(self.user)
+        self.act(
+            "post",
+            reverse("borrowings:borrowing-list"),
+            {"book": self.books[0].id, "expected_return_date": days(3)},
+        )
+        summary = self.assertSummaryIsCurrent()
+        self.assertEqual(summary.active_loans, 1)
+        self.assertEqual(summary.outstanding, Decimal("3.75"))
+
+        self.act(
+            "post",
+            reverse("borrowings:borrowing-bulk"),
+            {
+                "books": [self.books[1].id, self.books[2].id],
+                "expected_return_date": days(2),
+            },
+        )
+        self.assertEqual(self.assertSummaryIsCurrent().active_loans, 3)
+
+        late = Borrowing.objects.get(book=self.books[1])
+        Borrowing.objects.filter(pk=late.pk).update(
+            borrow_date=days(-10), expected_return_date=days(-2)
+        )
+        reprice(Payment.objects.filter(borrowing=late))
+        # The nightly job repairs the rows after edits like these.
+        refresh([self.user.id])
+        self.act("post", reverse("borrowings:borrowing-return-book", args=[late.id]))
+        summary = self.assertSummaryIsCurrent()
+        self.assertEqual(summary.active_loans, 2)
+        self.assertEqual(summary.total_fines, 1)
+
+        with fake_stripe() as stripe, self.captureOnCommitCallbacks(execute=True):
+            session_id = (
+                Payment.objects.filter(borrowing=late).first().stripe_session_id
+            )
+            stripe.sessions[session_id] = {"id": session_id, "payment_status": "paid"}
+            self.client.get(
+                reverse("payments:payment_success"), {"session_id": session_id}
+            )
+        summary = self.assertSummaryIsCurrent()
+        self.assertGreater(summary.total_paid, 0)
+        self.assertEqual(summary.total_borrowings, 3)
+
+    def test_transitions_do_not_recompute_the_history(self):
+        get_summary(self.user)
+        borrow = reverse("borrowings:borrowing-list")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.act(
+                "post",
+                borrow,
+                {"book": self.books[0].id, "expected_return_date": days(3)},
+            )
+            borrowing = Borrowing.objects.get(user=self.user)
+            self.act(
+                "post", reverse("borrowings:borrowing-return-book", args=[borrowing.id])
+            )
+
+        self.assertFalse(
+            [query["sql"] for query in queries if "GROUP BY" in query["sql"]]
+        )
+        summary = self.assertSummaryIsCurrent()
+        self.assertEqual(summary.active_loans, 0)
+        self.assertEqual(summary.total_borrowings, 1)
+
+    def test_transitions_drop_stale_rows(self):
+        Borrowing.objects.create(
+            user=self.user, book=self.books[0], expected_return_date=days(1)
+        )
+        get_summary(self.user)
+        UserSummary.objects.update(as_of=days(-1))
+
+        self.act(
+            "post",
+            reverse("borrowings:borrowing-list"),
+            {"book": self.books[1].id, "expected_return_date": days(3)},
+        )
+
+        self.assertFalse(UserSummary.objects.exists())
+        self.assertEqual(get_summary(self.user).active_loans, 2)
+        self.assertSummaryIsCurrent()
+
+    def test_endpoint_reads_one_row(self):
+        get_summary(self.user)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(SUMMARY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["active_loans"], 0)
+        self.assertEqual(res.data["outstanding"], "0.00")
+
+    def test_rows_with_active_loans_are_renewed_on_a_new_day(self):
+        Borrowing.objects.create(
+            user=self.user, book=self.books[0], expected_return_date=days(1)
+        )
+        get_summary(self.user)
+
+        summary = get_summary(self.user, today=days(5))
+
+        self.assertEqual(summary.overdue_loans, 1)
+        self.assertSummaryIsCurrent(today=days(5))
+
+        self.assertEqual(refresh_active_summaries(today=days(6)), 1)
+        self.assertSummaryIsCurrent(today=days(6))
+
+    def test_summary_requires_authentication(self):
+        res = APIClient().get(SUMMARY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -4,13 +4,14 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView
 )
 
-from users.views import CreateUserView, ManageUserView
+from users.views import CreateUserView, ManageUserView, UserSummaryView
 
 app_name = "users"
 
 urlpatterns = [
     path("", CreateUserView.as_view(), name="create"),
     path("me/", ManageUserView.as_view(), name="manage"),
+    path("me/summary/", UserSummaryView.as_view(), name="summary"),
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 ]
@@ -3,7 +3,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
-from users.serializers import UserSerializer, AuthTokenSerializer
+from users.serializers import (
+    UserSerializer,
+    AuthTokenSerializer,
+    UserSummarySerializer,
+)
+from users.summary import get_summary
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -21,3 +26,14 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         return self.request.user
+
+
+class UserSummaryView(generics.RetrieveAPIView):
+    """Active and overdue loans, the amount still to pay and lifetime
+    totals of the current user"""
+
+    serializer_class = UserSummarySerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_object(self):
+        return get_summary(self.request.user)